@@ -1,34 +1,344 @@
 from flask import Flask, render_template, request, redirect, session, jsonify, flash
-from db import get_connection, init_db, UPLOADS_DIR
+from db import (
+    backend, get_db, get_connection, close_db, init_db, migrate, latest_migration_version, check_query_plans,
+    UPLOADS_DIR,
+)
+from cache import LRUCache, FragmentCache, read_cache_versions
+from counters import (
+    DASHBOARD_COUNTERS_SQL, HEATMAP_COUNTERS_SQL, read_attendance_heatmap, read_dashboard_counters,
+    reconcile_dashboard_counters,
+)
+from attendance import (
+    ATTENDANCE_RANGE_SQL, check_in, check_out, effective_attendance, attendance_range, start_cap_sweeper, sweep_once,
+    WriteBehindBuffer, AttendanceWriteError, benchmark_check_ins,
+)
+from exports import EXPORTS, export_rows, stream_csv, stream_xlsx
+from imports import import_employees, read_import_rows
+from leaves import (
+    DECISIONS, MAX_DECISION_BATCH, coverage_warnings, create_leave, decide_leaves, max_concurrent_absences, people_out,
+)
+from calendars import annotate_working_days, holidays_in_year, leave_working_days
+from balances import accrue_leave, read_leave_balances, rebuild_leave_balances, start_leave_accrual
+from rollups import (
+    COMPANY_MONTHLY_SQL, DEPARTMENT_MONTHLY_SQL, EMPLOYEE_MONTHLY_SQL, aggregate_once, rebuild_attendance_rollups,
+    read_monthly_attendance, start_rollup_aggregator,
+)
+from markupsafe import Markup
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
 from werkzeug.utils import secure_filename
+import click
+from concurrent.futures import TimeoutError as FutureTimeout
 from datetime import datetime, timedelta
+import atexit
+import csv
+import hashlib
 import os
-import sqlite3
+import re
+import threading
 
 app = Flask(__name__)
 init_db()
+app.teardown_appcontext(close_db)
 app.secret_key = "secretkey"
 app.config["MAX_CONTENT_LENGTH"] = 2 * 1024 * 1024  # 2MB max for uploads
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
 
+# Seconds between background auto-cap sweeps; 0 disables the thread (use `flask sweep-attendance` from cron)
+CAP_SWEEP_INTERVAL = int(os.environ.get("EMS_CAP_SWEEP_INTERVAL", 60))
+# Seconds between attendance rollup refreshes; 0 disables the thread (use `flask rollup-attendance` from cron)
+ROLLUP_INTERVAL = int(os.environ.get("EMS_ROLLUP_INTERVAL", 60))
+# Seconds between checks that this month's leave accrual is posted; 0 disables the thread (use `flask accrue-leave`)
+LEAVE_ACCRUAL_INTERVAL = int(os.environ.get("EMS_LEAVE_ACCRUAL_INTERVAL", 3600))
+
+# Optional write-behind mode for check-in storms; see attendance.WriteBehindBuffer
+attendance_buffer = None
+WRITE_BEHIND_WAIT = float(os.environ.get("EMS_ATTENDANCE_WRITE_BEHIND_WAIT", 5))
+if os.environ.get("EMS_ATTENDANCE_WRITE_BEHIND") == "1":
+    attendance_buffer = WriteBehindBuffer(
+        os.environ.get("EMS_ATTENDANCE_SPILL_DIR", os.path.join(app.instance_path, "attendance-spill")),
+        flush_interval=int(os.environ.get("EMS_ATTENDANCE_FLUSH_MS", 0)) / 1000,
+        max_batch=int(os.environ.get("EMS_ATTENDANCE_FLUSH_EVENTS", 500)),
+    )
+
+_background_started = False
+_background_lock = threading.Lock()
+
+
+@app.before_request
+def start_background_jobs():
+    """Start this worker's background threads with its first request.
+
+    Not at import, so `flask migrate` and the other CLI commands (and a
+    reloader's parent process) never run them.
+    """
+    global _background_started
+    if _background_started:
+        return
+    with _background_lock:
+        if _background_started:
+            return
+        if CAP_SWEEP_INTERVAL > 0:
+            start_cap_sweeper(CAP_SWEEP_INTERVAL)
+        if ROLLUP_INTERVAL > 0:
+            start_rollup_aggregator(ROLLUP_INTERVAL)
+        if LEAVE_ACCRUAL_INTERVAL > 0:
+            start_leave_accrual(LEAVE_ACCRUAL_INTERVAL)
+        if attendance_buffer is not None:
+            attendance_buffer.start()
+            atexit.register(attendance_buffer.close)
+        _background_started = True
+
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Apply pending database migrations."""
+    applied = migrate()
+    for name in applied:
+        print(f"Applied {name}")
+    print(f"Schema is at version {latest_migration_version()}")
+
+
+@app.cli.command("sweep-attendance")
+def sweep_attendance_command():
+    """Cap open attendance rows that are past their 9-hour cutoff."""
+    print(f"Capped {sweep_once()} attendance row(s)")
+
+
+@app.cli.command("bench-checkins")
+@click.option("--events", default=2000, help="Check-ins to perform in each mode.")
+@click.option("--threads", default=16, help="Concurrent clients.")
+@click.option("--flush-ms", default=0, help="Write-behind linger before each flush.")
+@click.option("--batch", default=500, help="Write-behind max events per transaction.")
+def bench_checkins_command(events, threads, flush_ms, batch):
+    """Compare check-ins/second with and without write-behind batching (scratch databases)."""
+    results = benchmark_check_ins(events, threads, flush_ms / 1000, batch)
+    print(f"direct (transaction per check-in): {results['direct']:8.0f} check-ins/s")
+    print(f"write-behind (batched commits):    {results['write_behind']:8.0f} check-ins/s")
+
+
+@app.cli.command("reconcile-counters")
+def reconcile_counters_command():
+    """Recompute the dashboard counters from scratch and report any drift."""
+    conn = get_connection()
+    try:
+        drift = reconcile_dashboard_counters(conn)
+    finally:
+        conn.close()
+    for counter, scope, stored, actual in drift:
+        print(f"{counter}{'[' + scope + ']' if scope else ''}: stored {stored}, actual {actual}")
+    print(f"Reconciled dashboard counters ({len(drift)} drifted)")
+
+
+@app.cli.command("rollup-attendance")
+@click.option("--rebuild", is_flag=True, help="Recompute every rollup from the attendance table.")
+def rollup_attendance_command(rebuild):
+    """Fold pending attendance changes into the report rollups."""
+    if rebuild:
+        conn = get_connection()
+        try:
+            rebuild_attendance_rollups(conn)
+        finally:
+            conn.close()
+        print("Rebuilt attendance rollups")
+    else:
+        print(f"Folded {aggregate_once()} attendance change(s)")
+
+
+@app.cli.command("accrue-leave")
+@click.option("--month", default=lambda: datetime.now().strftime("%Y-%m"), help="Month to credit (YYYY-MM).")
+def accrue_leave_command(month):
+    """Credit a month's leave accrual to every employee (skips anyone already credited)."""
+    try:
+        datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise click.BadParameter("must be YYYY-MM", param_hint="--month")
+    conn = get_connection()
+    try:
+        posted = accrue_leave(conn, month)
+    finally:
+        conn.close()
+    print(f"Posted {posted} leave accrual(s) for {month}")
+
+
+@app.cli.command("rebuild-leave-balances")
+def rebuild_leave_balances_command():
+    """Recompute leave balances from the ledger and report any drift."""
+    conn = get_connection()
+    try:
+        drift = rebuild_leave_balances(conn)
+    finally:
+        conn.close()
+    for emp_id, leave_type, stored, actual in drift:
+        print(f"{emp_id} {leave_type}: stored {stored:g}, ledger {actual:g}")
+    print(f"Rebuilt leave balances ({len(drift)} drifted)")
+
+
+@app.cli.command("load-holidays")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--location", default="default", help="Calendar the holidays belong to.")
+@click.option("--weekmask", help="Working days Monday..Sunday, e.g. 1111100; creates or updates the calendar.")
+def load_holidays_command(path, location, weekmask):
+    """Load holidays from a CSV with date (YYYY-MM-DD) and name columns into a location's calendar."""
+    if weekmask is not None and not re.fullmatch(r"[01]{7}", weekmask):
+        raise click.BadParameter("must be seven 0/1 characters, Monday first", param_hint="--weekmask")
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = []
+        for number, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                day = datetime.strptime((row.get("date") or "").strip(), "%Y-%m-%d").date().isoformat()
+            except ValueError:
+                raise click.ClickException(f"line {number}: date must be YYYY-MM-DD")
+            rows.append((location, day, (row.get("name") or "").strip()))
+    conn = get_connection()
+    try:
+        if weekmask is not None:
+            conn.execute(
+                """INSERT INTO calendars (location, weekmask) VALUES (?, ?)
+                   ON CONFLICT (location) DO UPDATE SET weekmask = excluded.weekmask""",
+                (location, weekmask),
+            )
+        else:
+            conn.execute("INSERT OR IGNORE INTO calendars (location) VALUES (?)", (location,))
+        conn.executemany(
+            """INSERT INTO holidays (location, date, name) VALUES (?, ?, ?)
+               ON CONFLICT (location, date) DO UPDATE SET name = excluded.name""",
+            rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"Loaded {len(rows)} holiday(s) into the {location!r} calendar")
+
+
+@app.cli.command("import-employees")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "json", "jsonl"]), help="Defaults to the file extension.")
+@click.option("--report", type=click.Path(dir_okay=False), help="Write rejected rows to this CSV file.")
+def import_employees_command(path, fmt, report):
+    """Bulk-import employees (and their logins) from a CSV or JSON file."""
+    fmt = fmt or import_format(path)
+    conn = get_connection()
+    try:
+        with open(path, "rb") as stream:
+            result = import_employees(conn, read_import_rows(stream, fmt))
+    finally:
+        conn.close()
+    if report:
+        with open(report, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["row", "emp_id", "errors"])
+            for error in result["errors"]:
+                writer.writerow([error["row"], error["emp_id"], "; ".join(error["errors"])])
+    else:
+        for error in result["errors"]:
+            print(f"row {error['row']} ({error['emp_id']}): {'; '.join(error['errors'])}")
+    print(f"Imported {result['inserted']} employee(s), rejected {len(result['errors'])} row(s)")
+
+
+def hot_queries():
+    """{name: sql} for the statements the dashboards and paged APIs run, built exactly as the routes build them."""
+    return {
+        "admin dashboard counters": DASHBOARD_COUNTERS_SQL,
+        "attendance today": ATTENDANCE_TODAY_SQL,
+        "admin recent activity": activity_page_sql(RECENT_ACTIVITY_ITEMS),
+        "activity page": activity_page_sql(API_PAGE_SIZE + 1, seek=True),
+        "pending leave queue": pending_leaves_sql(["l.status = 'pending'"], API_PAGE_SIZE + 1),
+        "pending leave queue page": pending_leaves_sql(["l.status = 'pending'", PENDING_LEAVES_SEEK], API_PAGE_SIZE + 1),
+        "pending leave department facet": pending_leaves_facet_sql("department", ["l.status = 'pending'"]),
+        "pending leave type facet": pending_leaves_facet_sql("type", ["l.status = 'pending'"]),
+        "pending leave total": pending_leaves_total_sql(["l.status = 'pending'"]),
+        "employee leaves count": LEAVES_COUNT_SQL,
+        "employee pending leaves count": PENDING_LEAVES_COUNT_SQL,
+        "employee leave history": leave_history_sql(LEAVE_HISTORY_PAGE + 1),
+        "employee leave history page": leave_history_sql(API_PAGE_SIZE + 1, seek=True),
+        "employee directory page": employee_directory_sql(
+            list(EMPLOYEE_DIRECTORY_DEFAULT_FIELDS), ["emp_id > ?"], API_PAGE_SIZE + 1,
+        ),
+        "attendance range": ATTENDANCE_RANGE_SQL,
+        "attendance heatmap": HEATMAP_COUNTERS_SQL,
+        "employee monthly summary": EMPLOYEE_MONTHLY_SQL,
+        "department monthly summary": DEPARTMENT_MONTHLY_SQL,
+        "company monthly summary": COMPANY_MONTHLY_SQL,
+    }
+
+
+@app.cli.command("check-query-plans")
+def check_query_plans_command():
+    """Fail if a dashboard query falls back to a table scan."""
+    conn = get_connection()
+    try:
+        problems = check_query_plans(conn, hot_queries())
+    finally:
+        conn.close()
+    for name, plan in problems.items():
+        print(f"{name}: " + "; ".join(plan))
+    if problems:
+        raise click.ClickException(f"{len(problems)} query plan(s) scan a table")
+    print("All dashboard queries use an index")
+
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def get_emp_id():
-    """Get emp_id for current session user. Admin -> ADMIN001, employees -> lookup by username."""
-    username = session.get("user")
-    if not username:
-        return None
+# username -> emp_id, shared by every request in this worker
+identity_cache = LRUCache(maxsize=int(os.environ.get("EMS_IDENTITY_CACHE_SIZE", 4096)))
+
+
+# Rendered dashboard panels, keyed by panel, user and the versions they were rendered at
+fragment_cache = FragmentCache(LRUCache(maxsize=int(os.environ.get("EMS_FRAGMENT_CACHE_SIZE", 2048))))
+
+
+def resolve_emp_id(username):
+    """Map a login username to its emp_id. Admin -> ADMIN001, employees -> lookup by username or emp_id."""
     if username == "admin":
         return "ADMIN001"
-    conn = get_connection()
+    emp_id = identity_cache.get(username)
+    if emp_id is not None:
+        return emp_id
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT emp_id FROM employees WHERE username=? OR emp_id=?", (username, username))
+    # Two single-index lookups instead of one OR predicate that can't use either index well
+    cursor.execute("SELECT emp_id FROM employees WHERE username=?", (username,))
     row = cursor.fetchone()
-    conn.close()
-    return row["emp_id"] if row else None
+    if not row:
+        cursor.execute("SELECT emp_id FROM employees WHERE emp_id=?", (username,))
+        row = cursor.fetchone()
+    if not row:
+        return None
+    identity_cache.set(username, row["emp_id"])
+    return row["emp_id"]
+
+
+def invalidate_identity(*usernames):
+    for username in usernames:
+        identity_cache.delete(username)
+
+
+def get_emp_id():
+    """Get emp_id for current session user. Resolved once at login and kept in the signed session."""
+    username = session.get("user")
+    if not username:
+        return None
+    emp_id = session.get("emp_id")
+    if emp_id is None:
+        # Sessions issued before emp_id was stored at login
+        emp_id = resolve_emp_id(username)
+        if emp_id:
+            session["emp_id"] = emp_id
+    return emp_id
+
+
+@app.before_request
+def backfill_session():
+    """Give sessions issued before login stored the role (and emp_id) both, on their next request."""
+    username = session.get("user")
+    if username and "role" not in session:
+        row = get_db().execute("SELECT role FROM users WHERE username=?", (username,)).fetchone()
+        if row:
+            session["role"] = row[0]
+        get_emp_id()
 
 
 def get_current_employee():
@@ -36,11 +346,10 @@ def get_current_employee():
     emp_id = get_emp_id()
     if not emp_id:
         return None
-    conn = get_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM employees WHERE emp_id=?", (emp_id,))
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
@@ -51,17 +360,18 @@ def login():
         username = request.form["username"]
         password = request.form["password"]
 
-        conn = get_connection()
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute(
             "SELECT role FROM users WHERE username=? AND password=?",
             (username, password),
         )
         user = cursor.fetchone()
-        conn.close()
 
         if user:
             session["user"] = username
+            session["role"] = user[0]
+            session["emp_id"] = resolve_emp_id(username)
             if user[0] == "ADMIN":
                 return redirect("/admin")
             else:
@@ -84,132 +394,139 @@ def forgot():
     if request.method == "POST":
         username = request.form["username"]
         new_password = request.form["password"]
-        conn = get_connection()
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute("UPDATE users SET password=? WHERE username=?", (new_password, username))
         conn.commit()
-        conn.close()
         return redirect("/")
     return render_template("forgot_password.html")
 
 
+def format_activity(event, today):
+    """Render an activity_events row for the Recent Activity feed."""
+    name = event["name"] or event["emp_id"]
+    occurred_at = event["occurred_at"] or ""
+    if event["kind"] == "leave":
+        status_label = "applied for" if event["action"] == "pending" else event["action"]
+        message = f"{name} {status_label} {event['leave_type']} leave ({event['from_date']} – {event['to_date']})"
+    else:
+        message = f"{name} marked attendance"
+    # Today's check-ins only need the clock time
+    if event["kind"] == "attendance" and occurred_at.startswith(today):
+        time = occurred_at[11:16]
+    else:
+        time = occurred_at[:16]
+    return {"id": event["id"], "type": event["kind"], "message": message, "time": time, "occurred_at": occurred_at}
+
+
+# Statements every dashboard load runs; hot_queries() hands them to `flask check-query-plans`
+ATTENDANCE_TODAY_SQL = "SELECT * FROM attendance WHERE emp_id=? AND date=?"
+LEAVES_COUNT_SQL = "SELECT COUNT(*) FROM leaves WHERE emp_id=?"
+PENDING_LEAVES_COUNT_SQL = "SELECT COUNT(*) FROM leaves WHERE emp_id=? AND status='pending'"
+RECENT_ACTIVITY_ITEMS = 8
+
+
+def activity_page_sql(limit, seek=False):
+    """Newest activity_events first; with `seek`, only those before a (before_at, before_id) cursor."""
+    sql = "SELECT * FROM activity_events"
+    if seek:
+        # Written so the occurred_at bound can seek the index instead of filtering a scan
+        sql += " WHERE occurred_at <= ? AND (occurred_at < ? OR id < ?)"
+    return sql + " ORDER BY occurred_at DESC, id DESC " + backend.limit(limit)
+
+
+def render_recent_activity_panel(conn, today):
+    # Recent activity: newest entries of the activity log, one index read
+    cursor = conn.cursor()
+    cursor.execute(activity_page_sql(RECENT_ACTIVITY_ITEMS))
+    recent_activity = [format_activity(row, today) for row in cursor.fetchall()]
+    return Markup(render_template("fragments/admin_recent_activity.html", recent_activity=recent_activity))
+
+
+# Leaves shown on the employee dashboard before "Load more" pages through /api/me/leaves
+LEAVE_HISTORY_PAGE = 20
+
+
+def leave_history_sql(limit, seek=False):
+    sql = "SELECT * FROM leaves WHERE emp_id = ?"
+    if seek:
+        # Seeks the (emp_id, applied_at) index, so each page costs the page size, not the history
+        sql += " AND applied_at <= ? AND (applied_at < ? OR id < ?)"
+    return sql + " ORDER BY applied_at DESC, id DESC " + backend.limit(limit)
+
+
+def leave_history_page(conn, emp_id, limit, before_at=None, before_id=None):
+    """One page of an employee's leaves, newest first; returns (leaves, next_cursor or None)."""
+    seek = bool(before_at and before_id is not None)
+    params = [emp_id, before_at, before_at, before_id] if seek else [emp_id]
+    leaves = [dict(row) for row in conn.execute(leave_history_sql(limit + 1, seek), params).fetchall()]
+    has_more = len(leaves) > limit
+    leaves = leaves[:limit]
+    return leaves, ({"before_at": leaves[-1]["applied_at"], "before_id": leaves[-1]["id"]} if has_more else None)
+
+
+def load_leave_summary(conn, emp_id):
+    """Leave counts, balances and the rendered leave history panel for one employee."""
+    cursor = conn.cursor()
+    cursor.execute(LEAVES_COUNT_SQL, (emp_id,))
+    my_leaves_count = cursor.fetchone()[0]
+
+    cursor.execute(PENDING_LEAVES_COUNT_SQL, (emp_id,))
+    my_pending_leaves = cursor.fetchone()[0]
+
+    my_leaves, next_cursor = leave_history_page(conn, emp_id, LEAVE_HISTORY_PAGE)
+    return {
+        "my_leaves_count": my_leaves_count,
+        "my_pending_leaves": my_pending_leaves,
+        "leave_balances": read_leave_balances(conn, emp_id),
+        "leave_history_panel": Markup(render_template(
+            "fragments/employee_leave_history.html", my_leaves=my_leaves, next_cursor=next_cursor,
+        )),
+    }
+
+
 # ADMIN DASHBOARD
 @app.route("/admin")
 def admin_dashboard():
     if "user" not in session:
         return redirect("/")
 
-    conn = get_connection()
+    conn = get_db()
     cursor = conn.cursor()
 
-    cursor.execute("SELECT * FROM employees ORDER BY emp_id")
-    employees = [dict(row) for row in cursor.fetchall()]
-
-    cursor.execute(
-        """SELECT l.*, e.name FROM leaves l
-           JOIN employees e ON l.emp_id = e.emp_id
-           WHERE l.status = 'pending' ORDER BY l.applied_at DESC"""
-    )
-    pending_leaves = [dict(row) for row in cursor.fetchall()]
-
-    cursor.execute("SELECT COUNT(*) FROM employees")
-    total_employees = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM leaves WHERE status = 'pending'")
-    pending_leaves_count = cursor.fetchone()[0]
-
     today = datetime.now().strftime("%Y-%m-%d")
-    cursor.execute(
-        "SELECT COUNT(*) FROM attendance WHERE date=? AND status='present'",
-        (today,),
-    )
-    today_attendance = cursor.fetchone()[0]
+    # Trigger-maintained counters instead of three COUNT(*) scans
+    counters = read_dashboard_counters(conn, today)
 
     admin_emp_id = get_emp_id()
-    cursor.execute(
-        "SELECT * FROM attendance WHERE emp_id=? AND date=?",
-        (admin_emp_id, today),
-    )
+    cursor.execute(ATTENDANCE_TODAY_SQL, (admin_emp_id, today))
     admin_att_row = cursor.fetchone()
 
-    # Auto-cap admin's daily work duration to 9 hours if needed
-    if admin_att_row and admin_att_row["login_time"] and not admin_att_row["logout_time"]:
-        try:
-            login_dt = datetime.strptime(f"{today} {admin_att_row['login_time']}", "%Y-%m-%d %H:%M:%S")
-            cutoff_dt = login_dt + timedelta(hours=9)
-            now_dt = datetime.now()
-            if now_dt >= cutoff_dt:
-                cutoff_time = cutoff_dt.strftime("%H:%M:%S")
-                cursor.execute(
-                    "UPDATE attendance SET logout_time=? WHERE emp_id=? AND date=?",
-                    (cutoff_time, admin_emp_id, today),
-                )
-                conn.commit()
-                cursor.execute(
-                    "SELECT * FROM attendance WHERE emp_id=? AND date=?",
-                    (admin_emp_id, today),
-                )
-                admin_att_row = cursor.fetchone()
-        except ValueError:
-            pass
-
-    admin_attendance_status = dict(admin_att_row) if admin_att_row else None
-
-    # Recent activity: last 5 leaves (any status) + today's attendance
-    cursor.execute(
-        """SELECT l.emp_id, e.name, l.type, l.from_date, l.to_date, l.status, l.applied_at
-           FROM leaves l JOIN employees e ON l.emp_id = e.emp_id
-           ORDER BY l.applied_at DESC LIMIT 5"""
+    # Read-only: the cap sweeper writes the 9-hour logout, we only display it
+    admin_attendance_status = effective_attendance(admin_att_row)
+
+    # Panels that rarely change come from the fragment cache; one query fetches their versions
+    versions = read_cache_versions(conn, (f"employee:{admin_emp_id}",))
+    recent_activity_panel = fragment_cache.get_or_render(
+        "admin_recent_activity", today, (versions["activity"],),
+        lambda: render_recent_activity_panel(conn, today),
     )
-    recent_leaves = [dict(row) for row in cursor.fetchall()]
 
-    cursor.execute(
-        """SELECT a.emp_id, e.name, a.login_time
-           FROM attendance a JOIN employees e ON a.emp_id = e.emp_id
-           WHERE a.date = ? AND a.status = 'present' AND a.login_time IS NOT NULL
-           ORDER BY a.login_time DESC""",
-        (today,),
+    current_user = fragment_cache.get_or_render(
+        "employee", admin_emp_id, (versions[f"employee:{admin_emp_id}"],),
+        get_current_employee,
     )
-    today_attendance_list = [dict(row) for row in cursor.fetchall()]
-
-    # Build combined recent_activity list (leaves + today's check-ins, newest first)
-    recent_activity = []
-    for leave in recent_leaves:
-        applied_at = leave.get("applied_at") or ""
-        status_label = "applied for" if leave["status"] == "pending" else leave["status"]
-        recent_activity.append({
-            "type": "leave",
-            "message": f"{leave['name']} {status_label} {leave['type']} leave ({leave['from_date']} – {leave['to_date']})",
-            "time": applied_at[:16] if len(applied_at) >= 16 else applied_at,
-            "sort_key": applied_at,
-        })
-    for att in today_attendance_list:
-        login_time = att.get("login_time") or ""
-        recent_activity.append({
-            "type": "attendance",
-            "message": f"{att['name']} marked attendance",
-            "time": login_time[:5] if len(login_time) >= 5 else login_time,
-            "sort_key": f"{today} {login_time}",
-        })
-    recent_activity.sort(key=lambda x: x["sort_key"], reverse=True)
-    recent_activity = recent_activity[:8]
-
-    conn.close()
-
-    current_user = get_current_employee()
     if not current_user:
         current_user = {"name": "Admin", "emp_id": "ADMIN001", "department": "HR", "email": "admin@company.com", "join_date": "2020-01-01", "profile_image": None, "qualification": ""}
 
     return render_template(
         "admin_dashboard.html",
-        employees=employees,
-        pending_leaves=pending_leaves,
-        total_employees=total_employees,
-        pending_leaves_count=pending_leaves_count,
-        today_attendance=today_attendance,
+        total_employees=counters["total_employees"],
+        pending_leaves_count=counters["pending_leaves_count"],
+        today_attendance=counters["today_attendance"],
         current_user=current_user,
         admin_attendance_status=admin_attendance_status,
-        recent_activity=recent_activity,
+        recent_activity_panel=recent_activity_panel,
     )
 
 
@@ -223,73 +540,37 @@ def employee():
     if not emp_id:
         return redirect("/")
 
-    conn = get_connection()
+    conn = get_db()
     cursor = conn.cursor()
 
-    cursor.execute("SELECT * FROM employees WHERE emp_id=?", (emp_id,))
-    row = cursor.fetchone()
-    current_user = dict(row) if row else {}
-
-    cursor.execute(
-        "SELECT COUNT(*) FROM leaves WHERE emp_id=?",
-        (emp_id,),
+    versions = read_cache_versions(conn, (f"employee:{emp_id}", f"leaves:{emp_id}"))
+    current_user = fragment_cache.get_or_render(
+        "employee", emp_id, (versions[f"employee:{emp_id}"],),
+        get_current_employee,
     )
-    my_leaves_count = cursor.fetchone()[0]
-
-    cursor.execute(
-        "SELECT COUNT(*) FROM leaves WHERE emp_id=? AND status='pending'",
-        (emp_id,),
+    if not current_user:
+        return redirect("/")
+    leave_summary = fragment_cache.get_or_render(
+        "employee_leaves", emp_id, (versions[f"leaves:{emp_id}"],),
+        lambda: load_leave_summary(conn, emp_id),
     )
-    my_pending_leaves = cursor.fetchone()[0]
 
     today = datetime.now().strftime("%Y-%m-%d")
-    cursor.execute(
-        "SELECT * FROM attendance WHERE emp_id=? AND date=?",
-        (emp_id, today),
-    )
+    cursor.execute(ATTENDANCE_TODAY_SQL, (emp_id, today))
     att_row = cursor.fetchone()
 
-    # Auto-cap employee's daily work duration to 9 hours if needed
-    if att_row and att_row["login_time"] and not att_row["logout_time"]:
-        try:
-            login_dt = datetime.strptime(f"{today} {att_row['login_time']}", "%Y-%m-%d %H:%M:%S")
-            cutoff_dt = login_dt + timedelta(hours=9)
-            now_dt = datetime.now()
-            if now_dt >= cutoff_dt:
-                cutoff_time = cutoff_dt.strftime("%H:%M:%S")
-                cursor.execute(
-                    "UPDATE attendance SET logout_time=? WHERE emp_id=? AND date=?",
-                    (cutoff_time, emp_id, today),
-                )
-                conn.commit()
-                cursor.execute(
-                    "SELECT * FROM attendance WHERE emp_id=? AND date=?",
-                    (emp_id, today),
-                )
-                att_row = cursor.fetchone()
-        except ValueError:
-            pass
-
-    attendance_status = dict(att_row) if att_row else None
-
-    cursor.execute(
-        "SELECT * FROM leaves WHERE emp_id=? ORDER BY applied_at DESC",
-        (emp_id,),
-    )
-    my_leaves = [dict(row) for row in cursor.fetchall()]
-
-    conn.close()
-
-    if not current_user:
-        return redirect("/")
+    # Read-only: the cap sweeper writes the 9-hour logout, we only display it
+    attendance_status = effective_attendance(att_row)
 
     return render_template(
         "employee_dashboard.html",
         current_user=current_user,
-        my_leaves_count=my_leaves_count,
-        my_pending_leaves=my_pending_leaves,
+        my_leaves_count=leave_summary["my_leaves_count"],
+        my_pending_leaves=leave_summary["my_pending_leaves"],
+        leave_balances=leave_summary["leave_balances"],
+        holidays=holidays_in_year(conn, current_user.get("location"), datetime.now().year),
         attendance_status=attendance_status,
-        my_leaves=my_leaves,
+        leave_history_panel=leave_summary["leave_history_panel"],
     )
 
 
@@ -310,7 +591,7 @@ def add_employee():
     if not emp_id or not name or not email or not dept:
         return redirect("/admin#create-employee")
 
-    conn = get_connection()
+    conn = get_db()
     cursor = conn.cursor()
     try:
         cursor.execute(
@@ -319,18 +600,65 @@ def add_employee():
         )
         if emp_id and password:
             cursor.execute(
-                "INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)",
-                (emp_id, password, "EMPLOYEE"),
+                """INSERT INTO users (username, password, role)
+                   SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM users WHERE username=?)""",
+                (emp_id, password, "EMPLOYEE", emp_id),
             )
         conn.commit()
-    except sqlite3.IntegrityError:
+    except backend.IntegrityError:
         conn.rollback()
         flash("Employee ID already exists. Please use a different ID.")
-    finally:
-        conn.close()
+    else:
+        invalidate_identity(emp_id)
     return redirect("/admin")
 
 
+# Largest upload accepted by the bulk import (everything else keeps MAX_CONTENT_LENGTH)
+IMPORT_MAX_BYTES = int(os.environ.get("EMS_IMPORT_MAX_BYTES", 64 * 1024 * 1024))
+# Rejected rows returned inline; the CLI's --report has no limit
+IMPORT_REPORT_LIMIT = 1000
+
+
+def import_format(filename):
+    ext = filename.rsplit(".", 1)[-1].lower()
+    return ext if ext in ("csv", "json", "jsonl") else "csv"
+
+
+# BULK IMPORT EMPLOYEES
+@app.route("/admin/import/employees", methods=["POST"])
+def admin_import_employees():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    if session.get("role") != "ADMIN":
+        return jsonify({"error": "Admins only"}), 403
+
+    too_large = jsonify({"error": f"Import files are limited to {IMPORT_MAX_BYTES} bytes"}), 413
+    if request.content_length is not None and request.content_length > IMPORT_MAX_BYTES:
+        return too_large
+    # Parsed here instead of through request.files, which enforces the app-wide MAX_CONTENT_LENGTH.
+    # The body is read through a stream capped at IMPORT_MAX_BYTES (so chunked uploads are bounded
+    # too), and large files are spooled to disk, not memory.
+    try:
+        _, _, files = parse_form_data(
+            request.environ,
+            max_content_length=IMPORT_MAX_BYTES,
+            max_form_memory_size=request.max_form_memory_size,
+            max_form_parts=request.max_form_parts,
+        )
+    except RequestEntityTooLarge:
+        return too_large
+    file = files.get("file")
+    if not file or file.filename == "":
+        return jsonify({"error": "No file selected"}), 400
+
+    result = import_employees(get_db(), read_import_rows(file.stream, import_format(file.filename)))
+    return jsonify({
+        "inserted": result["inserted"],
+        "rejected": len(result["errors"]),
+        "errors": result["errors"][:IMPORT_REPORT_LIMIT],
+    })
+
+
 # APPLY LEAVE
 @app.route("/apply_leave", methods=["POST"])
 def apply_leave():
@@ -348,15 +676,22 @@ def apply_leave():
 
     if not from_date or not to_date:
         return jsonify({"error": "From and To dates required"}), 400
-
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO leaves (emp_id, from_date, to_date, type, reason) VALUES (?, ?, ?, ?, ?)",
-        (emp_id, from_date, to_date, leave_type, reason),
-    )
-    conn.commit()
-    conn.close()
+    try:
+        # Store canonical ISO dates so string comparisons and the leave_intervals triggers agree
+        from_date = datetime.strptime(from_date, "%Y-%m-%d").date().isoformat()
+        to_date = datetime.strptime(to_date, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+    if to_date < from_date:
+        return jsonify({"error": "To date must not be before From date"}), 400
+
+    # Refused if pending or approved leaves already hold any of these days
+    _, overlaps = create_leave(get_db(), emp_id, from_date, to_date, leave_type, reason)
+    if overlaps:
+        clash = overlaps[0]
+        return jsonify({
+            "error": f"Overlaps your {clash['status']} {clash['type']} leave from {clash['from_date']} to {clash['to_date']}",
+        }), 409
     return jsonify({"success": True})
 
 
@@ -365,11 +700,9 @@ def apply_leave():
 def approve_leave(leave_id):
     if "user" not in session:
         return redirect("/")
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE leaves SET status='approved' WHERE id=?", (leave_id,))
+    conn = get_db()
+    decide_leaves(conn, [leave_id], "approve")
     conn.commit()
-    conn.close()
     return redirect("/admin#leave-requests")
 
 
@@ -377,14 +710,40 @@ def approve_leave(leave_id):
 def reject_leave(leave_id):
     if "user" not in session:
         return redirect("/")
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE leaves SET status='rejected' WHERE id=?", (leave_id,))
+    conn = get_db()
+    decide_leaves(conn, [leave_id], "reject")
     conn.commit()
-    conn.close()
     return redirect("/admin#leave-requests")
 
 
+# API: Approve or reject many pending leaves in one transaction
+@app.route("/api/leaves/decisions", methods=["POST"])
+def api_leave_decisions():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    if session.get("role") != "ADMIN":
+        return jsonify({"error": "Admins only"}), 403
+
+    payload = request.get_json(silent=True) or {}
+    decision = payload.get("decision")
+    if decision not in DECISIONS:
+        return jsonify({"error": "decision must be 'approve' or 'reject'"}), 400
+    ids = payload.get("ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({"error": "ids must be a non-empty list of leave ids"}), 400
+    if len(ids) > MAX_DECISION_BATCH:
+        return jsonify({"error": f"At most {MAX_DECISION_BATCH} leaves per request"}), 400
+
+    conn = get_db()
+    results = decide_leaves(conn, ids, decision)
+    conn.commit()
+    return jsonify({
+        "decision": DECISIONS[decision],
+        "updated": sum(1 for result in results if result["ok"]),
+        "results": results,
+    })
+
+
 # ATTENDANCE
 @app.route("/attendance", methods=["POST"])
 def mark_attendance():
@@ -396,71 +755,40 @@ def mark_attendance():
         return jsonify({"error": "Invalid user"}), 401
 
     action = request.form.get("action", "login")  # login or logout
-    today = datetime.now().strftime("%Y-%m-%d")
-    now_time = datetime.now().strftime("%H:%M:%S")
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM attendance WHERE emp_id=? AND date=?", (emp_id, today))
-    row = cursor.fetchone()
-
-    # Auto-cap daily work duration to 9 hours.
-    # If someone stayed logged in and 9 hours have passed since login,
-    # automatically set logout_time to login_time + 9 hours.
-    if row and row["login_time"] and not row["logout_time"]:
+    if attendance_buffer is not None:
+        # Group commit: wait for the batch holding this event to commit
         try:
-            login_dt = datetime.strptime(f"{today} {row['login_time']}", "%Y-%m-%d %H:%M:%S")
-            cutoff_dt = login_dt + timedelta(hours=9)
-            now_dt = datetime.now()
-            if now_dt >= cutoff_dt:
-                cutoff_time = cutoff_dt.strftime("%H:%M:%S")
-                cursor.execute(
-                    "UPDATE attendance SET logout_time=? WHERE emp_id=? AND date=?",
-                    (cutoff_time, emp_id, today),
-                )
-                conn.commit()
-                cursor.execute("SELECT * FROM attendance WHERE emp_id=? AND date=?", (emp_id, today))
-                row = cursor.fetchone()
-        except ValueError:
-            # If time format is unexpected, skip auto logout rather than failing.
-            pass
-
-    if action == "login":
-        # If the employee has already completed 9 hours and has a logout_time,
-        # prevent another login for the same day.
-        if row and row["logout_time"]:
-            conn.close()
+            saved = attendance_buffer.submit(action, emp_id).result(timeout=WRITE_BEHIND_WAIT)
+        except FutureTimeout:
+            # Accepted but not committed yet (it is only queued in this worker's memory),
+            # so the times aren't known and the client should re-read before relying on it
+            return jsonify({
+                "success": True,
+                "pending": True,
+                "action": action,
+                "login_time": None,
+                "logout_time": None,
+            }), 202
+        except AttendanceWriteError:
             return jsonify({
                 "success": False,
-                "error": "Today's 9 working hours are already completed.",
-            }), 400
-
-        if row:
-            cursor.execute(
-                "UPDATE attendance SET status='present', login_time=? WHERE emp_id=? AND date=?",
-                (now_time, emp_id, today),
-            )
-        else:
-            cursor.execute(
-                "INSERT INTO attendance (emp_id, date, status, login_time) VALUES (?, ?, 'present', ?)",
-                (emp_id, today, now_time),
-            )
-    else:  # logout
-        if row:
-            cursor.execute(
-                "UPDATE attendance SET logout_time=? WHERE emp_id=? AND date=?",
-                (now_time, emp_id, today),
-            )
-
-    conn.commit()
+                "error": "Attendance could not be saved. Please try again.",
+            }), 503
+    else:
+        # One statement and one transaction per click; the 9-hour rule and the
+        # "already completed" guard are evaluated inside the UPSERT itself.
+        conn = get_db()
+        saved = check_in(conn, emp_id) if action == "login" else check_out(conn, emp_id)
+        conn.commit()
 
-    # Re-fetch to return authoritative times (after any auto-cap logic above)
-    cursor.execute("SELECT * FROM attendance WHERE emp_id=? AND date=?", (emp_id, today))
-    saved_row = cursor.fetchone()
-    conn.close()
+    if saved is None:
+        return jsonify({
+            "success": False,
+            "error": "Today's 9 working hours are already completed.",
+        }), 400
 
-    login_t = saved_row["login_time"] if saved_row else None
-    logout_t = saved_row["logout_time"] if saved_row else None
+    login_t, logout_t = saved
 
     return jsonify({
         "success": True,
@@ -470,6 +798,38 @@ def mark_attendance():
     })
 
 
+# Months that ended before yesterday can no longer change (the cap sweeper
+# closes yesterday's open rows shortly after midnight), so clients may keep them.
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def conditional_json(tags, build, extra="", immutable=False):
+    """Serve build()'s JSON with a strong ETag derived from cache_versions.
+
+    The ETag covers the versions of `tags`, the current user and `extra`, so a
+    matching If-None-Match gets a 304 after one cache_versions read, without
+    running build() or touching the tables behind it.
+    """
+    versions = read_cache_versions(get_db(), tags)
+    stamp = "|".join(f"{tag}={versions[tag]}" for tag in tags)
+    etag = hashlib.sha1(f"{session.get('emp_id')}|{stamp}|{extra}".encode()).hexdigest()
+
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.vary.add("Cookie")
+    response.cache_control.private = True
+    if immutable:
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Cacheable, but revalidated on every use
+        response.cache_control.no_cache = True
+    return response
+
+
 # API: Get attendance for calendar (month/year)
 @app.route("/api/attendance/<int:month>/<int:year>")
 def api_attendance(month, year):
@@ -482,30 +842,468 @@ def api_attendance(month, year):
 
     # month is 1-12 from URL
     from datetime import date
+    if not 1 <= month <= 12:
+        return jsonify({"error": "Invalid month"}), 400
+    # The end bound is the 1st of the next month, which must still be a valid date
+    if not 1 <= year <= 9999 or (year, month) == (9999, 12):
+        return jsonify({"error": "Invalid year"}), 400
     start_date = date(year, month, 1)
     if month == 12:
         end_date = date(year + 1, 1, 1)
     else:
         end_date = date(year, month + 1, 1)
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT date, status, login_time, logout_time FROM attendance WHERE emp_id=? AND date>=? AND date<?",
-        (emp_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
+    def build():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT date, status, login_time, logout_time FROM attendance WHERE emp_id=? AND date>=? AND date<?",
+            (emp_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
+        )
+        rows = cursor.fetchall()
+
+        attendance = {}
+        for row in rows:
+            attendance[row["date"]] = {
+                "status": row["status"],
+                "login_time": row["login_time"],
+                "logout_time": row["logout_time"],
+            }
+        return {"attendance": attendance}
+
+    closed = end_date <= date.today() - timedelta(days=1)
+    return conditional_json([f"attendance:{emp_id}:{start_date:%Y-%m}"], build, immutable=closed)
+
+
+# Longest span /api/attendance/range will serve in one response
+ATTENDANCE_RANGE_MAX_DAYS = 366
+
+
+def date_range_args():
+    """Parse ?from=&to= into dates. Returns (start, end, None) or (None, None, error response)."""
+    try:
+        start = datetime.strptime(request.args.get("from", ""), "%Y-%m-%d").date()
+        end = datetime.strptime(request.args.get("to", ""), "%Y-%m-%d").date()
+    except ValueError:
+        return None, None, (jsonify({"error": "from and to must be YYYY-MM-DD dates"}), 400)
+    if end < start or (end - start).days >= ATTENDANCE_RANGE_MAX_DAYS:
+        return None, None, (jsonify({"error": f"Range must cover 1 to {ATTENDANCE_RANGE_MAX_DAYS} days"}), 400)
+    return start, end, None
+
+
+# API: Attendance for an inclusive date range, columnar (see attendance.attendance_range)
+@app.route("/api/attendance/range")
+def api_attendance_range():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+
+    emp_id = get_emp_id()
+    if not emp_id:
+        return jsonify({"error": "Invalid user"}), 401
+
+    start, end, error = date_range_args()
+    if error:
+        return error
+
+    # One version tag per month the range touches
+    tags = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        tags.append(f"attendance:{emp_id}:{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    # Same rule as the monthly API: nothing up to the day before yesterday changes any more
+    closed = end <= datetime.now().date() - timedelta(days=2)
+    return conditional_json(tags, lambda: attendance_range(get_db(), emp_id, start, end), immutable=closed)
+
+
+# API: Whole-company attendance per day for the admin heatmap, from the daily counters
+@app.route("/api/admin/attendance/heatmap")
+def api_attendance_heatmap():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    if session.get("role") != "ADMIN":
+        return jsonify({"error": "Admins only"}), 403
+
+    start, end, error = date_range_args()
+    if error:
+        return error
+    return jsonify(read_attendance_heatmap(get_db(), start, end, request.args.get("department") or None))
+
+
+# API: Monthly attendance totals for a year, from the rollups (company, ?department= or ?emp_id=)
+@app.route("/api/admin/attendance/summary")
+def api_attendance_summary():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    if session.get("role") != "ADMIN":
+        return jsonify({"error": "Admins only"}), 403
+
+    year = request.args.get("year", datetime.now().year, type=int)
+    months = read_monthly_attendance(
+        get_db(), year, request.args.get("department") or None, request.args.get("emp_id") or None,
+    )
+    return jsonify({"year": year, "months": months})
+
+
+# API: Working days of leave taken per employee and type in one year (see calendars.leave_working_days)
+@app.route("/api/admin/leaves/working-days")
+def api_leave_working_days():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    if session.get("role") != "ADMIN":
+        return jsonify({"error": "Admins only"}), 403
+
+    year = request.args.get("year", datetime.now().year, type=int)
+    if not 1 <= year <= 9999:
+        return jsonify({"error": "Invalid year"}), 400
+    return jsonify(leave_working_days(get_db(), year, request.args.get("department") or None))
+
+
+# ADMIN EXPORT: stream CSV or XLSX straight from a database cursor
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@app.route("/admin/export/<entity>")
+def admin_export(entity):
+    if "user" not in session:
+        return redirect("/")
+    if session.get("role") != "ADMIN":
+        return "Admins only", 403
+    if entity not in EXPORTS:
+        return "Unknown export", 404
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_MIMETYPES:
+        return "format must be csv or xlsx", 400
+    start, end = request.args.get("from") or None, request.args.get("to") or None
+    try:
+        for value in (start, end):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return "from and to must be YYYY-MM-DD dates", 400
+
+    # The generator opens its own connection on the first chunk and closes it
+    # after the last, so the download never pins a pooled connection.
+    rows = export_rows(entity, start, end, request.args.getlist("department"))
+    columns = EXPORTS[entity][0]
+    body = stream_xlsx(columns, rows, entity.title()) if fmt == "xlsx" else stream_csv(columns, rows)
+    return app.response_class(
+        body,
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{entity}-{datetime.now():%Y%m%d}.{fmt}"'},
     )
-    rows = cursor.fetchall()
-    conn.close()
-
-    attendance = {}
-    for row in rows:
-        attendance[row["date"]] = {
-            "status": row["status"],
-            "login_time": row["login_time"],
-            "logout_time": row["logout_time"],
+
+
+# API: Who is on (pending or approved) leave on a given day
+@app.route("/api/leaves/out")
+def api_people_out():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    if session.get("role") != "ADMIN":
+        return jsonify({"error": "Admins only"}), 403
+    day = request.args.get("date") or datetime.now().strftime("%Y-%m-%d")
+    try:
+        people = people_out(get_db(), day, request.args.get("department") or None)
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    return jsonify({"date": day, "count": len(people), "people": people})
+
+
+# API: Peak number of people on leave on any day of a range
+@app.route("/api/leaves/coverage")
+def api_leave_coverage():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    if session.get("role") != "ADMIN":
+        return jsonify({"error": "Admins only"}), 403
+    start, end, error = date_range_args()
+    if error:
+        return error
+    peak, peak_date = max_concurrent_absences(get_db(), start, end, request.args.get("department") or None)
+    return jsonify({"from": start.isoformat(), "to": end.isoformat(), "max_concurrent": peak, "peak_date": peak_date})
+
+
+# API: Activity log, newest first, keyset-paginated on (occurred_at, id)
+@app.route("/api/activity")
+def api_activity():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+
+    limit = page_size_arg()
+    before_at = request.args.get("before_at")
+    before_id = request.args.get("before_id", type=int)
+    seek = bool(before_at and before_id is not None)
+    sql = activity_page_sql(limit + 1, seek)
+    params = [before_at, before_at, before_id] if seek else []
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    def build():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        events = [format_activity(row, today) for row in cursor.fetchall()]
+
+        has_more = len(events) > limit
+        events = events[:limit]
+        return {
+            "events": events,
+            "next_cursor": {"before_at": events[-1]["occurred_at"], "before_id": events[-1]["id"]} if has_more else None,
+        }
+
+    # Relative times ("Today", "Yesterday") depend on the date as well as the log
+    return conditional_json(["activity"], build, extra=today)
+
+
+# API: The logged-in employee's own leaves, newest first, keyset-paginated on (applied_at, id)
+@app.route("/api/me/leaves")
+def api_my_leaves():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    emp_id = get_emp_id()
+    if not emp_id:
+        return jsonify({"error": "Not logged in"}), 401
+
+    limit = page_size_arg()
+    before_at = request.args.get("before_at")
+    before_id = request.args.get("before_id", type=int)
+
+    def build():
+        leaves, next_cursor = leave_history_page(get_db(), emp_id, limit, before_at, before_id)
+        return {"leaves": leaves, "next_cursor": next_cursor}
+
+    return conditional_json([f"leaves:{emp_id}"], build)
+
+
+# Flag a pending leave when the requester plus colleagues already out reach this share of the department
+COVERAGE_WARN_RATIO = float(os.environ.get("EMS_COVERAGE_WARN_RATIO", 0.3))
+
+
+def pending_leaves_sql(where, limit):
+    """One page of the pending queue for the given WHERE terms, newest first."""
+    return (
+        """SELECT l.id, l.emp_id, l.type, l.from_date, l.to_date, l.reason, l.status, l.applied_at,
+                  e.name, e.department, e.location
+           FROM leaves l JOIN employees e ON e.emp_id = l.emp_id WHERE """
+        + " AND ".join(where)
+        + " ORDER BY l.applied_at DESC, l.id DESC " + backend.limit(limit)
+    )
+
+
+# Keyset condition for the pending queue; written so the applied_at bound can seek the (status, applied_at) index
+PENDING_LEAVES_SEEK = "l.applied_at <= ? AND (l.applied_at < ? OR l.id < ?)"
+
+
+# Facet -> (grouped column, FROM clause). Both group straight off an index, so no sort is needed:
+# type off (status, type, ...), department by walking employees' (department, emp_id) index
+# and probing (status, emp_id, ...) for each; CROSS JOIN keeps employees as the outer loop.
+PENDING_LEAVES_FACETS = {
+    "department": ("e.department", "employees e CROSS JOIN leaves l ON l.emp_id = e.emp_id"),
+    "type": ("l.type", "leaves l JOIN employees e ON e.emp_id = l.emp_id"),
+}
+
+
+def pending_leaves_facet_sql(facet, where):
+    """Pending-queue counts per department or type for the given WHERE terms."""
+    column, source = PENDING_LEAVES_FACETS[facet]
+    return f"SELECT {column}, COUNT(*) FROM {source} WHERE {' AND '.join(where)} GROUP BY {column} ORDER BY {column}"
+
+
+def pending_leaves_total_sql(where):
+    """Size of the pending queue for the given WHERE terms."""
+    return "SELECT COUNT(*) FROM leaves l JOIN employees e ON e.emp_id = l.emp_id WHERE " + " AND ".join(where)
+
+
+def pending_leave_filters(skip=None):
+    """WHERE terms and params for the pending-queue filters in the request, leaving out `skip`."""
+    where, params = ["l.status = 'pending'"], []
+    departments = request.args.getlist("department")
+    if departments and skip != "department":
+        where.append(f"e.department IN ({', '.join('?' * len(departments))})")
+        params.extend(departments)
+    types = request.args.getlist("type")
+    if types and skip != "type":
+        where.append(f"l.type IN ({', '.join('?' * len(types))})")
+        params.extend(types)
+    # Date window: leaves that overlap [from, to]
+    if request.args.get("from"):
+        where.append("l.to_date >= ?")
+        params.append(request.args["from"])
+    if request.args.get("to"):
+        where.append("l.from_date <= ?")
+        params.append(request.args["to"])
+    return where, params
+
+
+# API: Pending leave queue, oldest decisions last, keyset-paginated on (applied_at, id)
+@app.route("/api/leaves/pending")
+def api_pending_leaves():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    if session.get("role") != "ADMIN":
+        return jsonify({"error": "Admins only"}), 403
+
+    limit = page_size_arg()
+    where, params = pending_leave_filters()
+    before_at = request.args.get("before_at")
+    before_id = request.args.get("before_id", type=int)
+    if before_at and before_id is not None:
+        where.append(PENDING_LEAVES_SEEK)
+        params += [before_at, before_at, before_id]
+    sql = pending_leaves_sql(where, limit + 1)
+
+    def build():
+        conn = get_db()
+        leaves = [dict(row) for row in conn.execute(sql, params).fetchall()]
+        has_more = len(leaves) > limit
+        leaves = leaves[:limit]
+        # Per-row extras are bounded by the page size, not the backlog
+        annotate_working_days(conn, leaves)
+        coverage_warnings(conn, leaves, COVERAGE_WARN_RATIO)
+        for leave in leaves:
+            del leave["location"]
+        result = {
+            "leaves": leaves,
+            "next_cursor": {"before_at": leaves[-1]["applied_at"], "before_id": leaves[-1]["id"]} if has_more else None,
+        }
+        if before_at is None:
+            # Facet counts come with the first page only; each facet ignores its own filter
+            result["facets"] = {}
+            for facet in PENDING_LEAVES_FACETS:
+                facet_where, facet_params = pending_leave_filters(skip=facet)
+                rows = conn.execute(pending_leaves_facet_sql(facet, facet_where), facet_params).fetchall()
+                result["facets"][facet] = {row[0]: row[1] for row in rows}
+            total_where, total_params = pending_leave_filters()
+            result["total"] = conn.execute(pending_leaves_total_sql(total_where), total_params).fetchone()[0]
+        return result
+
+    return conditional_json(["pending_leaves", "employees", "calendars"], build)
+
+
+# Columns the directory API may return; salary and login names stay private
+EMPLOYEE_DIRECTORY_FIELDS = ("emp_id", "name", "email", "department", "join_date", "qualification", "profile_image")
+EMPLOYEE_DIRECTORY_DEFAULT_FIELDS = ("emp_id", "name", "department", "join_date")
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
+
+def page_size_arg():
+    """Read ?limit= clamped to 1..API_MAX_PAGE_SIZE."""
+    try:
+        limit = int(request.args.get("limit", API_PAGE_SIZE))
+    except ValueError:
+        limit = API_PAGE_SIZE
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+def employee_directory_sql(fields, where, limit):
+    # Column names come from EMPLOYEE_DIRECTORY_FIELDS, never from the request directly
+    sql = f"SELECT {', '.join(fields)} FROM employees"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY emp_id " + backend.limit(limit)
+
+
+# API: Employee directory, keyset-paginated on emp_id
+@app.route("/api/employees")
+def api_employees():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+
+    fields = [f for f in request.args.get("fields", "").split(",") if f] or list(EMPLOYEE_DIRECTORY_DEFAULT_FIELDS)
+    unknown = [f for f in fields if f not in EMPLOYEE_DIRECTORY_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown field(s): {', '.join(unknown)}"}), 400
+    if "emp_id" not in fields:
+        fields.insert(0, "emp_id")  # needed for the cursor
+
+    limit = page_size_arg()
+    where, params = [], []
+    departments = request.args.getlist("department")
+    if departments:
+        where.append(f"department IN ({', '.join('?' * len(departments))})")
+        params.extend(departments)
+    cursor_emp_id = request.args.get("cursor")
+    if cursor_emp_id:
+        where.append("emp_id > ?")
+        params.append(cursor_emp_id)
+
+    sql = employee_directory_sql(fields, where, limit + 1)
+
+    def build():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = [dict(row) for row in cursor.fetchall()]
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "employees": rows,
+            "next_cursor": rows[-1]["emp_id"] if has_more else None,
         }
 
-    return jsonify({"attendance": attendance})
+    return conditional_json(["employees"], build)
+
+
+def fts_prefix_query(text):
+    """Turn free text into an FTS5 query where every word must match as a prefix.
+
+    Single-character words are dropped: they match a large share of the term
+    list and would make each keystroke cost a scan instead of an index probe.
+    """
+    words = [word for word in re.findall(r"\w+", text) if len(word) >= 2]
+    return " ".join(f'"{word}"*' for word in words)
+
+
+# API: Employee typeahead search over the employees_fts index
+@app.route("/api/employees/search")
+def api_employees_search():
+    if "user" not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    match = fts_prefix_query(request.args.get("q", ""))
+    if not match:
+        return jsonify({"employees": []})
+    limit = min(page_size_arg(), 50) if "limit" in request.args else 10
+
+    def build():
+        conn = get_db()
+        cursor = conn.cursor()
+        # Rank only over the selective columns; a department word can match a
+        # quarter of the table and ranking all of those would blow the budget.
+        # The parentheses apply the column filter to every word, not just the first.
+        cursor.execute(
+            "SELECT rowid FROM employees_fts WHERE employees_fts MATCH ? ORDER BY rank LIMIT ?",
+            ("{name emp_id email} : (" + match + ")", limit),
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if len(ids) < limit:
+            # Top up with department/qualification matches in rowid order, which stops early
+            cursor.execute(
+                "SELECT rowid FROM employees_fts WHERE employees_fts MATCH ? LIMIT ?",
+                (match, limit + len(ids)),
+            )
+            ids += [row[0] for row in cursor.fetchall() if row[0] not in ids][:limit - len(ids)]
+        if not ids:
+            return {"employees": []}
+
+        cursor.execute(
+            f"SELECT id, emp_id, name, email, department FROM employees WHERE id IN ({', '.join('?' * len(ids))})",
+            ids,
+        )
+        by_id = {row["id"]: row for row in cursor.fetchall()}
+        employees = []
+        for rowid in ids:
+            if rowid in by_id:
+                employee = dict(by_id[rowid])
+                del employee["id"]
+                employees.append(employee)
+        return {"employees": employees}
+
+    return conditional_json(["employees"], build)
 
 
 # UPDATE PROFILE
@@ -523,14 +1321,14 @@ def update_profile():
     department = request.form.get("department")
     qualification = request.form.get("qualification", "")
 
-    conn = get_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute(
         "UPDATE employees SET name=?, email=?, department=?, qualification=? WHERE emp_id=?",
         (name, email, department, qualification, emp_id),
     )
     conn.commit()
-    conn.close()
+    invalidate_identity(session["user"], emp_id)
 
     if session.get("user") == "admin":
         return redirect("/admin#update-profile")
@@ -551,16 +1349,14 @@ def change_password():
     if new_pwd != confirm_pwd:
         return "Passwords do not match", 400
 
-    conn = get_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT 1 FROM users WHERE username=? AND password=?", (username, current_pwd))
     if not cursor.fetchone():
-        conn.close()
         return "Current password is incorrect", 400
 
     cursor.execute("UPDATE users SET password=? WHERE username=?", (new_pwd, username))
     conn.commit()
-    conn.close()
 
     if username == "admin":
         return redirect("/admin#change-password")
@@ -595,11 +1391,10 @@ def upload_profile_image():
 
     rel_path = f"uploads/{filename}"
 
-    conn = get_connection()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute("UPDATE employees SET profile_image=? WHERE emp_id=?", (rel_path, emp_id))
     conn.commit()
-    conn.close()
 
     return jsonify({"success": True, "url": f"/static/{rel_path}"})
 
@@ -0,0 +1,433 @@
+import base64
+import glob
+import json
+import logging
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import suppress
+from datetime import datetime, timedelta
+
+from db import get_connection
+from jobs import start_periodic
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Open attendance rows are closed out at login_time + WORKDAY_HOURS
+WORKDAY_HOURS = 9
+
+
+def cap_open_attendance(conn, now=None, emp_id=None):
+    """Set logout_time = login_time + 9h on every open row whose cutoff has passed.
+
+    One set-based UPDATE; pass emp_id to restrict it to a single employee.
+    Returns the number of rows capped. The caller commits.
+    """
+    now = now or datetime.now()
+    threshold = now - timedelta(hours=WORKDAY_HOURS)
+    sql = """UPDATE attendance SET logout_time = time(date || ' ' || login_time, ?)
+             WHERE logout_time IS NULL AND login_time IS NOT NULL
+               AND date <= ? AND date || ' ' || login_time <= ?"""
+    params = [f"+{WORKDAY_HOURS} hours", threshold.strftime("%Y-%m-%d"), threshold.strftime("%Y-%m-%d %H:%M:%S")]
+    if emp_id is not None:
+        sql += " AND emp_id = ?"
+        params.append(emp_id)
+    return conn.execute(sql, params).rowcount
+
+
+def check_in(conn, emp_id, now=None):
+    """Record a login for today in one UPSERT and return (login_time, logout_time).
+
+    An existing row is only updated while it is still open and inside its
+    9-hour window; otherwise nothing is written and None is returned, which
+    means today's hours are already completed. The caller commits.
+    """
+    now = now or datetime.now()
+    rows = conn.execute(
+        """INSERT INTO attendance (emp_id, date, status, login_time) VALUES (?, ?, 'present', ?)
+           ON CONFLICT(emp_id, date) DO UPDATE SET status='present', login_time=excluded.login_time
+           WHERE attendance.logout_time IS NULL
+             AND (attendance.login_time IS NULL
+                  OR datetime(attendance.date || ' ' || attendance.login_time, ?) > ?)
+           RETURNING login_time, logout_time""",
+        (emp_id, now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"),
+         f"+{WORKDAY_HOURS} hours", now.strftime("%Y-%m-%d %H:%M:%S")),
+    ).fetchall()
+    return tuple(rows[0]) if rows else None
+
+
+def check_out(conn, emp_id, now=None):
+    """Record a logout for today, clamped to login_time + 9h, and return (login_time, logout_time).
+
+    Returns (None, None) when there is no row for today. The caller commits.
+    """
+    now = now or datetime.now()
+    rows = conn.execute(
+        """UPDATE attendance SET logout_time = CASE
+               WHEN login_time IS NOT NULL AND datetime(date || ' ' || login_time, ?) <= ?
+               THEN time(date || ' ' || login_time, ?)
+               ELSE ? END
+           WHERE emp_id=? AND date=?
+           RETURNING login_time, logout_time""",
+        (f"+{WORKDAY_HOURS} hours", now.strftime("%Y-%m-%d %H:%M:%S"), f"+{WORKDAY_HOURS} hours",
+         now.strftime("%H:%M:%S"), emp_id, now.strftime("%Y-%m-%d")),
+    ).fetchall()
+    return tuple(rows[0]) if rows else (None, None)
+
+
+def effective_attendance(row, now=None):
+    """Return row as a dict, showing the 9-hour cap the sweeper will apply without writing it."""
+    if row is None:
+        return None
+    att = dict(row)
+    if att.get("login_time") and not att.get("logout_time"):
+        try:
+            login_dt = datetime.strptime(f"{att['date']} {att['login_time']}", "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return att
+        cutoff_dt = login_dt + timedelta(hours=WORKDAY_HOURS)
+        if (now or datetime.now()) >= cutoff_dt:
+            att["logout_time"] = cutoff_dt.strftime("%H:%M:%S")
+    return att
+
+
+def _minutes(hhmmss):
+    if not hhmmss:
+        return None
+    hours, minutes = hhmmss.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+ATTENDANCE_RANGE_SQL = """SELECT date, login_time, logout_time FROM attendance
+    WHERE emp_id=? AND date>=? AND date<=? AND status='present' ORDER BY date"""
+
+
+def attendance_range(conn, emp_id, start, end):
+    """Columnar attendance for start..end (inclusive dates) in one indexed read.
+
+    Day i of the range is start + i. `present` is a base64 bitmap with bit
+    i (LSB first within each byte) set when the employee was present that
+    day; `login` and `logout` hold minutes since midnight for the present
+    days only, in day order (logout is None while still open).
+    """
+    days = (end - start).days + 1
+    bitmap = bytearray((days + 7) // 8)
+    login, logout = [], []
+    rows = conn.execute(
+        ATTENDANCE_RANGE_SQL,
+        (emp_id, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")),
+    )
+    for row in rows:
+        offset = (datetime.strptime(row[0], "%Y-%m-%d").date() - start).days
+        bitmap[offset // 8] |= 1 << (offset % 8)
+        login.append(_minutes(row[1]))
+        logout.append(_minutes(row[2]))
+    return {
+        "from": start.strftime("%Y-%m-%d"),
+        "days": days,
+        "present": base64.b64encode(bytes(bitmap)).decode("ascii"),
+        "login": login,
+        "logout": logout,
+    }
+
+
+def sweep_once(now=None):
+    """Cap all expired open rows in one transaction on a dedicated connection."""
+    conn = get_connection()
+    try:
+        capped = cap_open_attendance(conn, now)
+        conn.commit()
+        return capped
+    finally:
+        conn.close()
+
+
+def _sweep_and_log():
+    capped = sweep_once()
+    if capped:
+        logger.info("Auto-capped %d attendance row(s) at %d hours", capped, WORKDAY_HOURS)
+
+
+def start_cap_sweeper(interval):
+    """Run sweep_once() every `interval` seconds on a daemon thread (once per process)."""
+    return start_periodic("attendance-cap-sweeper", _sweep_and_log, interval)
+
+
+class AttendanceWriteError(Exception):
+    """A write-behind event that kept failing and was moved to a dead-letter file instead of being applied."""
+
+
+def _lock_spill(f, blocking=False):
+    """flock() an open spill file; False if another process holds it. Always True where flock is missing."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+
+class WriteBehindBuffer:
+    """Batches check-in/check-out events into shared transactions (group commit).
+
+    Request threads submit() an event and wait on the returned future. A
+    single writer thread takes everything queued (up to max_batch events),
+    optionally lingering flush_interval seconds for stragglers, and applies
+    the batch with check_in()/check_out() in one transaction. Events that
+    arrive while a batch is committing form the next batch, so under a
+    storm the batch size grows with load even with no linger.
+
+    Guarantees:
+    - A future only resolves after its batch has committed, so the
+      login/logout times handed back to the caller are durable and
+      authoritative (the same values a direct write would return).
+    - Until then an event only exists in this process's memory; a caller
+      that stops waiting early has no durability guarantee.
+    - Events are applied in submission order within a process. Events from
+      different worker processes are ordered by whichever batch commits first.
+    - Before a batch is applied it is appended to this process's spill file
+      and fsynced; the file is truncated once the batch commits. The owner
+      holds an flock() on its spill file for its whole life, and a starting
+      buffer replays only the spill files it can lock, i.e. those whose
+      owner has died. Replay is at-least-once, which is safe because
+      re-applying an event with the same timestamp leaves the row unchanged.
+    - A batch that fails is retried with exponential backoff. After
+      MAX_FLUSH_ATTEMPTS its events are applied one at a time; those that
+      still fail are written to a dead-letter file and their futures raise
+      AttendanceWriteError, so one bad event can't stall the queue.
+    """
+
+    MAX_FLUSH_ATTEMPTS = 5
+    # Backoff between attempts starts at max(flush_interval, this) and doubles up to RETRY_MAX_DELAY
+    RETRY_MIN_DELAY = 0.05
+    RETRY_MAX_DELAY = 5
+
+    def __init__(self, spill_dir, flush_interval=0.0, max_batch=500, connect=get_connection):
+        self.spill_dir = spill_dir
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.connect = connect
+        self.spill_path = os.path.join(spill_dir, f"attendance-spill-{os.getpid()}.jsonl")
+        self._queue = queue.Queue()
+        self._thread = None
+        self._conn = None
+        self._spill = None
+
+    def start(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._conn = self.connect()
+        self._replay_abandoned_spills()
+        self._spill = self._open_spill()
+        self._thread = threading.Thread(target=self._run, name="attendance-write-behind", daemon=True)
+        self._thread.start()
+        return self
+
+    def _open_spill(self):
+        while True:
+            spill = open(self.spill_path, "a+", encoding="utf-8")
+            _lock_spill(spill, blocking=True)
+            if fcntl is None:
+                return spill
+            # A starting process may have replayed and unlinked the path while we waited for the lock
+            try:
+                if os.stat(self.spill_path).st_ino == os.fstat(spill.fileno()).st_ino:
+                    return spill
+            except FileNotFoundError:
+                pass
+            spill.close()
+
+    def submit(self, action, emp_id, now=None):
+        """Queue a "login"/"logout" event; the future resolves to check_in()/check_out()'s result."""
+        future = Future()
+        event = {"action": action, "emp_id": emp_id, "at": (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")}
+        self._queue.put((event, future))
+        return future
+
+    def close(self, timeout=5):
+        """Flush whatever is queued and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        empty = os.fstat(self._spill.fileno()).st_size == 0
+        self._spill.close()
+        self._conn.close()
+        if empty:
+            with suppress(FileNotFoundError):
+                os.remove(self.spill_path)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            stopping = item is None
+            batch = [] if stopping else [item]
+            deadline = time.monotonic() + self.flush_interval
+            # Take everything already queued, lingering up to flush_interval for more
+            while not stopping and len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch):
+        events = [event for event, _ in batch]
+        self._spill.write("".join(json.dumps(event) + "\n" for event in events))
+        self._spill.flush()
+        os.fsync(self._spill.fileno())
+        delay = max(self.flush_interval, self.RETRY_MIN_DELAY)
+        for attempt in range(1, self.MAX_FLUSH_ATTEMPTS + 1):
+            try:
+                results = self._apply(events)
+                break
+            except Exception:
+                self._conn.rollback()
+                logger.exception(
+                    "Attendance write-behind batch of %d failed (attempt %d of %d)",
+                    len(batch), attempt, self.MAX_FLUSH_ATTEMPTS,
+                )
+                if attempt < self.MAX_FLUSH_ATTEMPTS:
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.RETRY_MAX_DELAY)
+        else:
+            results = self._apply_each(events)
+        self._spill.truncate(0)
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, AttendanceWriteError):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _apply(self, events):
+        results = []
+        for event in events:
+            at = datetime.strptime(event["at"], "%Y-%m-%d %H:%M:%S")
+            if event["action"] == "login":
+                results.append(check_in(self._conn, event["emp_id"], at))
+            else:
+                results.append(check_out(self._conn, event["emp_id"], at))
+        self._conn.commit()
+        return results
+
+    def _apply_each(self, events):
+        """Apply events in their own transactions; dead-letter the ones that fail."""
+        results, failed = [], []
+        for event in events:
+            try:
+                results.extend(self._apply([event]))
+            except Exception as e:
+                self._conn.rollback()
+                failed.append(dict(event, error=repr(e)))
+                results.append(AttendanceWriteError(f"{event['action']} for {event['emp_id']} failed: {e!r}"))
+        if failed:
+            path = os.path.join(
+                self.spill_dir, f"attendance-deadletter-{os.getpid()}-{datetime.now():%Y%m%d%H%M%S%f}.jsonl",
+            )
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("".join(json.dumps(event) + "\n" for event in failed))
+                f.flush()
+                os.fsync(f.fileno())
+            logger.error("Moved %d failing attendance event(s) to %s", len(failed), path)
+        return results
+
+    def _replay_abandoned_spills(self):
+        for path in glob.glob(os.path.join(self.spill_dir, "attendance-spill-*.jsonl")):
+            if fcntl is None:
+                # No flock on Windows, but a file its live owner still has open can't be renamed
+                claimed = f"{path}.replay-{os.getpid()}"
+                try:
+                    os.replace(path, claimed)
+                except OSError:
+                    continue
+                path = claimed
+            try:
+                f = open(path, "r+", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            try:
+                if not _lock_spill(f):
+                    continue  # its owner is alive
+                # A torn final line can only belong to a batch that never committed
+                events = [json.loads(line) for line in f if line.endswith("\n")]
+                if events:
+                    self._apply(events)
+                    logger.warning("Replayed %d attendance event(s) from %s", len(events), path)
+                # Emptied first, so a process that opened it before the unlink finds nothing to replay
+                f.truncate(0)
+                if fcntl is not None:
+                    with suppress(FileNotFoundError):
+                        os.remove(path)  # while still locked
+            finally:
+                f.close()
+            if fcntl is None:
+                os.remove(path)
+
+
+def benchmark_check_ins(events=2000, threads=16, flush_interval=0.0, max_batch=500):
+    """Measure sustained check-ins/second with a transaction per request vs. write-behind batching.
+
+    Runs against scratch SQLite databases, so the live database is not touched.
+    Returns {"direct": events_per_second, "write_behind": events_per_second}.
+    """
+    from db import migrate
+
+    def scratch_db(tmp, name):
+        path = os.path.join(tmp, name)
+        migrate(path=path)
+
+        def connect():
+            conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout = 30000;")
+            return conn
+        return connect
+
+    def run(worker):
+        chunks = [range(i, events, threads) for i in range(threads)]
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        return events / (time.perf_counter() - started)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        connect = scratch_db(tmp, "direct.db")
+
+        def direct(chunk):
+            conn = connect()
+            for i in chunk:
+                check_in(conn, f"BENCH{i:07d}")
+                conn.commit()
+            conn.close()
+        results["direct"] = run(direct)
+
+        buffer = WriteBehindBuffer(os.path.join(tmp, "spill"), flush_interval, max_batch,
+                                   connect=scratch_db(tmp, "write_behind.db")).start()
+
+        def batched(chunk):
+            for i in chunk:
+                buffer.submit("login", f"BENCH{i:07d}").result()
+        results["write_behind"] = run(batched)
+        buffer.close()
+    return results
@@ -0,0 +1,156 @@
+import logging
+from datetime import date
+
+from calendars import annotate_working_days
+from db import backend, get_connection
+from jobs import start_periodic
+
+logger = logging.getLogger(__name__)
+
+
+def post_leave_debits(conn, leave_ids):
+    """Debit the balances for newly approved leaves; call inside the approving transaction.
+
+    A leave uses the working days of its employee's business calendar.
+    Each leave is debited at most once (idx_leave_ledger_leave), so a retry
+    posts nothing twice. Returns the number of leaves debited.
+    """
+    if not leave_ids:
+        return 0
+    leaves = [
+        dict(row) for row in conn.execute(
+            f"""SELECT l.id, l.emp_id, l.type, l.from_date, l.to_date, e.location FROM leaves l
+                LEFT JOIN employees e ON e.emp_id = l.emp_id
+                WHERE l.id IN ({', '.join('?' * len(leave_ids))}) AND l.status = 'approved'""",
+            list(leave_ids),
+        ).fetchall()
+    ]
+    debits = [
+        (leave["emp_id"], leave["type"], -leave["working_days"], leave["id"])
+        for leave in annotate_working_days(conn, leaves) if leave["working_days"] is not None
+    ]
+    if debits:
+        backend.executemany(
+            conn,
+            """INSERT INTO leave_ledger (emp_id, type, delta, kind, leave_id) VALUES (?, ?, ?, 'leave', ?)
+               ON CONFLICT DO NOTHING""",
+            debits,
+        )
+    return len(debits)
+
+
+def _month_end(month):
+    year, number = int(month[:4]), int(month[5:7])
+    following = date(year + number // 12, number % 12 + 1, 1)
+    return date.fromordinal(following.toordinal() - 1).isoformat()
+
+
+def accrual_pending(conn, month):
+    """True if some employee who had joined by the end of `month` lacks one of its accruals.
+
+    A read-only probe of idx_leave_ledger_accrual, so it takes no write lock.
+    """
+    return conn.execute(
+        """SELECT 1 FROM employees e CROSS JOIN leave_policies p
+           WHERE (e.join_date IS NULL OR e.join_date = '' OR e.join_date <= ?)
+             AND NOT EXISTS (SELECT 1 FROM leave_ledger l WHERE l.kind = 'accrual'
+                             AND l.emp_id = e.emp_id AND l.type = p.type AND l.period = ?)
+           LIMIT 1""",
+        (_month_end(month), month),
+    ).fetchone() is not None
+
+
+def accrue_leave(conn, month):
+    """Credit one month's accrual (YYYY-MM) to every employee who had joined by its end.
+
+    The credit is clipped so a balance never grows past the policy cap.
+    Months already credited are skipped per employee and type, so running
+    this again, or from several processes, is harmless. The write lock is
+    only taken when accrual_pending() finds something to credit, so the
+    hourly check in every worker is normally a read. Returns the number
+    of accruals posted.
+    """
+    if not accrual_pending(conn, month):
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.execute(
+            """INSERT INTO leave_ledger (emp_id, type, delta, kind, period)
+               SELECT e.emp_id, p.type,
+                      CASE WHEN p.max_balance IS NULL THEN p.monthly_accrual
+                           ELSE MAX(0, MIN(p.monthly_accrual, p.max_balance - COALESCE(b.balance, 0))) END,
+                      'accrual', ?
+               FROM employees e CROSS JOIN leave_policies p
+               LEFT JOIN leave_balances b ON b.emp_id = e.emp_id AND b.type = p.type
+               WHERE e.join_date IS NULL OR e.join_date = '' OR e.join_date <= ?
+               ON CONFLICT DO NOTHING""",
+            (month, _month_end(month)),
+        )
+        posted = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return posted
+
+
+def rebuild_leave_balances(conn):
+    """Recompute leave_balances from the ledger and return [(emp_id, type, stored, actual)] that drifted."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        actual = {
+            (row[0], row[1]): row[2]
+            for row in conn.execute("SELECT emp_id, type, SUM(delta) FROM leave_ledger GROUP BY emp_id, type")
+        }
+        stored = {(row[0], row[1]): row[2] for row in conn.execute("SELECT emp_id, type, balance FROM leave_balances")}
+        drift = [
+            (emp_id, leave_type, stored.get((emp_id, leave_type), 0), actual.get((emp_id, leave_type), 0))
+            for emp_id, leave_type in sorted(set(actual) | set(stored))
+            # Sums of fractional accruals may differ in the last bits; that isn't drift
+            if abs(stored.get((emp_id, leave_type), 0) - actual.get((emp_id, leave_type), 0)) > 1e-9
+        ]
+        conn.execute("DELETE FROM leave_balances")
+        conn.executemany(
+            "INSERT INTO leave_balances (emp_id, type, balance) VALUES (?, ?, ?)",
+            [(emp_id, leave_type, balance) for (emp_id, leave_type), balance in actual.items()],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return drift
+
+
+def read_leave_balances(conn, emp_id):
+    """Remaining days per leave type for one employee: [{"type", "balance"}], every policy type listed."""
+    rows = conn.execute(
+        """SELECT p.type, COALESCE(b.balance, 0) FROM leave_policies p
+           LEFT JOIN leave_balances b ON b.emp_id = ? AND b.type = p.type
+           ORDER BY p.type""",
+        (emp_id,),
+    ).fetchall()
+    return [{"type": row[0], "balance": row[1]} for row in rows]
+
+
+def accrue_current_month():
+    """Post this month's accrual on a dedicated connection; returns how many were new."""
+    conn = get_connection()
+    try:
+        return accrue_leave(conn, date.today().strftime("%Y-%m"))
+    finally:
+        conn.close()
+
+
+def _accrue_and_log():
+    posted = accrue_current_month()
+    if posted:
+        logger.info("Posted %d leave accrual(s)", posted)
+
+
+def start_leave_accrual(interval):
+    """Run accrue_current_month() every `interval` seconds on a daemon thread (once per process).
+
+    Checking often is cheap because credited months are skipped, and it
+    means employees who join mid-month get that month's accrual too.
+    """
+    return start_periodic("leave-accrual", _accrue_and_log, interval)
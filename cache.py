@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-process LRU mapping with explicit invalidation."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FragmentCache:
+    """Caches rendered template fragments under version-stamped keys.
+
+    Keys embed the cache_versions of every tag a fragment depends on (see
+    migrations/0010_cache_versions.sql), so a write anywhere bumps the
+    version and the next read simply misses; stale entries age out of the
+    LRU. `backend` is anything with get(key) and set(key, value) taking
+    string keys, e.g. a small adapter around a shared memcached client.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else LRUCache()
+
+    def get_or_render(self, panel, scope, versions, render):
+        key = f"{panel}:{scope}:" + ":".join(str(v) for v in versions)
+        value = self.backend.get(key)
+        if value is None:
+            value = render()
+            self.backend.set(key, value)
+        return value
+
+
+def read_cache_versions(conn, tags):
+    """Return {tag: version} for `tags` plus "activity", in a single query."""
+    rows = conn.execute(
+        f"""SELECT 'activity', COALESCE(MAX(id), 0) FROM activity_events
+            UNION ALL
+            SELECT tag, version FROM cache_versions WHERE tag IN ({', '.join('?' * len(tags))})""",
+        list(tags),
+    ).fetchall()
+    versions = dict.fromkeys(tags, 0)
+    versions.update((row[0], row[1]) for row in rows)
+    return versions
@@ -0,0 +1,148 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+# Calendar used for employees with no location, or one that has no calendar row
+DEFAULT_LOCATION = "default"
+
+
+class BusinessCalendar:
+    """Working-day arithmetic for one weekmask and holiday list, in O(log holidays) per interval.
+
+    Works on proleptic ordinals (date.toordinal()), the same closed-form
+    approach as numpy.busday_count: whole weeks times working days per
+    week, a lookup table for the leftover days, minus the holidays found
+    by bisecting a sorted array. No per-day loops, so counting millions of
+    intervals costs millions of table lookups, not days.
+    """
+
+    def __init__(self, weekmask="1111100", holidays=()):
+        self.weekmask = weekmask
+        working = [ch == "1" for ch in weekmask]
+        self.per_week = sum(working)
+        # prefix[k] = working days among the first k days of a Monday-started fortnight
+        self._prefix = [0]
+        for k in range(14):
+            self._prefix.append(self._prefix[-1] + working[k % 7])
+        # Only holidays on working weekdays remove a day; keep just those, sorted and unique
+        self.holidays = sorted({
+            day.toordinal() if isinstance(day, date) else date.fromisoformat(day).toordinal()
+            for day in holidays
+        })
+        self.holidays = [day for day in self.holidays if working[(day - 1) % 7]]
+
+    def count(self, first, last):
+        """Working days in [first, last], both inclusive ordinals; 0 if last < first."""
+        if last < first:
+            return 0
+        weeks, extra = divmod(last - first + 1, 7)
+        weekday = (first - 1) % 7  # ordinal 1 (0001-01-01) was a Monday
+        holidays = self.holidays
+        return (weeks * self.per_week + self._prefix[weekday + extra] - self._prefix[weekday]
+                - (bisect_right(holidays, last) - bisect_left(holidays, first)))
+
+    def working_days(self, from_date, to_date):
+        """Working days between two YYYY-MM-DD strings or dates, inclusive."""
+        if isinstance(from_date, str):
+            from_date, to_date = date.fromisoformat(from_date), date.fromisoformat(to_date)
+        return self.count(from_date.toordinal(), to_date.toordinal())
+
+
+_loaded = (None, {})
+_loaded_lock = threading.Lock()
+
+
+def load_calendars(conn):
+    """Return {location: BusinessCalendar}, rebuilt only when the 'calendars' cache tag moves."""
+    global _loaded
+    row = conn.execute("SELECT version FROM cache_versions WHERE tag = 'calendars'").fetchone()
+    version = row[0] if row else 0
+    loaded_version, calendars = _loaded
+    if loaded_version == version:
+        return calendars
+
+    holidays = {}
+    for location, day in conn.execute("SELECT location, date FROM holidays ORDER BY location, date"):
+        holidays.setdefault(location, []).append(day)
+    calendars = {
+        location: BusinessCalendar(weekmask, holidays.get(location, ()))
+        for location, weekmask in conn.execute("SELECT location, weekmask FROM calendars")
+    }
+    calendars.setdefault(DEFAULT_LOCATION, BusinessCalendar())
+    with _loaded_lock:
+        _loaded = (version, calendars)
+    return calendars
+
+
+def calendar_for(calendars, location):
+    return calendars.get(location) or calendars[DEFAULT_LOCATION]
+
+
+def annotate_working_days(conn, leaves):
+    """Set leave["working_days"] on leave dicts that carry from_date, to_date and location."""
+    calendars = load_calendars(conn)
+    for leave in leaves:
+        try:
+            leave["working_days"] = calendar_for(calendars, leave.get("location")).working_days(
+                leave["from_date"], leave["to_date"],
+            )
+        except ValueError:
+            leave["working_days"] = None  # legacy row with unparseable dates
+    return leaves
+
+
+def leave_working_days(conn, year, department=None, statuses=("approved",)):
+    """Working days taken per employee and leave type in one year, leaves clipped to the year.
+
+    Returns {"year", "emp_id": [...], "type": [...], "leaves": [...], "working_days": [...]}
+    in columns, ordered by emp_id and type. Dates are converted once per row
+    and counted with BusinessCalendar.count, so the cost is one pass over
+    the year's leaves.
+    """
+    year_first, year_last = date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()
+    sql = f"""SELECT l.emp_id, l.type, l.from_date, l.to_date, e.location FROM leaves l
+              LEFT JOIN employees e ON e.emp_id = l.emp_id
+              WHERE l.status IN ({', '.join('?' * len(statuses))})
+                AND l.from_date <= ? AND l.to_date >= ?"""
+    params = [*statuses, f"{year:04d}-12-31", f"{year:04d}-01-01"]
+    if department:
+        sql += " AND e.department = ?"
+        params.append(department)
+
+    calendars = load_calendars(conn)
+    fromisoformat = date.fromisoformat
+    totals = {}
+    for emp_id, leave_type, from_date, to_date, location in conn.execute(sql, params):
+        try:
+            first = max(fromisoformat(from_date).toordinal(), year_first)
+            last = min(fromisoformat(to_date).toordinal(), year_last)
+        except ValueError:
+            continue
+        days = calendar_for(calendars, location).count(first, last)
+        entry = totals.get((emp_id, leave_type))
+        if entry is None:
+            totals[(emp_id, leave_type)] = [1, days]
+        else:
+            entry[0] += 1
+            entry[1] += days
+
+    keys = sorted(totals)
+    return {
+        "year": year,
+        "emp_id": [key[0] for key in keys],
+        "type": [key[1] for key in keys],
+        "leaves": [totals[key][0] for key in keys],
+        "working_days": [totals[key][1] for key in keys],
+    }
+
+
+def holidays_in_year(conn, location, year):
+    """Holidays on the employee's calendar in `year`, as [{"date", "name"}]."""
+    calendars = load_calendars(conn)
+    if location not in calendars:
+        location = DEFAULT_LOCATION
+    rows = conn.execute(
+        "SELECT date, name FROM holidays WHERE location = ? AND date BETWEEN ? AND ? ORDER BY date",
+        (location, f"{year:04d}-01-01", f"{year:04d}-12-31"),
+    ).fetchall()
+    return [{"date": row[0], "name": row[1]} for row in rows]
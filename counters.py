@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+
+# Recomputes every counter from the base tables; see migrations/0008_dashboard_counters.sql
+# and 0012_attendance_heatmap_counters.sql
+COUNTER_SOURCES = """
+    SELECT 'total_employees' AS counter, '' AS scope, COUNT(*) AS value FROM employees
+    UNION ALL
+    SELECT 'pending_leaves', '', COUNT(*) FROM leaves WHERE status = 'pending'
+    UNION ALL
+    SELECT 'present', date, COUNT(*) FROM attendance WHERE status = 'present' GROUP BY date
+    UNION ALL
+    SELECT 'late', date, COUNT(*) FROM attendance WHERE status = 'present' AND login_time > '09:30:00' GROUP BY date
+    UNION ALL
+    SELECT 'present:' || e.department, a.date, COUNT(*) FROM attendance a JOIN employees e ON e.emp_id = a.emp_id
+    WHERE a.status = 'present' GROUP BY e.department, a.date
+    UNION ALL
+    SELECT 'late:' || e.department, a.date, COUNT(*) FROM attendance a JOIN employees e ON e.emp_id = a.emp_id
+    WHERE a.status = 'present' AND a.login_time > '09:30:00' GROUP BY e.department, a.date
+"""
+
+DASHBOARD_COUNTERS_SQL = """SELECT counter, value FROM dashboard_counters
+    WHERE (counter IN ('total_employees', 'pending_leaves') AND scope = '')
+       OR (counter = 'present' AND scope = ?)"""
+
+HEATMAP_COUNTERS_SQL = "SELECT counter, scope, value FROM dashboard_counters WHERE counter IN (?, ?) AND scope BETWEEN ? AND ?"
+
+
+def read_dashboard_counters(conn, today):
+    """Return {"total_employees", "pending_leaves_count", "today_attendance"} in one indexed read."""
+    rows = conn.execute(DASHBOARD_COUNTERS_SQL, (today,)).fetchall()
+    values = {row[0]: row[1] for row in rows}
+    return {
+        "total_employees": values.get("total_employees", 0),
+        "pending_leaves_count": values.get("pending_leaves", 0),
+        "today_attendance": values.get("present", 0),
+    }
+
+
+def read_attendance_heatmap(conn, start, end, department=None):
+    """Per-day present/late/absent counts for start..end (inclusive dates), optionally one department.
+
+    Returns columnar lists indexed by day offset from start. Absent is the
+    headcount on that day (employees whose join_date is not later) minus
+    present, so weekends and holidays show as absent; callers decide how to
+    shade them.
+    """
+    suffix = f":{department}" if department else ""
+    days = (end - start).days + 1
+    counts = {"present": [0] * days, "late": [0] * days}
+    rows = conn.execute(
+        HEATMAP_COUNTERS_SQL,
+        ("present" + suffix, "late" + suffix, start.isoformat(), end.isoformat()),
+    )
+    for counter, scope, value in rows:
+        offset = (date.fromisoformat(scope) - start).days
+        counts[counter.split(":", 1)[0]][offset] = value
+
+    # Headcount per day from a running total over join dates
+    sql = "SELECT join_date, COUNT(*) FROM employees"
+    params = []
+    if department:
+        sql += " WHERE department = ?"
+        params.append(department)
+    joined = conn.execute(sql + " GROUP BY join_date ORDER BY join_date", params).fetchall()
+    headcount = [0] * days
+    running, i = 0, 0
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        while i < len(joined) and (joined[i][0] is None or joined[i][0] <= day):
+            running += joined[i][1]
+            i += 1
+        headcount[offset] = running
+
+    return {
+        "from": start.isoformat(),
+        "days": days,
+        "present": counts["present"],
+        "late": counts["late"],
+        "absent": [max(total - present, 0) for total, present in zip(headcount, counts["present"])],
+    }
+
+
+def reconcile_dashboard_counters(conn):
+    """Recompute all counters from scratch and return [(counter, scope, stored, actual)] that drifted.
+
+    Runs under BEGIN IMMEDIATE so no write can slip in between the recount
+    and the rewrite.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        actual = {(row[0], row[1]): row[2] for row in conn.execute(COUNTER_SOURCES)}
+        stored = {(row[0], row[1]): row[2] for row in conn.execute("SELECT counter, scope, value FROM dashboard_counters")}
+        drift = [
+            (counter, scope, stored.get((counter, scope), 0), actual.get((counter, scope), 0))
+            for counter, scope in sorted(set(actual) | set(stored))
+            if stored.get((counter, scope), 0) != actual.get((counter, scope), 0)
+        ]
+        conn.execute("DELETE FROM dashboard_counters")
+        conn.executemany(
+            "INSERT INTO dashboard_counters (counter, scope, value) VALUES (?, ?, ?)",
+            [(counter, scope, value) for (counter, scope), value in actual.items() if value],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return drift
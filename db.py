@@ -1,144 +1,294 @@
+import importlib.util
+import logging
 import sqlite3
 import os
+import threading
+import time
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "employee.db")
+from flask import g
+
+try:
+    # Prefer greenlet identity so gevent/eventlet workers get their own affinity
+    from greenlet import getcurrent as _get_ident
+except ImportError:
+    from threading import get_ident as _get_ident
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.environ.get("EMS_DB_PATH", os.path.join(os.path.dirname(__file__), "employee.db"))
 UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "static", "uploads")
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
 
+# Only "sqlite" is implemented; a server backend needs its own dialect for the write paths
+DB_BACKEND = os.environ.get("EMS_DB_BACKEND", "sqlite")
 
-def get_connection():
-    # Use WAL mode + busy timeout to reduce "database is locked" errors
-    conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    # These PRAGMAs are cheap and safe to run on each new connection
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA busy_timeout = 5000;")  # wait up to 5s if DB is busy
-    return conn
+POOL_SIZE = int(os.environ.get("EMS_DB_POOL_SIZE", 8))
+POOL_TIMEOUT = float(os.environ.get("EMS_DB_POOL_TIMEOUT", 10))
+# Idle connections older than this are pinged before being handed out again
+POOL_PING_AFTER = float(os.environ.get("EMS_DB_POOL_PING_AFTER", 30))
 
 
-def init_db():
-    """Create tables and seed data if they don't exist."""
-    conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
-    # Ensure same WAL + busy_timeout settings for the initializer connection
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA busy_timeout = 5000;")
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY,
-            password TEXT NOT NULL,
-            role TEXT NOT NULL
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS employees (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            emp_id TEXT UNIQUE,
-            email TEXT NOT NULL,
-            department TEXT NOT NULL,
-            salary TEXT,
-            join_date TEXT,
-            username TEXT UNIQUE,
-            profile_image TEXT,
-            qualification TEXT
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS leaves (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            emp_id TEXT NOT NULL,
-            from_date TEXT NOT NULL,
-            to_date TEXT NOT NULL,
-            type TEXT NOT NULL,
-            reason TEXT,
-            status TEXT DEFAULT 'pending',
-            applied_at TEXT DEFAULT (datetime('now'))
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            emp_id TEXT NOT NULL,
-            date TEXT NOT NULL,
-            status TEXT DEFAULT 'absent',
-            login_time TEXT,
-            logout_time TEXT,
-            UNIQUE(emp_id, date)
-        )
-    """)
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within POOL_TIMEOUT."""
 
-    # Add new columns if they don't exist (for existing DBs)
-    try:
-        cursor.execute("ALTER TABLE employees ADD COLUMN username TEXT")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cursor.execute("ALTER TABLE employees ADD COLUMN profile_image TEXT")
-    except sqlite3.OperationalError:
-        pass
+
+class SQLiteBackend:
+    """Default backend: a local SQLite file in WAL mode."""
+
+    name = "sqlite"
+    Error = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+
+    def connect(self):
+        # Use WAL mode + busy timeout to reduce "database is locked" errors
+        conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # Connection-level settings only need to be applied once per connection
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA busy_timeout = 5000;")  # wait up to 5s if DB is busy
+        return conn
+
+    def executemany(self, conn, sql, rows):
+        return conn.executemany(sql, rows)
+
+    def limit(self, n):
+        """Trailing row-limit clause; the query must already have an ORDER BY."""
+        return f"LIMIT {int(n)}"
+
+
+BACKENDS = {
+    "sqlite": SQLiteBackend,
+}
+
+
+def create_backend(name=DB_BACKEND):
     try:
-        cursor.execute("ALTER TABLE employees ADD COLUMN qualification TEXT")
-    except sqlite3.OperationalError:
-        pass
-
-    # Seed users if empty
-    cursor.execute("SELECT COUNT(*) FROM users")
-    if cursor.fetchone()[0] == 0:
-        cursor.executemany(
-            "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-            [
-                ("admin", "admin123", "ADMIN"),
-                ("john", "pass123", "EMPLOYEE"),
-                ("priya", "pass123", "EMPLOYEE"),
-                ("rahul", "pass123", "EMPLOYEE"),
-            ],
-        )
+        return BACKENDS[name]()
+    except KeyError:
+        raise RuntimeError(f"Unknown EMS_DB_BACKEND {name!r}; expected one of {sorted(BACKENDS)}") from None
 
-    # Seed employees if empty
-    cursor.execute("SELECT COUNT(*) FROM employees")
-    if cursor.fetchone()[0] == 0:
-        cursor.executemany(
-            """INSERT INTO employees (name, emp_id, email, department, salary, join_date, username, qualification)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            [
-                ("Hari Priya", "ADMIN001", "admin@company.com", "HR", "", "2020-01-01", "admin", ""),
-                ("John Doe", "EMP001", "john@company.com", "Development", "75000", "2023-01-10", "john", "B.Tech"),
-                ("Priya Sharma", "EMP002", "priya@company.com", "HR", "65000", "2022-03-15", "priya", "MBA"),
-                ("Rahul Kumar", "EMP003", "rahul@company.com", "Finance", "70000", "2023-06-01", "rahul", "B.Com"),
-            ],
-        )
 
-    # Seed leaves if empty
-    cursor.execute("SELECT COUNT(*) FROM leaves")
-    if cursor.fetchone()[0] == 0:
-        cursor.executemany(
-            """INSERT INTO leaves (emp_id, from_date, to_date, type, reason, status)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            [
-                ("EMP001", "2026-01-28", "2026-01-29", "casual", "Family event", "pending"),
-                ("EMP002", "2026-01-27", "2026-01-27", "sick", "Fever", "pending"),
-                ("EMP001", "2026-02-10", "2026-02-12", "sick", "Flu", "pending"),
-            ],
-        )
+backend = create_backend()
+
+
+def get_connection():
+    """Open a new, unpooled connection. Request handlers should use get_db()."""
+    return backend.connect()
+
+
+class ConnectionPool:
+    """Fixed-size connection pool with thread/greenlet affinity.
+
+    A released connection remembers which thread (or greenlet) last used it,
+    and acquire() hands that same connection back to it when it is idle so
+    page caches stay warm. Connections idle for longer than ping_after are
+    health-checked with SELECT 1 and replaced if the check fails.
+    """
+
+    def __init__(self, backend, size=POOL_SIZE, timeout=POOL_TIMEOUT, ping_after=POOL_PING_AFTER):
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []  # [(owner_ident, released_at, conn)], most recent last
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"no database connection free after {self.timeout}s (pool size {self.size})")
+        try:
+            conn = self._take_idle()
+            if conn is None:
+                conn = self.backend.connect()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
 
-    # Seed attendance if empty
-    cursor.execute("SELECT COUNT(*) FROM attendance")
-    if cursor.fetchone()[0] == 0:
-        cursor.executemany(
-            """INSERT INTO attendance (emp_id, date, status, login_time)
-               VALUES (?, ?, ?, ?)""",
-            [
-                ("EMP001", "2026-02-02", "present", "09:00:00"),
-                ("EMP002", "2026-02-02", "present", "09:15:00"),
-            ],
+    def _take_idle(self):
+        ident = _get_ident()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                index = len(self._idle) - 1
+                for i, entry in enumerate(self._idle):
+                    if entry[0] == ident:
+                        index = i
+                        break
+                _, released_at, conn = self._idle.pop(index)
+            if time.monotonic() - released_at < self.ping_after or self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def release(self, conn):
+        try:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except self.backend.Error:
+                self._discard(conn)
+                return
+            with self._lock:
+                self._idle.append((_get_ident(), time.monotonic(), conn))
+        finally:
+            self._slots.release()
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except self.backend.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except self.backend.Error:
+            pass
+
+
+pool = ConnectionPool(backend)
+
+
+def get_db():
+    """Return the connection bound to the current request, checking one out on first use."""
+    if "db" not in g:
+        g.db = pool.acquire()
+    return g.db
+
+
+def close_db(exc=None):
+    """Teardown hook: return the request's connection to the pool."""
+    conn = g.pop("db", None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def check_query_plans(conn, queries):
+    """Return {name: plan} for every {name: sql} query that scans a table or sorts in a temp b-tree."""
+    problems = {}
+    for name, sql in queries.items():
+        params = (None,) * sql.count("?")
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        if any((detail.startswith("SCAN ") and " USING " not in detail) or "TEMP B-TREE" in detail for detail in plan):
+            problems[name] = plan
+    return problems
+
+
+def _discover_migrations():
+    """Return [(version, name, path)] for every file in MIGRATIONS_DIR, oldest first."""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        stem, ext = os.path.splitext(filename)
+        prefix = stem.split("_", 1)[0]
+        if ext not in (".sql", ".py") or not prefix.isdigit():
+            continue
+        migrations.append((int(prefix), stem, os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort()
+    return migrations
+
+
+def _split_sql(script):
+    """Split a migration script into single statements (trigger bodies stay intact)."""
+    statements = []
+    buf = ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            statements.append(buf.strip())
+            buf = ""
+    leftover = [line for line in buf.splitlines() if line.strip() and not line.strip().startswith("--")]
+    if leftover:
+        raise ValueError(f"Incomplete SQL statement at end of migration: {buf.strip()[:80]}")
+    return statements
+
+
+def _apply_migration(conn, path):
+    if path.endswith(".py"):
+        spec = importlib.util.spec_from_file_location(f"_ems_migration_{os.path.basename(path)[:-3]}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.migrate(conn)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for statement in _split_sql(f.read()):
+                conn.execute(statement)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_migration_version():
+    migrations = _discover_migrations()
+    return migrations[-1][0] if migrations else 0
+
+
+def migrate(target=None, path=None):
+    """Apply pending migrations in order, each in its own write transaction.
+
+    The version check is repeated after BEGIN IMMEDIATE, so concurrent
+    runners serialize on the write lock and every migration runs once.
+    `path` migrates a different SQLite file (e.g. a scratch database).
+    Returns the list of migration names that were applied.
+    """
+    conn = sqlite3.connect(path or DB_PATH, timeout=30, isolation_level=None)
+    applied = []
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA busy_timeout = 5000;")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS schema_version (
+                   version INTEGER PRIMARY KEY,
+                   name TEXT NOT NULL,
+                   applied_at TEXT DEFAULT (datetime('now'))
+               )"""
         )
+        for version, name, migration_path in _discover_migrations():
+            if target is not None and version > target:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if version <= schema_version(conn):
+                    conn.execute("COMMIT")
+                    continue
+                _apply_migration(conn, migration_path)
+                conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+                # PRAGMA arguments can't be bound; version is always an int from the filename
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append(name)
+    finally:
+        conn.close()
+    return applied
 
-    conn.commit()
-    conn.close()
 
+def init_db():
+    """Startup check: make sure the schema is current without touching any tables.
+
+    Only PRAGMA user_version is read. If migrations are pending they are
+    applied here unless EMS_AUTO_MIGRATE=0, in which case they are left for
+    `flask --app app migrate` (run once per deploy, not once per worker).
+    """
     # Ensure uploads directory exists
     os.makedirs(UPLOADS_DIR, exist_ok=True)
+
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    try:
+        current = schema_version(conn)
+    finally:
+        conn.close()
+
+    if current < latest_migration_version():
+        if os.environ.get("EMS_AUTO_MIGRATE", "1") == "0":
+            logger.warning(
+                "Database schema is at version %s, expected %s. Run `flask --app app migrate`.",
+                current, latest_migration_version(),
+            )
+        else:
+            migrate()
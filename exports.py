@@ -0,0 +1,233 @@
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from db import get_connection
+
+# Rows fetched per round trip; also the granularity of each streamed chunk
+EXPORT_BATCH = 2000
+
+# Excel's hard limit is 1,048,576 rows per sheet; one is the header
+XLSX_SHEET_ROWS = 1048575
+
+# entity -> (columns, SELECT ... FROM, (first, last) date columns, department column, ORDER BY).
+# A row matches ?from=&to= when its [first, last] dates overlap the range.
+EXPORTS = {
+    "employees": (
+        ("emp_id", "name", "email", "department", "salary", "join_date", "qualification"),
+        "SELECT emp_id, name, email, department, salary, join_date, qualification FROM employees",
+        ("join_date", "join_date"),
+        "department",
+        "emp_id",
+    ),
+    "leaves": (
+        ("id", "emp_id", "name", "department", "type", "from_date", "to_date", "reason", "status", "applied_at"),
+        """SELECT l.id, l.emp_id, e.name, e.department, l.type, l.from_date, l.to_date, l.reason, l.status, l.applied_at
+           FROM leaves l LEFT JOIN employees e ON e.emp_id = l.emp_id""",
+        ("l.from_date", "l.to_date"),
+        "e.department",
+        "l.applied_at, l.id",
+    ),
+    "attendance": (
+        ("emp_id", "name", "department", "date", "status", "login_time", "logout_time"),
+        """SELECT a.emp_id, e.name, e.department, a.date, a.status, a.login_time, a.logout_time
+           FROM attendance a LEFT JOIN employees e ON e.emp_id = a.emp_id""",
+        ("a.date", "a.date"),
+        "e.department",
+        "a.date",
+    ),
+}
+
+
+def export_rows(entity, start=None, end=None, departments=()):
+    """Yield the rows of one export entity, filtered by date range and departments.
+
+    Reads through a dedicated connection in EXPORT_BATCH-row chunks, so
+    memory stays flat however many rows match and no pooled connection is
+    held while the client downloads.
+    """
+    columns, sql, (first_date, last_date), department_column, order_by = EXPORTS[entity]
+    where, params = [], []
+    if start:
+        where.append(f"{last_date} >= ?")
+        params.append(start)
+    if end:
+        where.append(f"{first_date} <= ?")
+        params.append(end)
+    if departments:
+        where.append(f"{department_column} IN ({', '.join('?' * len(departments))})")
+        params.extend(departments)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY " + order_by
+
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH)
+            if not rows:
+                break
+            for row in rows:
+                yield tuple(row)
+    finally:
+        conn.close()
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_value(value):
+    # Neutralise formula injection when the file is opened in a spreadsheet
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
+
+
+def stream_csv(columns, rows):
+    """Yield UTF-8 CSV bytes (with a BOM so Excel detects the encoding), one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+    for batch in _batched(rows, EXPORT_BATCH):
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Characters XML 1.0 cannot carry at all, even escaped
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if value is None:
+            cells.append("<c/>")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f"<c><v>{value}</v></c>")
+        else:
+            text = escape(_XML_ILLEGAL.sub("", str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return "<row>" + "".join(cells) + "</row>"
+
+
+_XLSX_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_XLSX_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def stream_xlsx(columns, rows, sheet_name="Export"):
+    """Yield an .xlsx workbook as it is written, one chunk per batch.
+
+    Sheets are streamed straight into a zip with inline strings (no shared
+    string table to accumulate), and the workbook parts that list the
+    sheets are written last, so nothing but the current batch is held in
+    memory. Exports past Excel's row limit continue on further sheets.
+    """
+    sink = _ChunkSink()
+    workbook = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+    header = _xlsx_row(columns)
+    sheets = 0
+    sheet = None
+    sheet_rows = XLSX_SHEET_ROWS
+
+    for batch in _batched(rows, EXPORT_BATCH):
+        for row in batch:
+            if sheet_rows >= XLSX_SHEET_ROWS:
+                if sheet is not None:
+                    sheet.write(b"</sheetData></worksheet>")
+                    sheet.close()
+                sheets += 1
+                sheet = workbook.open(f"xl/worksheets/sheet{sheets}.xml", "w", force_zip64=True)
+                sheet.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                            f'<worksheet xmlns="{_XLSX_NS}"><sheetData>{header}'.encode("utf-8"))
+                sheet_rows = 0
+            sheet.write(_xlsx_row(row).encode("utf-8"))
+            sheet_rows += 1
+        yield sink.drain()
+
+    if sheet is None:
+        # No rows matched: still produce a valid workbook with just the header
+        sheets = 1
+        workbook.writestr("xl/worksheets/sheet1.xml",
+                          f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                          f'<worksheet xmlns="{_XLSX_NS}"><sheetData>{header}</sheetData></worksheet>')
+    else:
+        sheet.write(b"</sheetData></worksheet>")
+        sheet.close()
+
+    numbers = range(1, sheets + 1)
+    workbook.writestr("[Content_Types].xml", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        + "".join(
+            f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for n in numbers
+        )
+        + "</Types>"
+    ))
+    workbook.writestr("_rels/.rels", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'<Relationship Id="rId1" Type="{_XLSX_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ))
+    workbook.writestr("xl/workbook.xml", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<workbook xmlns="{_XLSX_NS}" xmlns:r="{_XLSX_REL_NS}"><sheets>'
+        + "".join(
+            f'<sheet name="{escape(sheet_name)}{"" if n == 1 else f" {n}"}" sheetId="{n}" r:id="rId{n}"/>'
+            for n in numbers
+        )
+        + "</sheets></workbook>"
+    ))
+    workbook.writestr("xl/_rels/workbook.xml.rels", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + "".join(
+            f'<Relationship Id="rId{n}" Type="{_XLSX_REL_NS}/worksheet" Target="worksheets/sheet{n}.xml"/>'
+            for n in numbers
+        )
+        + "</Relationships>"
+    ))
+    workbook.close()
+    yield sink.drain()
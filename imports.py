@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+import re
+from datetime import date
+
+from db import backend
+
+# Rows per transaction: big enough to amortise the commit, small enough to keep the write lock short
+IMPORT_CHUNK = 500
+
+IMPORT_FIELDS = ("emp_id", "name", "email", "department", "salary", "join_date", "qualification", "location",
+                 "password")
+REQUIRED_FIELDS = ("emp_id", "name", "email", "department")
+
+EMP_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,20}$")
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+$")
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _iter_csv(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    for row in reader:
+        # Extra cells beyond the header land under the None key; ignore them
+        row.pop(None, None)
+        yield reader.line_num, row
+
+
+def _iter_json(stream, chunk_size=65536):
+    """Yield objects from a JSON array or JSON Lines file without loading it whole.
+
+    A record must decode within chunk_size characters of where it starts;
+    anything longer is treated as malformed instead of buffering the rest
+    of the upload while waiting for it to end.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    decoder = json.JSONDecoder()
+    buffer, eof, number = "", False, 0
+    while True:
+        stripped = buffer.lstrip(" \t\r\n,[]")
+        if not stripped and eof:
+            return
+        if stripped:
+            try:
+                value, end = decoder.raw_decode(stripped)
+            except json.JSONDecodeError:
+                if eof or len(stripped) > chunk_size:
+                    raise ValueError(f"invalid JSON after record {number}")
+            else:
+                number += 1
+                buffer = stripped[end:]
+                yield number, value
+                continue
+        chunk = text.read(chunk_size)
+        eof = not chunk
+        buffer = stripped + chunk
+
+
+def read_import_rows(stream, fmt):
+    """Yield (row number, dict) from a binary CSV or JSON/JSON Lines stream."""
+    if fmt == "csv":
+        return _iter_csv(stream)
+    if fmt in ("json", "jsonl"):
+        return _iter_json(stream)
+    raise ValueError(f"unsupported import format: {fmt}")
+
+
+def _is_date(value):
+    # fromisoformat is far cheaper than strptime but accepts other ISO shapes, hence the pattern
+    if not DATE_PATTERN.match(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def validate_employee(record):
+    """Return (clean row dict, [errors]) for one import record."""
+    if not isinstance(record, dict):
+        return None, ["record is not an object"]
+    clean = {field: str(record.get(field) or "").strip() for field in IMPORT_FIELDS}
+    errors = [f"{field} is required" for field in REQUIRED_FIELDS if not clean[field]]
+    if clean["emp_id"] and not EMP_ID_PATTERN.match(clean["emp_id"]):
+        errors.append("emp_id must be 1-20 letters, digits, '-' or '_'")
+    if clean["email"] and not EMAIL_PATTERN.match(clean["email"]):
+        errors.append("email is not valid")
+    if clean["join_date"]:
+        if not _is_date(clean["join_date"]):
+            errors.append("join_date must be YYYY-MM-DD")
+    return clean, errors
+
+
+def _existing_ids(conn, emp_ids):
+    """emp_ids already taken as an employee id, employee username or login, in one indexed probe each."""
+    marks = ", ".join("?" * len(emp_ids))
+    rows = conn.execute(
+        f"""SELECT emp_id FROM employees WHERE emp_id IN ({marks})
+            UNION SELECT username FROM employees WHERE username IN ({marks})
+            UNION SELECT username FROM users WHERE username IN ({marks})""",
+        list(emp_ids) * 3,
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _insert_chunk(conn, rows):
+    backend.executemany(
+        conn,
+        """INSERT INTO employees (name, emp_id, email, department, salary, join_date, qualification, location,
+                                 username)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [(r["name"], r["emp_id"], r["email"], r["department"], r["salary"], r["join_date"], r["qualification"],
+          r["location"] or None, r["emp_id"]) for r in rows],
+    )
+    logins = [(r["emp_id"], r["password"], "EMPLOYEE") for r in rows if r["password"]]
+    if logins:
+        backend.executemany(conn, "INSERT INTO users (username, password, role) VALUES (?, ?, ?)", logins)
+
+
+def import_employees(conn, records, chunk_size=IMPORT_CHUNK):
+    """Validate and insert employees from (row number, record) pairs, one transaction per chunk.
+
+    Returns {"inserted": n, "errors": [{"row", "emp_id", "errors"}]}. Rows
+    that fail validation, repeat an emp_id from earlier in the file or clash
+    with an existing employee or login are reported and skipped; the rest
+    are inserted. If a chunk still hits a constraint (a concurrent insert),
+    it is retried row by row so only the offending rows are dropped.
+    """
+    inserted, errors = 0, []
+    seen = set()
+    chunk = []
+
+    def flush():
+        nonlocal inserted
+        taken = _existing_ids(conn, [r["emp_id"] for _, r in chunk])
+        rows = []
+        for number, row in chunk:
+            if row["emp_id"] in taken:
+                errors.append({"row": number, "emp_id": row["emp_id"], "errors": ["emp_id already exists"]})
+            else:
+                rows.append((number, row))
+        if not rows:
+            return
+        try:
+            _insert_chunk(conn, [row for _, row in rows])
+            conn.commit()
+            inserted += len(rows)
+        except backend.IntegrityError:
+            conn.rollback()
+            for number, row in rows:
+                try:
+                    _insert_chunk(conn, [row])
+                    conn.commit()
+                    inserted += 1
+                except backend.IntegrityError as e:
+                    conn.rollback()
+                    errors.append({"row": number, "emp_id": row["emp_id"], "errors": [str(e)]})
+
+    try:
+        for number, record in records:
+            row, problems = validate_employee(record)
+            if not problems and row["emp_id"] in seen:
+                problems = ["duplicate emp_id in file"]
+            if problems:
+                errors.append({"row": number, "emp_id": (row or {}).get("emp_id", ""), "errors": problems})
+                continue
+            seen.add(row["emp_id"])
+            chunk.append((number, row))
+            if len(chunk) >= chunk_size:
+                flush()
+                chunk = []
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        # The rest of the file can't be parsed; keep what was read so far
+        errors.append({"row": None, "emp_id": "", "errors": [f"stopped reading: {e}"]})
+    if chunk:
+        flush()
+    return {"inserted": inserted, "errors": errors}
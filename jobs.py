@@ -0,0 +1,35 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_running = {}
+_running_lock = threading.Lock()
+
+
+def start_periodic(name, fn, interval):
+    """Call fn() every `interval` seconds on a daemon thread named `name` (once per process).
+
+    Returns the thread. Setting its `stop` event ends the loop after the
+    current call, and the next start_periodic() with that name starts a
+    fresh thread. A failing call is logged and retried on the next tick.
+    """
+    with _running_lock:
+        thread = _running.get(name)
+        if thread is not None and thread.is_alive() and not thread.stop.is_set():
+            return thread
+
+        def run():
+            while not stop.is_set():
+                try:
+                    fn()
+                except Exception:
+                    logger.exception("Periodic job %s failed", name)
+                stop.wait(interval)
+
+        stop = threading.Event()
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.stop = stop
+        _running[name] = thread
+        thread.start()
+        return thread
@@ -0,0 +1,189 @@
+from datetime import date
+
+from balances import post_leave_debits
+
+# Leave decisions the admin can take, and the status each one sets
+DECISIONS = {"approve": "approved", "reject": "rejected"}
+
+# Most ids accepted in one batch decision (keeps the IN list well under bind-parameter limits)
+MAX_DECISION_BATCH = 1000
+
+
+def decide_leaves(conn, leave_ids, decision):
+    """Approve or reject pending leaves in one set-based UPDATE and report the outcome per id.
+
+    Only leaves still pending change, so repeating a decision is harmless.
+    Approvals debit the leave balances in the same transaction.
+    Returns [{"id", "ok", "status", "error"?}] in the order of leave_ids.
+    The caller commits.
+    """
+    status = DECISIONS[decision]
+    ids = list(dict.fromkeys(leave_ids))
+    if not ids:
+        return []
+    marks = ", ".join("?" * len(ids))
+    changed = {
+        row[0] for row in conn.execute(
+            f"UPDATE leaves SET status = ? WHERE status = 'pending' AND id IN ({marks}) RETURNING id",
+            [status, *ids],
+        ).fetchall()
+    }
+    if status == "approved":
+        post_leave_debits(conn, sorted(changed))
+    unchanged = [leave_id for leave_id in ids if leave_id not in changed]
+    current = {}
+    if unchanged:
+        current = {
+            row[0]: row[1] for row in conn.execute(
+                f"SELECT id, status FROM leaves WHERE id IN ({', '.join('?' * len(unchanged))})", unchanged,
+            ).fetchall()
+        }
+
+    results = []
+    for leave_id in ids:
+        if leave_id in changed:
+            results.append({"id": leave_id, "ok": True, "status": status})
+        elif leave_id in current:
+            results.append({"id": leave_id, "ok": False, "status": current[leave_id],
+                            "error": f"already {current[leave_id]}"})
+        else:
+            results.append({"id": leave_id, "ok": False, "status": None, "error": "not found"})
+    return results
+
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def day_number(value):
+    """Days since 1970-01-01 for a date or YYYY-MM-DD string, as stored in leave_intervals."""
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal() - _EPOCH
+
+
+def find_overlaps(conn, emp_id, from_date, to_date):
+    """Pending or approved leaves of one employee that share a day with from_date..to_date.
+
+    Served by the (emp_id, applied_at) index, so the cost is one seek plus
+    that employee's own leave history.
+    """
+    return [
+        dict(row) for row in conn.execute(
+            """SELECT * FROM leaves WHERE emp_id = ? AND status IN ('pending', 'approved')
+               AND from_date <= ? AND to_date >= ? ORDER BY from_date""",
+            (emp_id, to_date, from_date),
+        ).fetchall()
+    ]
+
+
+def create_leave(conn, emp_id, from_date, to_date, leave_type, reason):
+    """Insert a pending leave unless it overlaps one of the employee's active leaves.
+
+    The check and the insert share one BEGIN IMMEDIATE transaction, so two
+    concurrent requests for the same days can't both pass the check.
+    Returns (new leave id, []) or (None, the overlapping leaves).
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        overlaps = find_overlaps(conn, emp_id, from_date, to_date)
+        leave_id = None
+        if not overlaps:
+            leave_id = conn.execute(
+                "INSERT INTO leaves (emp_id, from_date, to_date, type, reason) VALUES (?, ?, ?, ?, ?) RETURNING id",
+                (emp_id, from_date, to_date, leave_type, reason),
+            ).fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return leave_id, overlaps
+
+
+def _intervals(conn, first_day, last_day, department=None):
+    """(leave id, emp_id, first_day, last_day) for active leaves touching the range, via the R*Tree."""
+    sql = """SELECT i.id, i.emp_id, i.first_day, i.last_day FROM leave_intervals i"""
+    params = []
+    if department:
+        sql += " CROSS JOIN employees e ON e.emp_id = i.emp_id"
+    sql += " WHERE i.first_day <= ? AND i.last_day >= ?"
+    params += [last_day, first_day]
+    if department:
+        sql += " AND e.department = ?"
+        params.append(department)
+    return conn.execute(sql, params).fetchall()
+
+
+def people_out(conn, day, department=None):
+    """Employees on pending or approved leave on `day`, optionally in one department."""
+    # CROSS JOIN keeps the R*Tree as the outer loop; left to itself the planner scans leaves
+    n = day_number(day)
+    sql = """SELECT l.id, l.emp_id, e.name, e.department, l.type, l.from_date, l.to_date, l.status
+             FROM leave_intervals i CROSS JOIN leaves l ON l.id = i.id LEFT JOIN employees e ON e.emp_id = l.emp_id
+             WHERE i.first_day <= ? AND i.last_day >= ?"""
+    params = [n, n]
+    if department:
+        sql += " AND e.department = ?"
+        params.append(department)
+    return [dict(row) for row in conn.execute(sql + " ORDER BY e.name", params).fetchall()]
+
+
+def max_concurrent_absences(conn, from_date, to_date, department=None, exclude_emp_id=None):
+    """Peak number of people on active leave on any single day of from_date..to_date.
+
+    Returns (count, peak date or None). The R*Tree yields the k leaves that
+    touch the range and a sweep over their clipped endpoints finds the peak
+    in O(k log k).
+    """
+    first, last = day_number(from_date), day_number(to_date)
+    events = []
+    for _, emp_id, start, end in _intervals(conn, first, last, department):
+        if emp_id == exclude_emp_id:
+            continue
+        events.append((max(start, first), 1))
+        events.append((min(end, last) + 1, -1))
+    # Ends sort before starts on the same day, so back-to-back leaves don't count as concurrent
+    events.sort()
+    peak, peak_day, current = 0, None, 0
+    for day, delta in events:
+        current += delta
+        if current > peak:
+            peak, peak_day = current, day
+    return peak, (date.fromordinal(peak_day + _EPOCH).isoformat() if peak_day is not None else None)
+
+
+def coverage_warnings(conn, leaves, warn_ratio):
+    """Annotate pending leave dicts with how many department colleagues are out at the same time.
+
+    Adds "coverage" = {"out", "headcount", "peak_date", "warn"} where out is
+    the peak number of other people in the same department on leave during
+    the request, and warn is set when someone else is out and out + 1
+    reaches warn_ratio of the department.
+    """
+    departments = sorted({leave["department"] for leave in leaves if leave.get("department")})
+    headcounts = {}
+    if departments:
+        headcounts = {
+            row[0]: row[1] for row in conn.execute(
+                f"""SELECT department, COUNT(*) FROM employees
+                    WHERE department IN ({', '.join('?' * len(departments))}) GROUP BY department""",
+                departments,
+            ).fetchall()
+        }
+    for leave in leaves:
+        department = leave.get("department")
+        if not department:
+            continue
+        try:
+            out, peak_date = max_concurrent_absences(
+                conn, leave["from_date"], leave["to_date"], department, exclude_emp_id=leave["emp_id"],
+            )
+        except ValueError:
+            continue  # legacy row with unparseable dates
+        headcount = headcounts.get(department, 0)
+        leave["coverage"] = {
+            "out": out,
+            "headcount": headcount,
+            "peak_date": peak_date,
+            "warn": out > 0 and (out + 1) / headcount >= warn_ratio,
+        }
+    return leaves
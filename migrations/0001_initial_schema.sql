@@ -0,0 +1,41 @@
+-- Base tables. IF NOT EXISTS so databases created by the old init_db() adopt cleanly.
+
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    emp_id TEXT UNIQUE,
+    email TEXT NOT NULL,
+    department TEXT NOT NULL,
+    salary TEXT,
+    join_date TEXT,
+    username TEXT UNIQUE,
+    profile_image TEXT,
+    qualification TEXT
+);
+
+CREATE TABLE IF NOT EXISTS leaves (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    emp_id TEXT NOT NULL,
+    from_date TEXT NOT NULL,
+    to_date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    reason TEXT,
+    status TEXT DEFAULT 'pending',
+    applied_at TEXT DEFAULT (datetime('now'))
+);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    emp_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT DEFAULT 'absent',
+    login_time TEXT,
+    logout_time TEXT,
+    UNIQUE(emp_id, date)
+);
@@ -0,0 +1,14 @@
+"""Add the employee profile columns to databases created before they existed."""
+
+COLUMNS = {
+    "username": "TEXT",
+    "profile_image": "TEXT",
+    "qualification": "TEXT",
+}
+
+
+def migrate(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(employees)")}
+    for column, column_type in COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE employees ADD COLUMN {column} {column_type}")
@@ -0,0 +1,34 @@
+-- Demo accounts and sample rows. Each table is only seeded when it is empty.
+
+INSERT INTO users (username, password, role)
+SELECT * FROM (VALUES
+    ('admin', 'admin123', 'ADMIN'),
+    ('john', 'pass123', 'EMPLOYEE'),
+    ('priya', 'pass123', 'EMPLOYEE'),
+    ('rahul', 'pass123', 'EMPLOYEE')
+)
+WHERE NOT EXISTS (SELECT 1 FROM users);
+
+INSERT INTO employees (name, emp_id, email, department, salary, join_date, username, qualification)
+SELECT * FROM (VALUES
+    ('Hari Priya', 'ADMIN001', 'admin@company.com', 'HR', '', '2020-01-01', 'admin', ''),
+    ('John Doe', 'EMP001', 'john@company.com', 'Development', '75000', '2023-01-10', 'john', 'B.Tech'),
+    ('Priya Sharma', 'EMP002', 'priya@company.com', 'HR', '65000', '2022-03-15', 'priya', 'MBA'),
+    ('Rahul Kumar', 'EMP003', 'rahul@company.com', 'Finance', '70000', '2023-06-01', 'rahul', 'B.Com')
+)
+WHERE NOT EXISTS (SELECT 1 FROM employees);
+
+INSERT INTO leaves (emp_id, from_date, to_date, type, reason, status)
+SELECT * FROM (VALUES
+    ('EMP001', '2026-01-28', '2026-01-29', 'casual', 'Family event', 'pending'),
+    ('EMP002', '2026-01-27', '2026-01-27', 'sick', 'Fever', 'pending'),
+    ('EMP001', '2026-02-10', '2026-02-12', 'sick', 'Flu', 'pending')
+)
+WHERE NOT EXISTS (SELECT 1 FROM leaves);
+
+INSERT INTO attendance (emp_id, date, status, login_time)
+SELECT * FROM (VALUES
+    ('EMP001', '2026-02-02', 'present', '09:00:00'),
+    ('EMP002', '2026-02-02', 'present', '09:15:00')
+)
+WHERE NOT EXISTS (SELECT 1 FROM attendance);
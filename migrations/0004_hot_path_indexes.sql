@@ -0,0 +1,14 @@
+-- Indexes for the predicates the dashboards hit on every page load.
+-- `flask --app app check-query-plans` fails if one of those queries stops using them.
+
+-- Admin pending queue: WHERE status = 'pending' ORDER BY applied_at DESC
+CREATE INDEX IF NOT EXISTS idx_leaves_status_applied_at ON leaves (status, applied_at);
+
+-- Employee leave history and counts: WHERE emp_id = ? ORDER BY applied_at DESC
+CREATE INDEX IF NOT EXISTS idx_leaves_emp_id_applied_at ON leaves (emp_id, applied_at);
+
+-- Admin recent activity: ORDER BY applied_at DESC LIMIT 5
+CREATE INDEX IF NOT EXISTS idx_leaves_applied_at ON leaves (applied_at);
+
+-- Today's headcount and check-in feed: WHERE date = ? AND status = 'present' ORDER BY login_time DESC
+CREATE INDEX IF NOT EXISTS idx_attendance_date_status_login_time ON attendance (date, status, login_time);
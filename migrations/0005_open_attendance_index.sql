@@ -0,0 +1,2 @@
+-- Partial index over rows still missing a logout, so the auto-cap sweep only visits open rows.
+CREATE INDEX IF NOT EXISTS idx_attendance_open ON attendance (date, login_time) WHERE logout_time IS NULL;
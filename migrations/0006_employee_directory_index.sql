@@ -0,0 +1,2 @@
+-- Keyset pages of the employee directory filtered by department: WHERE department = ? AND emp_id > ? ORDER BY emp_id
+CREATE INDEX IF NOT EXISTS idx_employees_department_emp_id ON employees (department, emp_id);
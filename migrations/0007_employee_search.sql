@@ -0,0 +1,33 @@
+-- Full-text index over the employee fields admins search by, kept in sync by triggers.
+-- prefix='2 3' pre-builds short prefixes so typeahead queries don't scan the term list.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+    name, emp_id, email, department, qualification,
+    content='employees', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS employees_fts_after_insert AFTER INSERT ON employees BEGIN
+    INSERT INTO employees_fts (rowid, name, emp_id, email, department, qualification)
+    VALUES (new.id, new.name, new.emp_id, new.email, new.department, new.qualification);
+END;
+
+CREATE TRIGGER IF NOT EXISTS employees_fts_after_delete AFTER DELETE ON employees BEGIN
+    INSERT INTO employees_fts (employees_fts, rowid, name, emp_id, email, department, qualification)
+    VALUES ('delete', old.id, old.name, old.emp_id, old.email, old.department, old.qualification);
+END;
+
+CREATE TRIGGER IF NOT EXISTS employees_fts_after_update
+AFTER UPDATE OF name, emp_id, email, department, qualification ON employees BEGIN
+    INSERT INTO employees_fts (employees_fts, rowid, name, emp_id, email, department, qualification)
+    VALUES ('delete', old.id, old.name, old.emp_id, old.email, old.department, old.qualification);
+    INSERT INTO employees_fts (rowid, name, emp_id, email, department, qualification)
+    VALUES (new.id, new.name, new.emp_id, new.email, new.department, new.qualification);
+END;
+
+-- ORDER BY rank uses bm25 with name and emp_id hits outranking email/department/qualification
+INSERT INTO employees_fts (employees_fts, rank) VALUES ('rank', 'bm25(10.0, 10.0, 3.0, 2.0, 1.0)');
+
+-- Index the rows that existed before this migration
+INSERT INTO employees_fts (employees_fts) VALUES ('rebuild');
@@ -0,0 +1,65 @@
+-- Admin dashboard KPIs kept up to date by triggers, so the cards are one primary-key read
+-- instead of three COUNT(*)s. scope is '' for global counters and the date for daily ones.
+-- `flask --app app reconcile-counters` recomputes them from scratch and reports drift.
+
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    counter TEXT NOT NULL,
+    scope TEXT NOT NULL DEFAULT '',
+    value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (counter, scope)
+);
+
+CREATE TRIGGER IF NOT EXISTS counters_employees_after_insert AFTER INSERT ON employees BEGIN
+    INSERT INTO dashboard_counters (counter, scope, value) VALUES ('total_employees', '', 1)
+    ON CONFLICT (counter, scope) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS counters_employees_after_delete AFTER DELETE ON employees BEGIN
+    UPDATE dashboard_counters SET value = value - 1 WHERE counter = 'total_employees' AND scope = '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS counters_leaves_after_insert AFTER INSERT ON leaves
+WHEN new.status = 'pending' BEGIN
+    INSERT INTO dashboard_counters (counter, scope, value) VALUES ('pending_leaves', '', 1)
+    ON CONFLICT (counter, scope) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS counters_leaves_after_delete AFTER DELETE ON leaves
+WHEN old.status = 'pending' BEGIN
+    UPDATE dashboard_counters SET value = value - 1 WHERE counter = 'pending_leaves' AND scope = '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS counters_leaves_after_update AFTER UPDATE OF status ON leaves
+WHEN (old.status = 'pending') <> (new.status = 'pending') BEGIN
+    INSERT INTO dashboard_counters (counter, scope, value)
+    VALUES ('pending_leaves', '', CASE WHEN new.status = 'pending' THEN 1 ELSE -1 END)
+    ON CONFLICT (counter, scope) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS counters_attendance_after_insert AFTER INSERT ON attendance
+WHEN new.status = 'present' BEGIN
+    INSERT INTO dashboard_counters (counter, scope, value) VALUES ('present', new.date, 1)
+    ON CONFLICT (counter, scope) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS counters_attendance_after_delete AFTER DELETE ON attendance
+WHEN old.status = 'present' BEGIN
+    UPDATE dashboard_counters SET value = value - 1 WHERE counter = 'present' AND scope = old.date;
+END;
+
+CREATE TRIGGER IF NOT EXISTS counters_attendance_after_update AFTER UPDATE OF status, date ON attendance
+WHEN old.status IS NOT new.status OR old.date IS NOT new.date BEGIN
+    UPDATE dashboard_counters SET value = value - 1
+    WHERE counter = 'present' AND scope = old.date AND old.status = 'present';
+    INSERT INTO dashboard_counters (counter, scope, value)
+    SELECT 'present', new.date, 1 WHERE new.status = 'present'
+    ON CONFLICT (counter, scope) DO UPDATE SET value = value + 1;
+END;
+
+-- Seed from the rows that existed before this migration
+INSERT OR REPLACE INTO dashboard_counters (counter, scope, value)
+SELECT 'total_employees', '', COUNT(*) FROM employees;
+INSERT OR REPLACE INTO dashboard_counters (counter, scope, value)
+SELECT 'pending_leaves', '', COUNT(*) FROM leaves WHERE status = 'pending';
+INSERT OR REPLACE INTO dashboard_counters (counter, scope, value)
+SELECT 'present', date, COUNT(*) FROM attendance WHERE status = 'present' GROUP BY date;
@@ -0,0 +1,56 @@
+-- Append-only activity log behind the admin "Recent Activity" feed. Rows carry the display
+-- fields they need, so the feed is a single newest-first index read with no joins.
+
+CREATE TABLE IF NOT EXISTS activity_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,              -- 'leave' or 'attendance'
+    action TEXT NOT NULL,            -- leave: its new status; attendance: 'login'
+    emp_id TEXT NOT NULL,
+    name TEXT,
+    leave_type TEXT,
+    from_date TEXT,
+    to_date TEXT,
+    occurred_at TEXT NOT NULL
+);
+
+-- The index implicitly ends in the rowid, so it also serves ORDER BY occurred_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_activity_events_occurred_at ON activity_events (occurred_at);
+
+CREATE TRIGGER IF NOT EXISTS activity_leaves_after_insert AFTER INSERT ON leaves BEGIN
+    INSERT INTO activity_events (kind, action, emp_id, name, leave_type, from_date, to_date, occurred_at)
+    VALUES ('leave', new.status, new.emp_id, (SELECT name FROM employees WHERE emp_id = new.emp_id),
+            new.type, new.from_date, new.to_date, COALESCE(new.applied_at, datetime('now')));
+END;
+
+CREATE TRIGGER IF NOT EXISTS activity_leaves_after_status AFTER UPDATE OF status ON leaves
+WHEN old.status IS NOT new.status BEGIN
+    INSERT INTO activity_events (kind, action, emp_id, name, leave_type, from_date, to_date, occurred_at)
+    VALUES ('leave', new.status, new.emp_id, (SELECT name FROM employees WHERE emp_id = new.emp_id),
+            new.type, new.from_date, new.to_date, datetime('now'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS activity_attendance_after_insert AFTER INSERT ON attendance
+WHEN new.status = 'present' AND new.login_time IS NOT NULL BEGIN
+    INSERT INTO activity_events (kind, action, emp_id, name, occurred_at)
+    VALUES ('attendance', 'login', new.emp_id, (SELECT name FROM employees WHERE emp_id = new.emp_id),
+            new.date || ' ' || new.login_time);
+END;
+
+CREATE TRIGGER IF NOT EXISTS activity_attendance_after_login AFTER UPDATE OF login_time ON attendance
+WHEN new.status = 'present' AND new.login_time IS NOT NULL AND new.login_time IS NOT old.login_time BEGIN
+    INSERT INTO activity_events (kind, action, emp_id, name, occurred_at)
+    VALUES ('attendance', 'login', new.emp_id, (SELECT name FROM employees WHERE emp_id = new.emp_id),
+            new.date || ' ' || new.login_time);
+END;
+
+-- Backfill from existing history: each leave at its current status, each recorded check-in
+INSERT INTO activity_events (kind, action, emp_id, name, leave_type, from_date, to_date, occurred_at)
+SELECT 'leave', l.status, l.emp_id, e.name, l.type, l.from_date, l.to_date, COALESCE(l.applied_at, '')
+FROM leaves l LEFT JOIN employees e ON e.emp_id = l.emp_id
+ORDER BY l.applied_at, l.id;
+
+INSERT INTO activity_events (kind, action, emp_id, name, occurred_at)
+SELECT 'attendance', 'login', a.emp_id, e.name, a.date || ' ' || a.login_time
+FROM attendance a LEFT JOIN employees e ON e.emp_id = a.emp_id
+WHERE a.status = 'present' AND a.login_time IS NOT NULL
+ORDER BY a.date, a.login_time;
@@ -0,0 +1,45 @@
+-- Version stamps for the dashboard fragment cache. Triggers bump a tag whenever rows behind a
+-- cached panel change, and cache keys embed the versions they were rendered at, so every
+-- worker process sees the change on its next read without any cross-process messaging.
+--   employees          any employee row (names shown in other panels)
+--   employee:<emp_id>  one employee's profile
+--   pending_leaves     the admin pending queue
+--   leaves:<emp_id>    one employee's leave history and counts
+-- The activity feed needs no tag: MAX(activity_events.id) already versions it.
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+    tag TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS cache_employees_after_insert AFTER INSERT ON employees BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('employees', 1), ('employee:' || new.emp_id, 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_employees_after_update AFTER UPDATE ON employees BEGIN
+    INSERT INTO cache_versions (tag, version)
+    VALUES ('employees', 1), ('employee:' || old.emp_id, 1), ('employee:' || new.emp_id, 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_employees_after_delete AFTER DELETE ON employees BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('employees', 1), ('employee:' || old.emp_id, 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_leaves_after_insert AFTER INSERT ON leaves BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('pending_leaves', 1), ('leaves:' || new.emp_id, 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_leaves_after_update AFTER UPDATE ON leaves BEGIN
+    INSERT INTO cache_versions (tag, version)
+    VALUES ('pending_leaves', 1), ('leaves:' || old.emp_id, 1), ('leaves:' || new.emp_id, 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_leaves_after_delete AFTER DELETE ON leaves BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('pending_leaves', 1), ('leaves:' || old.emp_id, 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
@@ -0,0 +1,26 @@
+-- Per-employee, per-month version stamps for the attendance calendar API, in the same
+-- cache_versions table as the dashboard fragments:
+--   attendance:<emp_id>:<YYYY-MM>  one employee's attendance rows for one month
+-- /api/attendance/<month>/<year> derives its ETag from this row alone, so a conditional
+-- request that still matches is answered without reading the attendance table. Months with no
+-- row yet read as version 0 until their first write.
+
+CREATE TRIGGER IF NOT EXISTS cache_attendance_after_insert AFTER INSERT ON attendance BEGIN
+    INSERT INTO cache_versions (tag, version)
+    VALUES ('attendance:' || new.emp_id || ':' || substr(new.date, 1, 7), 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_attendance_after_update AFTER UPDATE ON attendance BEGIN
+    INSERT INTO cache_versions (tag, version)
+    VALUES ('attendance:' || old.emp_id || ':' || substr(old.date, 1, 7), 1),
+           ('attendance:' || new.emp_id || ':' || substr(new.date, 1, 7), 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_attendance_after_delete AFTER DELETE ON attendance BEGIN
+    INSERT INTO cache_versions (tag, version)
+    VALUES ('attendance:' || old.emp_id || ':' || substr(old.date, 1, 7), 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
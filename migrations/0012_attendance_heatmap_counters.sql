@@ -0,0 +1,66 @@
+-- Per-day breakdown for the admin attendance heatmap, in dashboard_counters next to the
+-- existing daily 'present' counter (scope is the date):
+--   late                 present with login_time after 09:30:00
+--   present:<department> present, by the employee's department at check-in time
+--   late:<department>    late, by department
+-- A year of heatmap is then one primary-key range read per counter. The 09:30:00 cutoff is
+-- repeated in counters.COUNTER_SOURCES; change both and run reconcile-counters. The same
+-- command also moves history after an employee changes department.
+
+CREATE TRIGGER IF NOT EXISTS counters_attendance_breakdown_after_insert AFTER INSERT ON attendance
+WHEN new.status = 'present' BEGIN
+    INSERT INTO dashboard_counters (counter, scope, value)
+    SELECT counter, new.date, 1 FROM (
+        SELECT 'late' AS counter WHERE new.login_time > '09:30:00'
+        UNION ALL
+        SELECT 'present:' || department FROM employees WHERE emp_id = new.emp_id
+        UNION ALL
+        SELECT 'late:' || department FROM employees WHERE emp_id = new.emp_id AND new.login_time > '09:30:00'
+    ) WHERE true
+    ON CONFLICT (counter, scope) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS counters_attendance_breakdown_after_delete AFTER DELETE ON attendance
+WHEN old.status = 'present' BEGIN
+    UPDATE dashboard_counters SET value = value - 1
+    WHERE scope = old.date AND counter IN (
+        SELECT 'late' WHERE old.login_time > '09:30:00'
+        UNION ALL
+        SELECT 'present:' || department FROM employees WHERE emp_id = old.emp_id
+        UNION ALL
+        SELECT 'late:' || department FROM employees WHERE emp_id = old.emp_id AND old.login_time > '09:30:00'
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS counters_attendance_breakdown_after_update AFTER UPDATE OF status, date, login_time, emp_id ON attendance
+WHEN old.status IS NOT new.status OR old.date IS NOT new.date
+  OR old.login_time IS NOT new.login_time OR old.emp_id IS NOT new.emp_id BEGIN
+    UPDATE dashboard_counters SET value = value - 1
+    WHERE old.status = 'present' AND scope = old.date AND counter IN (
+        SELECT 'late' WHERE old.login_time > '09:30:00'
+        UNION ALL
+        SELECT 'present:' || department FROM employees WHERE emp_id = old.emp_id
+        UNION ALL
+        SELECT 'late:' || department FROM employees WHERE emp_id = old.emp_id AND old.login_time > '09:30:00'
+    );
+    INSERT INTO dashboard_counters (counter, scope, value)
+    SELECT counter, new.date, 1 FROM (
+        SELECT 'late' AS counter WHERE new.login_time > '09:30:00'
+        UNION ALL
+        SELECT 'present:' || department FROM employees WHERE emp_id = new.emp_id
+        UNION ALL
+        SELECT 'late:' || department FROM employees WHERE emp_id = new.emp_id AND new.login_time > '09:30:00'
+    ) WHERE new.status = 'present'
+    ON CONFLICT (counter, scope) DO UPDATE SET value = value + 1;
+END;
+
+-- Seed from the rows that existed before this migration
+INSERT OR REPLACE INTO dashboard_counters (counter, scope, value)
+SELECT 'late', date, COUNT(*) FROM attendance
+WHERE status = 'present' AND login_time > '09:30:00' GROUP BY date;
+INSERT OR REPLACE INTO dashboard_counters (counter, scope, value)
+SELECT 'present:' || e.department, a.date, COUNT(*) FROM attendance a JOIN employees e ON e.emp_id = a.emp_id
+WHERE a.status = 'present' GROUP BY e.department, a.date;
+INSERT OR REPLACE INTO dashboard_counters (counter, scope, value)
+SELECT 'late:' || e.department, a.date, COUNT(*) FROM attendance a JOIN employees e ON e.emp_id = a.emp_id
+WHERE a.status = 'present' AND a.login_time > '09:30:00' GROUP BY e.department, a.date;
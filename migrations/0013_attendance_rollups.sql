@@ -0,0 +1,86 @@
+-- Attendance rollups for reports: per department per day, and per employee / per department
+-- per month, each with present days, minutes worked (login to logout) and late arrivals
+-- (login after 09:30:00). Reports read these instead of scanning attendance, so their cost
+-- follows the number of days, not the number of rows.
+--
+-- Triggers only append the (emp_id, date) keys that changed to attendance_changes; the
+-- aggregator in rollups.py folds everything past its watermark into the rollups and prunes
+-- the log. `flask --app app rollup-attendance --rebuild` recomputes them from scratch (also
+-- needed after an employee changes department, since history is grouped by the current one).
+
+CREATE TABLE IF NOT EXISTS attendance_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- never reused, so pruning can't rewind the watermark
+    emp_id TEXT NOT NULL,
+    date TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS rollup_department_daily (
+    date TEXT NOT NULL,
+    department TEXT NOT NULL,
+    present INTEGER NOT NULL,
+    minutes_worked INTEGER NOT NULL,
+    late INTEGER NOT NULL,
+    PRIMARY KEY (date, department)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_department_monthly (
+    month TEXT NOT NULL,  -- YYYY-MM
+    department TEXT NOT NULL,
+    present INTEGER NOT NULL,
+    minutes_worked INTEGER NOT NULL,
+    late INTEGER NOT NULL,
+    PRIMARY KEY (month, department)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_employee_monthly (
+    emp_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    present INTEGER NOT NULL,
+    minutes_worked INTEGER NOT NULL,
+    late INTEGER NOT NULL,
+    PRIMARY KEY (emp_id, month)
+);
+
+CREATE TRIGGER IF NOT EXISTS rollup_attendance_after_insert AFTER INSERT ON attendance BEGIN
+    INSERT INTO attendance_changes (emp_id, date) VALUES (new.emp_id, new.date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_attendance_after_update
+AFTER UPDATE OF emp_id, date, status, login_time, logout_time ON attendance BEGIN
+    INSERT INTO attendance_changes (emp_id, date) VALUES (new.emp_id, new.date);
+    INSERT INTO attendance_changes (emp_id, date)
+    SELECT old.emp_id, old.date WHERE old.emp_id IS NOT new.emp_id OR old.date IS NOT new.date;
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_attendance_after_delete AFTER DELETE ON attendance BEGIN
+    INSERT INTO attendance_changes (emp_id, date) VALUES (old.emp_id, old.date);
+END;
+
+-- Backfill from the rows that existed before this migration
+INSERT OR REPLACE INTO rollup_department_daily (date, department, present, minutes_worked, late)
+SELECT a.date, e.department, COUNT(*),
+       COALESCE(SUM(MAX(0, CAST(ROUND((julianday(a.date || ' ' || a.logout_time)
+                                       - julianday(a.date || ' ' || a.login_time)) * 1440) AS INTEGER))), 0),
+       COALESCE(SUM(a.login_time > '09:30:00'), 0)
+FROM attendance a JOIN employees e ON e.emp_id = a.emp_id
+WHERE a.status = 'present'
+GROUP BY a.date, e.department;
+
+INSERT OR REPLACE INTO rollup_department_monthly (month, department, present, minutes_worked, late)
+SELECT substr(date, 1, 7), department, SUM(present), SUM(minutes_worked), SUM(late)
+FROM rollup_department_daily
+GROUP BY substr(date, 1, 7), department;
+
+INSERT OR REPLACE INTO rollup_employee_monthly (emp_id, month, present, minutes_worked, late)
+SELECT emp_id, substr(date, 1, 7), COUNT(*),
+       COALESCE(SUM(MAX(0, CAST(ROUND((julianday(date || ' ' || logout_time)
+                                       - julianday(date || ' ' || login_time)) * 1440) AS INTEGER))), 0),
+       COALESCE(SUM(login_time > '09:30:00'), 0)
+FROM attendance
+WHERE status = 'present'
+GROUP BY emp_id, substr(date, 1, 7);
@@ -0,0 +1,41 @@
+-- Interval index over leaves that still count (pending or approved), kept in sync by triggers.
+-- An R*Tree answers "which leaves touch [a, b]" in O(log n + k) instead of scanning every
+-- leave that started before b. Days are integers counted from 1970-01-01, both ends inclusive.
+-- Rows with unparseable or reversed dates (possible before apply_leave validated them) are
+-- left out rather than aborting the write.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS leave_intervals USING rtree_i32(
+    id,                  -- leaves.id
+    first_day, last_day,
+    +emp_id, +status
+);
+
+CREATE TRIGGER IF NOT EXISTS leave_intervals_after_insert AFTER INSERT ON leaves
+WHEN new.status IN ('pending', 'approved')
+ AND julianday(new.from_date) IS NOT NULL AND julianday(new.to_date) >= julianday(new.from_date) BEGIN
+    INSERT INTO leave_intervals (id, first_day, last_day, emp_id, status)
+    VALUES (new.id, CAST(julianday(new.from_date) - 2440587.5 AS INTEGER),
+            CAST(julianday(new.to_date) - 2440587.5 AS INTEGER), new.emp_id, new.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS leave_intervals_after_update
+AFTER UPDATE OF emp_id, from_date, to_date, status ON leaves BEGIN
+    DELETE FROM leave_intervals WHERE id = old.id;
+    INSERT INTO leave_intervals (id, first_day, last_day, emp_id, status)
+    SELECT new.id, CAST(julianday(new.from_date) - 2440587.5 AS INTEGER),
+           CAST(julianday(new.to_date) - 2440587.5 AS INTEGER), new.emp_id, new.status
+    WHERE new.status IN ('pending', 'approved')
+      AND julianday(new.from_date) IS NOT NULL AND julianday(new.to_date) >= julianday(new.from_date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS leave_intervals_after_delete AFTER DELETE ON leaves BEGIN
+    DELETE FROM leave_intervals WHERE id = old.id;
+END;
+
+-- Backfill from the leaves that existed before this migration
+INSERT OR REPLACE INTO leave_intervals (id, first_day, last_day, emp_id, status)
+SELECT id, CAST(julianday(from_date) - 2440587.5 AS INTEGER),
+       CAST(julianday(to_date) - 2440587.5 AS INTEGER), emp_id, status
+FROM leaves
+WHERE status IN ('pending', 'approved')
+  AND julianday(from_date) IS NOT NULL AND julianday(to_date) >= julianday(from_date);
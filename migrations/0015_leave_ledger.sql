@@ -0,0 +1,58 @@
+-- Leave balances as an append-only ledger plus a running total per (employee, leave type).
+--   leave_policies   days credited per month for each leave type, and the carry-over cap
+--   leave_ledger     every credit (monthly accrual) and debit (approved leave); the source of truth
+--   leave_balances   SUM(delta) per employee and type, kept current by a trigger on the ledger
+-- Approving a leave posts its debit in the same transaction as the status change (leaves.decide_leaves),
+-- and `flask --app app accrue-leave` / the accrual thread credit each month once.
+-- `flask --app app rebuild-leave-balances` recomputes leave_balances from the ledger and reports drift.
+
+CREATE TABLE IF NOT EXISTS leave_policies (
+    type TEXT PRIMARY KEY,
+    monthly_accrual REAL NOT NULL,
+    max_balance REAL            -- NULL: no cap on carry-over
+);
+
+INSERT OR IGNORE INTO leave_policies (type, monthly_accrual, max_balance) VALUES
+    ('casual', 1.0, 12),
+    ('sick', 1.0, 12),
+    ('paid', 1.5, 45);
+
+CREATE TABLE IF NOT EXISTS leave_ledger (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    emp_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    delta REAL NOT NULL,
+    kind TEXT NOT NULL,         -- 'accrual' or 'leave'
+    period TEXT,                -- YYYY-MM for accruals
+    leave_id INTEGER,           -- leaves.id for debits
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- One accrual per employee, type and month, and one debit per leave, so re-running either is harmless
+CREATE UNIQUE INDEX IF NOT EXISTS idx_leave_ledger_accrual
+ON leave_ledger (emp_id, type, period) WHERE kind = 'accrual';
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_leave_ledger_leave
+ON leave_ledger (leave_id) WHERE kind = 'leave';
+
+CREATE INDEX IF NOT EXISTS idx_leave_ledger_emp_id ON leave_ledger (emp_id, type);
+
+CREATE TABLE IF NOT EXISTS leave_balances (
+    emp_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    balance REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (emp_id, type)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS leave_ledger_after_insert AFTER INSERT ON leave_ledger BEGIN
+    INSERT INTO leave_balances (emp_id, type, balance) VALUES (new.emp_id, new.type, new.delta)
+    ON CONFLICT (emp_id, type) DO UPDATE SET balance = balance + excluded.balance;
+    INSERT INTO cache_versions (tag, version) VALUES ('leaves:' || new.emp_id, 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+-- Debit the leaves approved before the ledger existed
+INSERT INTO leave_ledger (emp_id, type, delta, kind, leave_id)
+SELECT emp_id, type, -(CAST(julianday(to_date) - julianday(from_date) AS INTEGER) + 1), 'leave', id
+FROM leaves
+WHERE status = 'approved' AND julianday(to_date) >= julianday(from_date);
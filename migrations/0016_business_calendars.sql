@@ -0,0 +1,52 @@
+-- Business calendars for counting working days in a leave.
+--   calendars   one row per location; weekmask is Monday..Sunday, '1' for a working day
+--   holidays    non-working dates per calendar
+-- Employees use the calendar named by employees.location, or 'default' when it is unset or unknown.
+-- Triggers bump the 'calendars' cache tag so each process reloads its in-memory calendars on change.
+
+CREATE TABLE IF NOT EXISTS calendars (
+    location TEXT PRIMARY KEY,
+    name TEXT,
+    weekmask TEXT NOT NULL DEFAULT '1111100' CHECK (length(weekmask) = 7 AND weekmask NOT GLOB '*[^01]*')
+);
+
+INSERT OR IGNORE INTO calendars (location, name, weekmask) VALUES ('default', 'Default (Mon-Fri)', '1111100');
+
+CREATE TABLE IF NOT EXISTS holidays (
+    location TEXT NOT NULL,
+    date TEXT NOT NULL,
+    name TEXT,
+    PRIMARY KEY (location, date)
+) WITHOUT ROWID;
+
+ALTER TABLE employees ADD COLUMN location TEXT;
+
+CREATE TRIGGER IF NOT EXISTS cache_calendars_after_insert AFTER INSERT ON calendars BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('calendars', 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_calendars_after_update AFTER UPDATE ON calendars BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('calendars', 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_calendars_after_delete AFTER DELETE ON calendars BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('calendars', 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_holidays_after_insert AFTER INSERT ON holidays BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('calendars', 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_holidays_after_update AFTER UPDATE ON holidays BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('calendars', 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS cache_holidays_after_delete AFTER DELETE ON holidays BEGIN
+    INSERT INTO cache_versions (tag, version) VALUES ('calendars', 1)
+    ON CONFLICT (tag) DO UPDATE SET version = version + 1;
+END;
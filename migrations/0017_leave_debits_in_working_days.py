@@ -0,0 +1,68 @@
+"""Re-count leave debits in working days.
+
+0015 backfilled the debits of leaves approved before the ledger existed in
+calendar days (weekends and holidays included), while approvals since 0016
+debit working days on the employee's business calendar. Each leave whose
+debits don't match its working days gets a 'correction' row for the
+difference, so the ledger stays append-only and leave_balances (kept by the
+ledger trigger) follows. Leaves with unparseable dates are left alone.
+
+The working-day count is a frozen copy of BusinessCalendar as of this
+migration, so later changes to calendars.py don't change what it does.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+# calendars.DEFAULT_LOCATION and BusinessCalendar's default weekmask when this was written
+DEFAULT_LOCATION = "default"
+DEFAULT_WEEKMASK = "1111100"
+
+
+def calendar(weekmask, holidays):
+    """(weekmask flags, sorted ordinals of holidays that fall on a working weekday)."""
+    working = [ch == "1" for ch in weekmask]
+    ordinals = sorted({date.fromisoformat(day).toordinal() for day in holidays})
+    return working, [day for day in ordinals if working[(day - 1) % 7]]
+
+
+def working_days(cal, from_date, to_date):
+    """Working days in [from_date, to_date], both YYYY-MM-DD and inclusive; 0 if reversed."""
+    working, holidays = cal
+    first, last = date.fromisoformat(from_date).toordinal(), date.fromisoformat(to_date).toordinal()
+    if last < first:
+        return 0
+    weeks, extra = divmod(last - first + 1, 7)
+    weekday = (first - 1) % 7  # ordinal 1 (0001-01-01) was a Monday
+    return (weeks * sum(working) + sum(working[(weekday + k) % 7] for k in range(extra))
+            - (bisect_right(holidays, last) - bisect_left(holidays, first)))
+
+
+def migrate(conn):
+    holidays = {}
+    for location, day in conn.execute("SELECT location, date FROM holidays"):
+        holidays.setdefault(location, []).append(day)
+    calendars = {
+        location: calendar(weekmask, holidays.get(location, ()))
+        for location, weekmask in conn.execute("SELECT location, weekmask FROM calendars")
+    }
+    default = calendars.get(DEFAULT_LOCATION) or calendar(DEFAULT_WEEKMASK, ())
+
+    debited = conn.execute(
+        """SELECT l.id, l.emp_id, l.type, l.from_date, l.to_date, e.location, SUM(g.delta)
+           FROM leave_ledger g JOIN leaves l ON l.id = g.leave_id
+           LEFT JOIN employees e ON e.emp_id = l.emp_id
+           WHERE g.kind IN ('leave', 'correction')
+           GROUP BY l.id"""
+    ).fetchall()
+    corrections = []
+    for leave_id, emp_id, leave_type, from_date, to_date, location, delta in debited:
+        try:
+            days = working_days(calendars.get(location) or default, from_date, to_date)
+        except ValueError:
+            continue
+        if delta != -days:
+            corrections.append((emp_id, leave_type, -days - delta, leave_id))
+    conn.executemany(
+        "INSERT INTO leave_ledger (emp_id, type, delta, kind, leave_id) VALUES (?, ?, ?, 'correction', ?)",
+        corrections,
+    )
@@ -0,0 +1,9 @@
+-- Covering indexes for the pending queue's first-page facet counts and total, so none of them
+-- needs a temp b-tree. Both lead with status so the planner prefers them over
+-- idx_leaves_status_applied_at for WHERE status = 'pending', and carry the filter columns.
+
+-- Type facet: GROUP BY l.type, rows already in type order
+CREATE INDEX IF NOT EXISTS idx_leaves_status_type ON leaves (status, type, emp_id, from_date, to_date);
+
+-- Department facet and total: one probe per employee on (status, emp_id)
+CREATE INDEX IF NOT EXISTS idx_leaves_status_emp_id ON leaves (status, emp_id, type, from_date, to_date);
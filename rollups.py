@@ -0,0 +1,188 @@
+import logging
+
+from db import get_connection
+from jobs import start_periodic
+
+logger = logging.getLogger(__name__)
+
+# Logins after this count as late arrivals (same cutoff as migrations 0012 and 0013)
+LATE_AFTER = "09:30:00"
+
+# Changes folded per transaction, so the write lock is never held for long
+ROLLUP_BATCH = 5000
+
+# Minutes between login and logout; NULL while the row is still open
+MINUTES_WORKED = """MAX(0, CAST(ROUND((julianday(a.date || ' ' || a.logout_time)
+                                       - julianday(a.date || ' ' || a.login_time)) * 1440) AS INTEGER))"""
+
+DEPARTMENT_DAILY_SOURCE = f"""
+    SELECT a.date, e.department, COUNT(*), COALESCE(SUM({MINUTES_WORKED}), 0), COALESCE(SUM(a.login_time > ?), 0)
+    FROM attendance a JOIN employees e ON e.emp_id = a.emp_id
+    WHERE a.status = 'present' {{where}}
+    GROUP BY a.date, e.department"""
+
+DEPARTMENT_MONTHLY_SOURCE = """
+    SELECT substr(date, 1, 7), department, SUM(present), SUM(minutes_worked), SUM(late)
+    FROM rollup_department_daily {where}
+    GROUP BY substr(date, 1, 7), department"""
+
+EMPLOYEE_MONTHLY_SOURCE = f"""
+    SELECT a.emp_id, substr(a.date, 1, 7), COUNT(*), COALESCE(SUM({MINUTES_WORKED}), 0), COALESCE(SUM(a.login_time > ?), 0)
+    FROM attendance a
+    WHERE a.status = 'present' {{where}}
+    GROUP BY a.emp_id, substr(a.date, 1, 7)"""
+
+
+def _month_bounds(month):
+    return f"{month}-01", f"{month}-31"
+
+
+def _fold(conn, keys):
+    """Recompute every rollup row that the changed (emp_id, date) keys can affect."""
+    dates = sorted({date for _, date in keys})
+    months = sorted({date[:7] for date in dates})
+
+    for date in dates:
+        conn.execute("DELETE FROM rollup_department_daily WHERE date = ?", (date,))
+        conn.execute(
+            "INSERT INTO rollup_department_daily (date, department, present, minutes_worked, late)"
+            + DEPARTMENT_DAILY_SOURCE.format(where="AND a.date = ?"),
+            (LATE_AFTER, date),
+        )
+
+    for month in months:
+        conn.execute("DELETE FROM rollup_department_monthly WHERE month = ?", (month,))
+        conn.execute(
+            "INSERT INTO rollup_department_monthly (month, department, present, minutes_worked, late)"
+            + DEPARTMENT_MONTHLY_SOURCE.format(where="WHERE date BETWEEN ? AND ?"),
+            _month_bounds(month),
+        )
+
+    for emp_id, month in sorted({(emp_id, date[:7]) for emp_id, date in keys}):
+        conn.execute("DELETE FROM rollup_employee_monthly WHERE emp_id = ? AND month = ?", (emp_id, month))
+        conn.execute(
+            "INSERT INTO rollup_employee_monthly (emp_id, month, present, minutes_worked, late)"
+            + EMPLOYEE_MONTHLY_SOURCE.format(where="AND a.emp_id = ? AND a.date BETWEEN ? AND ?"),
+            (LATE_AFTER, emp_id, *_month_bounds(month)),
+        )
+
+
+def refresh_attendance_rollups(conn, batch=ROLLUP_BATCH):
+    """Fold up to `batch` attendance changes past the watermark into the rollups.
+
+    Runs under BEGIN IMMEDIATE and re-reads the watermark inside the lock,
+    so several processes can run the aggregator safely. Returns the number
+    of changes folded; call again until it returns 0 to catch up fully.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT seq FROM rollup_watermarks WHERE name = 'attendance'").fetchone()
+        watermark = row[0] if row else 0
+        changes = conn.execute(
+            "SELECT seq, emp_id, date FROM attendance_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (watermark, batch),
+        ).fetchall()
+        if not changes:
+            conn.rollback()
+            return 0
+
+        _fold(conn, {(change[1], change[2]) for change in changes})
+        watermark = changes[-1][0]
+        conn.execute(
+            """INSERT INTO rollup_watermarks (name, seq) VALUES ('attendance', ?)
+               ON CONFLICT (name) DO UPDATE SET seq = excluded.seq""",
+            (watermark,),
+        )
+        conn.execute("DELETE FROM attendance_changes WHERE seq <= ?", (watermark,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(changes)
+
+
+def rebuild_attendance_rollups(conn):
+    """Recompute all rollups from the attendance table and clear the change log."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM rollup_department_daily")
+        conn.execute("DELETE FROM rollup_department_monthly")
+        conn.execute("DELETE FROM rollup_employee_monthly")
+        conn.execute(
+            "INSERT INTO rollup_department_daily (date, department, present, minutes_worked, late)"
+            + DEPARTMENT_DAILY_SOURCE.format(where=""),
+            (LATE_AFTER,),
+        )
+        conn.execute(
+            "INSERT INTO rollup_department_monthly (month, department, present, minutes_worked, late)"
+            + DEPARTMENT_MONTHLY_SOURCE.format(where=""),
+        )
+        conn.execute(
+            "INSERT INTO rollup_employee_monthly (emp_id, month, present, minutes_worked, late)"
+            + EMPLOYEE_MONTHLY_SOURCE.format(where=""),
+            (LATE_AFTER,),
+        )
+        watermark = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM attendance_changes").fetchone()[0]
+        conn.execute(
+            """INSERT INTO rollup_watermarks (name, seq) VALUES ('attendance', ?)
+               ON CONFLICT (name) DO UPDATE SET seq = MAX(seq, excluded.seq)""",
+            (watermark,),
+        )
+        conn.execute("DELETE FROM attendance_changes WHERE seq <= ?", (watermark,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# Monthly summary reads: one employee, one department, or every department summed
+EMPLOYEE_MONTHLY_SQL = """SELECT month, present, minutes_worked, late FROM rollup_employee_monthly
+    WHERE emp_id = ? AND month BETWEEN ? AND ? ORDER BY month"""
+DEPARTMENT_MONTHLY_SQL = """SELECT month, present, minutes_worked, late FROM rollup_department_monthly
+    WHERE month BETWEEN ? AND ? AND department = ? ORDER BY month"""
+COMPANY_MONTHLY_SQL = """SELECT month, SUM(present), SUM(minutes_worked), SUM(late) FROM rollup_department_monthly
+    WHERE month BETWEEN ? AND ? GROUP BY month ORDER BY month"""
+
+
+def read_monthly_attendance(conn, year, department=None, emp_id=None):
+    """Per-month present days, minutes worked and late arrivals for one year, from the rollups.
+
+    Scoped to one employee, one department, or (by default) every department.
+    Returns [{"month", "present", "minutes_worked", "late"}] for months with data.
+    """
+    bounds = (f"{year:04d}-01", f"{year:04d}-12")
+    if emp_id:
+        sql, params = EMPLOYEE_MONTHLY_SQL, (emp_id, *bounds)
+    elif department:
+        sql, params = DEPARTMENT_MONTHLY_SQL, (*bounds, department)
+    else:
+        sql, params = COMPANY_MONTHLY_SQL, bounds
+    return [
+        {"month": row[0], "present": row[1], "minutes_worked": row[2], "late": row[3]}
+        for row in conn.execute(sql, params)
+    ]
+
+
+def aggregate_once():
+    """Fold every pending attendance change on a dedicated connection; returns how many."""
+    conn = get_connection()
+    try:
+        total = 0
+        while True:
+            folded = refresh_attendance_rollups(conn)
+            if not folded:
+                return total
+            total += folded
+    finally:
+        conn.close()
+
+
+def _aggregate_and_log():
+    folded = aggregate_once()
+    if folded:
+        logger.info("Folded %d attendance change(s) into the rollups", folded)
+
+
+def start_rollup_aggregator(interval):
+    """Run aggregate_once() every `interval` seconds on a daemon thread (once per process)."""
+    return start_periodic("attendance-rollup-aggregator", _aggregate_and_log, interval)
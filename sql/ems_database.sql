@@ -1,3 +1,7 @@
+-- Legacy SQL Server setup script, kept for reference only and not maintained.
+-- The application is SQLite-only: its schema (dashboard_counters, cache_versions,
+-- activity_events, the leave ledger, calendars, ...) lives in migrations/ and is
+-- applied with `flask --app app migrate`.
 
 USE project;
 GO
@@ -25,6 +25,7 @@ function toggleAttendance() {
                 return;
             }
 
+            attendanceMonths = {};
             attendanceLoggedIn = action === "login" && !data.logout_time;
             status.innerText = attendanceLoggedIn ? "Logged In" : "Not Logged In";
             status.style.color = attendanceLoggedIn ? "green" : "";
@@ -59,6 +60,7 @@ function toggleAdminAttendance() {
                 return;
             }
 
+            attendanceMonths = {};
             adminAttendanceLoggedIn = action === "login" && !data.logout_time;
             status.innerText = adminAttendanceLoggedIn ? "Logged In" : "Not Logged In";
             status.style.color = adminAttendanceLoggedIn ? "green" : "";
@@ -148,28 +150,230 @@ function applyLeave(event) {
         .catch((err) => alert("Failed to apply leave"));
 }
 
+/* Employee leave history - the dashboard renders the first page, "Load more" pages /api/me/leaves */
+async function loadMoreLeaves(button) {
+    const list = document.getElementById("myLeavesList");
+    button.disabled = true;
+    const params = new URLSearchParams({
+        limit: 20,
+        before_at: button.dataset.beforeAt,
+        before_id: button.dataset.beforeId,
+    });
+    try {
+        const res = await fetch(`/api/me/leaves?${params}`);
+        if (!res.ok) throw new Error(res.statusText);
+        const data = await res.json();
+        for (const leave of data.leaves) {
+            const card = document.createElement("div");
+            card.className = "my-leave-card";
+            const dates = document.createElement("p");
+            const type = document.createElement("strong");
+            type.textContent = leave.type.charAt(0).toUpperCase() + leave.type.slice(1);
+            dates.appendChild(type);
+            dates.appendChild(document.createTextNode(` | ${leave.from_date} - ${leave.to_date}`));
+            const reason = document.createElement("p");
+            reason.textContent = leave.reason || "-";
+            const status = document.createElement("p");
+            const small = document.createElement("small");
+            const badge = document.createElement("span");
+            badge.className = `status-${leave.status}`;
+            badge.textContent = leave.status.charAt(0).toUpperCase() + leave.status.slice(1);
+            small.append("Status: ", badge);
+            status.appendChild(small);
+            card.append(dates, reason, status);
+            list.appendChild(card);
+        }
+        if (data.next_cursor) {
+            button.dataset.beforeAt = data.next_cursor.before_at;
+            button.dataset.beforeId = data.next_cursor.before_id;
+            button.disabled = false;
+        } else {
+            button.remove();
+        }
+    } catch (e) {
+        console.warn("Could not load more leaves", e);
+        button.disabled = false;
+    }
+}
+
+/* Employee directory - pages from /api/employees as the table scrolls into view */
+const employeeDirectory = { cursor: null, done: false, loading: false, department: "", observer: null };
+
+async function loadEmployeeDirectoryPage() {
+    const body = document.getElementById("employeeDirectoryBody");
+    const sentinel = document.getElementById("employeeDirectorySentinel");
+    if (!body || employeeDirectory.done || employeeDirectory.loading) return;
+    employeeDirectory.loading = true;
+
+    const params = new URLSearchParams({ limit: 50 });
+    if (employeeDirectory.cursor) params.set("cursor", employeeDirectory.cursor);
+    if (employeeDirectory.department) params.set("department", employeeDirectory.department);
+
+    try {
+        const res = await fetch(`/api/employees?${params}`);
+        if (!res.ok) throw new Error(res.statusText);
+        const data = await res.json();
+        for (const emp of data.employees) {
+            const row = document.createElement("tr");
+            for (const value of [emp.name, emp.emp_id, emp.department, emp.join_date || "-"]) {
+                const cell = document.createElement("td");
+                cell.textContent = value;
+                row.appendChild(cell);
+            }
+            const status = document.createElement("td");
+            status.style.color = "green";
+            status.textContent = "Active";
+            row.appendChild(status);
+            body.appendChild(row);
+        }
+        employeeDirectory.cursor = data.next_cursor;
+        employeeDirectory.done = !data.next_cursor;
+        if (employeeDirectory.done) {
+            sentinel.textContent = body.children.length ? "" : "No employees found.";
+        }
+    } catch (e) {
+        console.warn("Could not load employee directory", e);
+        sentinel.textContent = "Could not load employees.";
+        employeeDirectory.done = true;
+    } finally {
+        employeeDirectory.loading = false;
+    }
+}
+
+function initEmployeeDirectory() {
+    const sentinel = document.getElementById("employeeDirectorySentinel");
+    if (!sentinel) return;
+    employeeDirectory.observer = new IntersectionObserver((entries) => {
+        if (entries.some((entry) => entry.isIntersecting)) loadEmployeeDirectoryPage();
+    });
+    employeeDirectory.observer.observe(sentinel);
+}
+
+function filterEmployeeDirectory(event) {
+    event.preventDefault();
+    employeeDirectory.department = document.getElementById("directoryDepartment").value.trim();
+    employeeDirectory.cursor = null;
+    employeeDirectory.done = false;
+    document.getElementById("employeeDirectoryBody").innerHTML = "";
+    document.getElementById("employeeDirectorySentinel").textContent = "Loading employees…";
+    // Re-observe so the sentinel fires again if it is already on screen
+    employeeDirectory.observer.unobserve(document.getElementById("employeeDirectorySentinel"));
+    employeeDirectory.observer.observe(document.getElementById("employeeDirectorySentinel"));
+}
+
+/* Employee typeahead - /api/employees/search, debounced, stale responses dropped */
+let employeeSearchTimer = null;
+let employeeSearchSeq = 0;
+
+function searchEmployees() {
+    clearTimeout(employeeSearchTimer);
+    employeeSearchTimer = setTimeout(async () => {
+        const input = document.getElementById("employeeSearch");
+        const results = document.getElementById("employeeSearchResults");
+        const q = input.value.trim();
+        const seq = ++employeeSearchSeq;
+        if (q.length < 2) {
+            results.innerHTML = "";
+            return;
+        }
+        try {
+            const res = await fetch(`/api/employees/search?${new URLSearchParams({ q })}`);
+            if (!res.ok || seq !== employeeSearchSeq) return;
+            const data = await res.json();
+            results.innerHTML = "";
+            for (const emp of data.employees) {
+                const item = document.createElement("li");
+                item.textContent = `${emp.name} (${emp.emp_id}) - ${emp.department}`;
+                item.title = emp.email;
+                results.appendChild(item);
+            }
+            if (!data.employees.length) {
+                results.innerHTML = '<li class="text-muted">No matches</li>';
+            }
+        } catch (e) {
+            console.warn("Employee search failed", e);
+        }
+    }, 120);
+}
+
 /* Calendar - Present / Absent / Weekend */
 let currentMonth = new Date().getMonth();
 let currentYear = new Date().getFullYear();
 const monthNames = ['January','February','March','April','May','June','July','August','September','October','November','December'];
 
+/* Attendance by month, filled a year at a time from /api/attendance/range:
+   'YYYY-MM' -> promise of { 'YYYY-MM-DD': {status, login_time, logout_time} } */
+let attendanceMonths = {};
+
+function isoDate(d) {
+    return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+}
+
+function minutesToTime(minutes) {
+    if (minutes === null || minutes === undefined) return null;
+    return `${String(Math.floor(minutes / 60)).padStart(2, '0')}:${String(minutes % 60).padStart(2, '0')}`;
+}
+
+// Fetch the 12 months around (year, monthIndex) in one request and split them per month
+function loadAttendanceWindow(year, monthIndex) {
+    const from = new Date(year, monthIndex - 6, 1);
+    const to = new Date(year, monthIndex + 6, 0);
+    const request = fetch(`/api/attendance/range?${new URLSearchParams({ from: isoDate(from), to: isoDate(to) })}`)
+        .then((res) => {
+            // An error response must not be cached as 12 empty months; the .catch below clears the cache
+            if (!res.ok) throw new Error(res.statusText);
+            return res.json();
+        })
+        .then((data) => {
+            const byMonth = {};
+            const [y, m, d] = data.from.split('-').map(Number);
+            const bits = atob(data.present);
+            let n = 0;
+            for (let i = 0; i < data.days; i++) {
+                if (!(bits.charCodeAt(i >> 3) & (1 << (i & 7)))) continue;
+                const day = isoDate(new Date(y, m - 1, d + i));
+                (byMonth[day.slice(0, 7)] ||= {})[day] = {
+                    status: 'present',
+                    login_time: minutesToTime(data.login[n]),
+                    logout_time: minutesToTime(data.logout[n]),
+                };
+                n++;
+            }
+            return byMonth;
+        })
+        .catch((e) => {
+            console.warn("Could not fetch attendance for calendar", e);
+            attendanceMonths = {};  // retry on the next render
+            return {};
+        });
+    for (let d = new Date(from); d <= to; d.setMonth(d.getMonth() + 1)) {
+        const key = isoDate(d).slice(0, 7);
+        if (!attendanceMonths[key]) {
+            attendanceMonths[key] = request.then((byMonth) => byMonth[key] || {});
+        }
+    }
+}
+
+async function getAttendanceMonth(year, monthIndex) {
+    const key = isoDate(new Date(year, monthIndex, 1)).slice(0, 7);
+    if (!attendanceMonths[key]) loadAttendanceWindow(year, monthIndex);
+    // Keep the neighbours loaded so month flips never wait on the network
+    for (const offset of [-1, 1]) {
+        const neighbour = new Date(year, monthIndex + offset, 1);
+        if (!attendanceMonths[isoDate(neighbour).slice(0, 7)]) {
+            loadAttendanceWindow(neighbour.getFullYear(), neighbour.getMonth());
+        }
+    }
+    return attendanceMonths[key];
+}
+
 async function generateCalendar(calendarId) {
     const calendar = document.getElementById(calendarId);
     if (!calendar) return;
 
     const month = currentMonth + 1;
     const year = currentYear;
-    let attendanceData = {};
-
-    try {
-        const res = await fetch(`/api/attendance/${month}/${year}`);
-        if (res.ok) {
-            const data = await res.json();
-            attendanceData = data.attendance || {};
-        }
-    } catch (e) {
-        console.warn("Could not fetch attendance for calendar", e);
-    }
+    const attendanceData = await getAttendanceMonth(currentYear, currentMonth);
 
     calendar.innerHTML = `
         <div class="calendar-header">
@@ -222,8 +426,37 @@ async function generateCalendar(calendarId) {
             cell.classList.add('today');
         }
 
+        cell.dataset.date = dateStr;
         daysContainer.appendChild(cell);
     }
+
+    if (calendarId === 'adminCalendar') {
+        annotateCompanyAttendance(daysContainer, year, month, daysInMonth);
+    }
+}
+
+// Admin calendar: add company-wide present/late/absent counts to each day
+async function annotateCompanyAttendance(daysContainer, year, month, daysInMonth) {
+    const mm = String(month).padStart(2, '0');
+    const params = new URLSearchParams({ from: `${year}-${mm}-01`, to: `${year}-${mm}-${String(daysInMonth).padStart(2, '0')}` });
+    let heatmap;
+    try {
+        const res = await fetch(`/api/admin/attendance/heatmap?${params}`);
+        if (!res.ok) return;
+        heatmap = await res.json();
+    } catch (e) {
+        console.warn("Could not fetch company attendance", e);
+        return;
+    }
+    for (let i = 0; i < heatmap.days; i++) {
+        const cell = daysContainer.querySelector(`[data-date="${year}-${mm}-${String(i + 1).padStart(2, '0')}"]`);
+        if (!cell || !(heatmap.present[i] || heatmap.absent[i])) continue;
+        const count = document.createElement('span');
+        count.className = 'day-count';
+        count.textContent = `${heatmap.present[i]}/${heatmap.present[i] + heatmap.absent[i]}`;
+        cell.appendChild(count);
+        cell.title += ` | Company: ${heatmap.present[i]} present (${heatmap.late[i]} late), ${heatmap.absent[i]} absent`;
+    }
 }
 
 function changeMonth(calendarId, direction) {
@@ -243,5 +476,245 @@ window.onload = function() {
         const adminCal = document.getElementById('adminCalendar');
         if (empCal) generateCalendar('employeeCalendar');
         if (adminCal) generateCalendar('adminCalendar');
+        initEmployeeDirectory();
+        initPendingLeaves();
     }, 100);
 };
+
+/* Admin export - the server streams the file, so just navigate to it */
+function exportData(event) {
+    event.preventDefault();
+    const params = new URLSearchParams({ format: document.getElementById('exportFormat').value });
+    const from = document.getElementById('exportFrom').value;
+    const to = document.getElementById('exportTo').value;
+    const department = document.getElementById('exportDepartment').value.trim();
+    if (from) params.set('from', from);
+    if (to) params.set('to', to);
+    if (department) params.set('department', department);
+    window.location = `/admin/export/${document.getElementById('exportEntity').value}?${params}`;
+}
+
+/* Admin bulk import - upload a CSV/JSON file and list the rejected rows */
+function importEmployees(event) {
+    event.preventDefault();
+    const form = event.target;
+    const result = document.getElementById('importResult');
+    result.textContent = 'Importing…';
+    fetch('/admin/import/employees', { method: 'POST', body: new FormData(form) })
+        .then((r) => r.json())
+        .then((data) => {
+            if (data.error) {
+                result.textContent = data.error;
+                return;
+            }
+            result.innerHTML = '';
+            const summary = document.createElement('p');
+            summary.textContent = `Imported ${data.inserted} employee(s), rejected ${data.rejected}.`;
+            result.appendChild(summary);
+            if (data.errors.length) {
+                const list = document.createElement('ul');
+                data.errors.forEach((e) => {
+                    const item = document.createElement('li');
+                    item.textContent = `Row ${e.row ?? '-'}${e.emp_id ? ' (' + e.emp_id + ')' : ''}: ${e.errors.join('; ')}`;
+                    list.appendChild(item);
+                });
+                result.appendChild(list);
+            }
+            form.reset();
+        })
+        .catch(() => { result.textContent = 'Import failed'; });
+}
+
+/* Pending leave queue - pages from /api/leaves/pending as the list scrolls into view */
+const pendingLeaves = { cursor: null, done: false, loading: false, filters: {}, observer: null, seq: 0 };
+
+function renderLeaveCard(leave) {
+    const card = document.createElement('div');
+    card.className = 'leave-card';
+    card.dataset.leaveId = leave.id;
+
+    const select = document.createElement('input');
+    select.type = 'checkbox';
+    select.className = 'leave-select';
+    select.value = leave.id;
+    select.setAttribute('aria-label', `Select leave ${leave.id}`);
+    card.appendChild(select);
+
+    const body = document.createElement('div');
+    body.className = 'leave-card-body';
+    const title = document.createElement('h4');
+    title.textContent = `${leave.name} `;
+    const empId = document.createElement('small');
+    empId.textContent = `(${leave.emp_id})`;
+    title.appendChild(empId);
+    body.appendChild(title);
+
+    const dates = document.createElement('p');
+    const type = document.createElement('strong');
+    type.textContent = leave.type.charAt(0).toUpperCase() + leave.type.slice(1);
+    dates.appendChild(type);
+    let span = ` | ${leave.from_date} - ${leave.to_date}`;
+    if (leave.working_days !== null && leave.working_days !== undefined) {
+        span += ` (${leave.working_days} working day${leave.working_days === 1 ? '' : 's'})`;
+    }
+    dates.appendChild(document.createTextNode(span));
+    body.appendChild(dates);
+
+    const reason = document.createElement('p');
+    reason.textContent = leave.reason || '-';
+    body.appendChild(reason);
+
+    if (leave.coverage) {
+        const coverage = document.createElement('p');
+        coverage.className = 'leave-coverage' + (leave.coverage.warn ? ' warn' : '');
+        coverage.textContent = `${leave.coverage.out} other ${leave.department} staff out at peak`
+            + (leave.coverage.peak_date ? ` (${leave.coverage.peak_date})` : '')
+            + `, of ${leave.coverage.headcount}`;
+        body.appendChild(coverage);
+    }
+    card.appendChild(body);
+
+    const actions = document.createElement('div');
+    actions.className = 'leave-card-actions';
+    for (const [decision, label, cls] of [['approve', 'Approve', 'btn'], ['reject', 'Reject', 'btn danger']]) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = cls;
+        button.textContent = label;
+        button.onclick = () => decideLeaves([leave.id], decision);
+        actions.appendChild(button);
+    }
+    card.appendChild(actions);
+    return card;
+}
+
+function fillFacet(selectId, counts, allLabel) {
+    const select = document.getElementById(selectId);
+    const current = select.value;
+    select.innerHTML = '';
+    select.appendChild(new Option(allLabel, ''));
+    for (const [value, count] of Object.entries(counts)) {
+        select.appendChild(new Option(`${value} (${count})`, value));
+    }
+    select.value = current in counts ? current : '';
+}
+
+async function loadPendingLeavesPage() {
+    const list = document.getElementById('pendingLeavesList');
+    const sentinel = document.getElementById('pendingLeavesSentinel');
+    if (!list || pendingLeaves.done || pendingLeaves.loading) return;
+    pendingLeaves.loading = true;
+    const seq = pendingLeaves.seq;
+
+    const params = new URLSearchParams({ limit: 25 });
+    for (const [key, value] of Object.entries(pendingLeaves.filters)) {
+        if (value) params.set(key, value);
+    }
+    if (pendingLeaves.cursor) {
+        params.set('before_at', pendingLeaves.cursor.before_at);
+        params.set('before_id', pendingLeaves.cursor.before_id);
+    }
+
+    try {
+        const res = await fetch(`/api/leaves/pending?${params}`);
+        if (!res.ok) throw new Error(res.statusText);
+        const data = await res.json();
+        if (seq !== pendingLeaves.seq) return;  // filters changed while this page was in flight
+        if (data.facets) {
+            fillFacet('pendingLeavesDepartment', data.facets.department, 'All departments');
+            fillFacet('pendingLeavesType', data.facets.type, 'All types');
+            document.getElementById('pendingLeavesCount').textContent = data.total;
+        }
+        for (const leave of data.leaves) {
+            list.appendChild(renderLeaveCard(leave));
+        }
+        pendingLeaves.cursor = data.next_cursor;
+        pendingLeaves.done = !data.next_cursor;
+        sentinel.textContent = pendingLeaves.done && !list.children.length ? 'No pending leave requests.' : '';
+    } catch (e) {
+        if (seq !== pendingLeaves.seq) return;
+        console.warn('Could not load leave requests', e);
+        sentinel.textContent = 'Could not load leave requests.';
+        pendingLeaves.done = true;
+    } finally {
+        if (seq === pendingLeaves.seq) pendingLeaves.loading = false;
+    }
+}
+
+function resetPendingLeaves() {
+    const sentinel = document.getElementById('pendingLeavesSentinel');
+    pendingLeaves.seq += 1;
+    pendingLeaves.cursor = null;
+    pendingLeaves.done = false;
+    pendingLeaves.loading = false;
+    document.getElementById('pendingLeavesList').innerHTML = '';
+    document.getElementById('selectAllLeaves').checked = false;
+    sentinel.textContent = 'Loading leave requests…';
+    // Re-observe so the sentinel fires again if it is already on screen
+    pendingLeaves.observer.unobserve(sentinel);
+    pendingLeaves.observer.observe(sentinel);
+}
+
+function initPendingLeaves() {
+    const sentinel = document.getElementById('pendingLeavesSentinel');
+    if (!sentinel) return;
+    pendingLeaves.observer = new IntersectionObserver((entries) => {
+        if (entries.some((entry) => entry.isIntersecting)) loadPendingLeavesPage();
+    });
+    pendingLeaves.observer.observe(sentinel);
+}
+
+function filterPendingLeaves(event) {
+    event.preventDefault();
+    pendingLeaves.filters = {
+        department: document.getElementById('pendingLeavesDepartment').value,
+        type: document.getElementById('pendingLeavesType').value,
+        from: document.getElementById('pendingLeavesFrom').value,
+        to: document.getElementById('pendingLeavesTo').value,
+    };
+    resetPendingLeaves();
+}
+
+/* Approve/reject one or many loaded requests through /api/leaves/decisions */
+function toggleAllLeaves(checked) {
+    document.querySelectorAll('#leave-requests .leave-select').forEach((box) => { box.checked = checked; });
+}
+
+function decideSelectedLeaves(decision) {
+    const ids = [...document.querySelectorAll('#leave-requests .leave-select:checked')].map((box) => Number(box.value));
+    if (!ids.length) {
+        document.getElementById('leaveBulkStatus').textContent = 'Select at least one request.';
+        return;
+    }
+    decideLeaves(ids, decision);
+}
+
+function decideLeaves(ids, decision) {
+    const status = document.getElementById('leaveBulkStatus');
+    status.textContent = 'Saving…';
+    fetch('/api/leaves/decisions', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ids, decision }),
+    })
+        .then((r) => r.json())
+        .then((data) => {
+            if (data.error) {
+                status.textContent = data.error;
+                return;
+            }
+            // None of these is pending any more, whoever decided it
+            const failed = [];
+            data.results.forEach((result) => {
+                document.querySelector(`#leave-requests .leave-card[data-leave-id="${result.id}"]`)?.remove();
+                if (!result.ok) failed.push(`#${result.id}: ${result.error}`);
+            });
+            const count = document.getElementById('pendingLeavesCount');
+            count.textContent = Math.max(0, Number(count.textContent) - data.updated);
+            document.getElementById('selectAllLeaves').checked = false;
+            status.textContent = `${data.updated} ${data.decision}.` + (failed.length ? ` Skipped ${failed.join(', ')}` : '');
+            // Pull the next page in if the decisions emptied the loaded list
+            if (!document.querySelector('#leave-requests .leave-card') && !pendingLeaves.done) loadPendingLeavesPage();
+        })
+        .catch(() => { status.textContent = 'Failed to save decisions'; });
+}
@@ -0,0 +1,66 @@
+import importlib
+import sys
+
+import pytest
+
+# Modules that read EMS_* settings at import time; reloaded for every test database
+APP_MODULES = (
+    "app", "db", "cache", "counters", "attendance", "exports", "imports",
+    "leaves", "balances", "calendars", "rollups",
+)
+
+
+def _unload():
+    for name in APP_MODULES:
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / "employee.db"
+    monkeypatch.setenv("EMS_DB_PATH", str(path))
+    monkeypatch.setenv("EMS_DB_BACKEND", "sqlite")
+    # Background jobs are exercised directly; keep them from racing the tests
+    for setting in ("EMS_CAP_SWEEP_INTERVAL", "EMS_ROLLUP_INTERVAL", "EMS_LEAVE_ACCRUAL_INTERVAL"):
+        monkeypatch.setenv(setting, "0")
+    monkeypatch.delenv("EMS_ATTENDANCE_WRITE_BEHIND", raising=False)
+    _unload()
+    yield path
+    _unload()
+
+
+@pytest.fixture
+def load_app(db_path):
+    """Import a fresh copy of the app against the test database; returns the app module."""
+    def load():
+        _unload()
+        module = importlib.import_module("app")
+        module.app.config["TESTING"] = True
+        return module
+    return load
+
+
+@pytest.fixture
+def ems(load_app):
+    return load_app()
+
+
+@pytest.fixture
+def client(ems):
+    return ems.app.test_client()
+
+
+def login(client, username, password):
+    response = client.post("/", data={"username": username, "password": password})
+    assert response.status_code == 302, response.data
+    return client
+
+
+@pytest.fixture
+def admin(client):
+    return login(client, "admin", "admin123")
+
+
+@pytest.fixture
+def john(client):
+    return login(client, "john", "pass123")
@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def balances(ems):
+    import balances
+    return balances
+
+
+def read(balances, conn, emp_id):
+    return {row["type"]: row["balance"] for row in balances.read_leave_balances(conn, emp_id)}
+
+
+def test_accrual_posts_once_per_month_and_respects_the_cap(ems, balances):
+    conn = ems.get_connection()
+    posted = balances.accrue_leave(conn, "2030-01")
+    assert posted == 4 * 3  # every seeded employee, every policy
+    assert balances.accrue_leave(conn, "2030-01") == 0
+    for month in range(2, 13):
+        balances.accrue_leave(conn, f"2030-{month:02d}")
+    balances.accrue_leave(conn, "2031-01")
+    # casual and sick stop at their cap of 12; paid (no debits here) keeps growing to 45
+    assert read(balances, conn, "EMP003") == {"casual": 12, "paid": 19.5, "sick": 12}
+    assert balances.rebuild_leave_balances(conn) == []
+    conn.close()
+
+
+def test_credited_month_takes_no_write_lock(ems, balances, db_path):
+    conn = ems.get_connection()
+    balances.accrue_leave(conn, "2030-01")
+    conn.close()
+
+    writer = sqlite3.connect(db_path)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        # Would fail with "database is locked" if it tried to take the write lock
+        checker = sqlite3.connect(db_path, timeout=0)
+        assert balances.accrue_leave(checker, "2030-01") == 0
+        checker.close()
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_new_joiner_is_credited_for_the_month(ems, balances):
+    conn = ems.get_connection()
+    balances.accrue_leave(conn, "2030-01")
+    conn.execute(
+        "INSERT INTO employees (name, emp_id, email, department, join_date) VALUES ('New', 'EMP050', 'n@example.com', 'Ops', '2030-01-20')"
+    )
+    conn.execute(
+        "INSERT INTO employees (name, emp_id, email, department, join_date) VALUES ('Later', 'EMP051', 'l@example.com', 'Ops', '2030-02-03')"
+    )
+    conn.commit()
+    assert balances.accrual_pending(conn, "2030-01")
+    assert balances.accrue_leave(conn, "2030-01") == 3
+    assert not balances.accrual_pending(conn, "2030-01")
+    assert read(balances, conn, "EMP051") == {"casual": 0, "paid": 0, "sick": 0}
+    conn.close()
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+from calendars import BusinessCalendar
+
+
+def brute_force(calendar, first, last):
+    mask = calendar.weekmask
+    holidays = set(calendar.holidays)
+    return sum(
+        1 for day in range(first, last + 1) if mask[(day - 1) % 7] == "1" and day not in holidays
+    )
+
+
+def test_count_matches_a_day_by_day_count():
+    start = date(2030, 1, 1).toordinal()
+    holidays = [date(2030, 1, 1), date(2030, 1, 5), date(2030, 3, 17), "2030-12-25"]
+    for weekmask in ("1111100", "1111001", "0000000", "1111111"):
+        calendar = BusinessCalendar(weekmask, holidays)
+        for offset in range(0, 120, 7):
+            for length in (0, 1, 6, 7, 8, 30, 400):
+                first = start + offset
+                assert calendar.count(first, first + length) == brute_force(calendar, first, first + length)
+    assert BusinessCalendar().count(start, start - 1) == 0
+
+
+def test_working_days_accepts_strings_and_dates():
+    calendar = BusinessCalendar(holidays=["2030-01-01"])
+    assert calendar.working_days("2029-12-31", "2030-01-06") == 4
+    assert calendar.working_days(date(2029, 12, 31), date(2029, 12, 31) + timedelta(days=6)) == 4
+
+
+def test_holidays_card_is_hidden_until_holidays_are_loaded(ems, john):
+    assert b"holidaysNum" not in john.get("/employee").data
+
+    conn = ems.get_connection()
+    conn.execute(
+        "INSERT INTO holidays (location, date, name) VALUES ('default', ?, 'Founders Day')",
+        (date.today().replace(month=6, day=1).isoformat(),),
+    )
+    conn.commit()
+    conn.close()
+    page = john.get("/employee").data
+    assert b'<p id="holidaysNum">1</p>' in page
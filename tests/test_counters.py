@@ -0,0 +1,54 @@
+from datetime import date
+
+from conftest import login
+
+
+def test_triggers_keep_counters_in_step_with_the_tables(ems, client):
+    import counters
+
+    login(client, "admin", "admin123")
+    client.post("/add_employee", data={"name": "Neha", "emp_id": "EMP010", "email": "n@example.com",
+                                       "department": "Finance", "password": "pw"})
+    pending = client.get("/api/leaves/pending").get_json()["leaves"]
+    client.post("/api/leaves/decisions", json={"decision": "approve", "ids": [pending[0]["id"]]})
+    client.post("/attendance", data={"action": "login"})
+    client.get("/logout")
+    login(client, "EMP010", "pw")
+    client.post("/apply_leave", data={"fromDate": "2030-01-07", "toDate": "2030-01-08", "leaveType": "sick"})
+    client.post("/attendance", data={"action": "login"})
+    client.post("/attendance", data={"action": "logout"})
+
+    conn = ems.get_connection()
+    conn.executescript("""
+        INSERT INTO attendance (emp_id, date, status, login_time) VALUES
+            ('EMP001', '2030-01-02', 'present', '10:15:00'),
+            ('EMP002', '2030-01-02', 'present', '09:00:00'),
+            ('EMP003', '2030-01-02', 'absent', NULL);
+        UPDATE attendance SET status = 'present', login_time = '09:45:00' WHERE emp_id = 'EMP003' AND date = '2030-01-02';
+        UPDATE attendance SET date = '2030-01-03' WHERE emp_id = 'EMP002' AND date = '2030-01-02';
+        DELETE FROM attendance WHERE emp_id = 'EMP001' AND date = '2030-01-02';
+        UPDATE leaves SET status = 'rejected' WHERE emp_id = 'EMP002';
+        DELETE FROM leaves WHERE emp_id = 'EMP001' AND status = 'pending';
+        INSERT INTO employees (name, emp_id, email, department) VALUES ('Temp', 'EMP011', 't@example.com', 'Ops');
+        DELETE FROM employees WHERE emp_id = 'EMP011';
+    """)
+    stored = counters.read_dashboard_counters(conn, date.today().isoformat())
+    assert counters.reconcile_dashboard_counters(conn) == []
+    conn.close()
+
+    assert stored == {"total_employees": 5, "pending_leaves_count": 1, "today_attendance": 2}
+
+
+def test_reconcile_repairs_drift(ems):
+    import counters
+
+    conn = ems.get_connection()
+    conn.execute("UPDATE dashboard_counters SET value = 99 WHERE counter = 'total_employees'")
+    conn.execute("DELETE FROM dashboard_counters WHERE counter = 'pending_leaves'")
+    conn.commit()
+    assert counters.reconcile_dashboard_counters(conn) == [
+        ("pending_leaves", "", 0, 3),
+        ("total_employees", "", 99, 4),
+    ]
+    assert counters.reconcile_dashboard_counters(conn) == []
+    conn.close()
@@ -0,0 +1,51 @@
+from datetime import date
+
+import pytest
+
+from conftest import login
+
+
+@pytest.mark.parametrize("url", ["/api/attendance/1/0", "/api/attendance/1/10000", "/api/attendance/12/9999",
+                                 "/api/attendance/13/2030", "/api/attendance/0/2030"])
+def test_out_of_range_months_are_rejected(john, url):
+    response = john.get(url)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_last_representable_month_is_served(john):
+    assert john.get("/api/attendance/11/9999").status_code == 200
+
+
+def test_etag_revalidates_until_the_month_changes(john):
+    today = date.today()
+    url = f"/api/attendance/{today.month}/{today.year}"
+    john.post("/attendance", data={"action": "login"})
+    first = john.get(url)
+    assert first.status_code == 200
+    assert first.get_json()["attendance"][today.isoformat()]["logout_time"] is None
+    etag = first.headers["ETag"]
+    assert "no-cache" in first.headers["Cache-Control"] and "private" in first.headers["Cache-Control"]
+
+    assert john.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # Checking out moves the month's version tag, so the old ETag stops matching
+    john.post("/attendance", data={"action": "logout"})
+    changed = john.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["attendance"][today.isoformat()]["logout_time"]
+
+
+def test_closed_months_are_immutable(john):
+    response = john.get("/api/attendance/1/2020")
+    assert "immutable" in response.headers["Cache-Control"]
+
+
+def test_etag_is_per_user(client, john):
+    etag = john.get("/api/attendance/2/2026").headers["ETag"]
+    john.get("/logout")
+    login(client, "priya", "pass123")
+    response = client.get("/api/attendance/2/2026", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+HEADER = "emp_id,name,email,department,join_date,password\n"
+
+
+def upload(client, body, filename="people.csv"):
+    return client.post(
+        "/admin/import/employees",
+        data={"file": (io.BytesIO(body.encode()), filename)},
+        content_type="multipart/form-data",
+    )
+
+
+def test_import_reports_inserted_and_rejected_rows(admin):
+    body = HEADER + "EMP100,Asha,asha@example.com,Ops,2024-02-01,pw\nEMP001,Dup,dup@example.com,Ops,,\n,NoId,x@example.com,Ops,,\n"
+    result = upload(admin, body).get_json()
+    assert result["inserted"] == 1
+    assert result["rejected"] == 2
+    assert sorted(error["row"] for error in result["errors"]) == [3, 4]
+
+
+def test_import_accepts_files_over_the_app_upload_limit(ems, admin):
+    assert ems.app.config["MAX_CONTENT_LENGTH"] < 3 * 1024 * 1024
+    rows = "".join(f"I{i:05d},Person {i},p{i}@example.com,Ops,2024-01-01,{'x' * 60}\n" for i in range(40000))
+    body = HEADER + rows
+    assert len(body) > 3 * 1024 * 1024
+    response = upload(admin, body)
+    assert response.status_code == 200, response.data[:200]
+    assert response.get_json()["inserted"] == 40000
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_import_rejects_files_over_the_import_limit(ems, admin, monkeypatch, chunked):
+    monkeypatch.setattr(ems, "IMPORT_MAX_BYTES", 1024)
+    body = HEADER + "".join(f"J{i:05d},Person {i},p{i}@example.com,Ops,,\n" for i in range(100))
+    if chunked:
+        # No Content-Length, so only the capped stream can stop it (servers that
+        # de-chunk the body mark it wsgi.input_terminated)
+        data = io.BytesIO()
+        boundary = "b0undary"
+        data.write(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="p.csv"\r\n\r\n'.encode())
+        data.write(body.encode() + f"\r\n--{boundary}--\r\n".encode())
+        response = admin.post(
+            "/admin/import/employees",
+            input_stream=io.BytesIO(data.getvalue()),
+            content_type=f"multipart/form-data; boundary={boundary}",
+            headers={"Transfer-Encoding": "chunked"},
+            environ_overrides={"wsgi.input_terminated": True},
+        )
+    else:
+        response = upload(admin, body)
+    assert response.status_code == 413
+    assert "error" in response.get_json()
+
+
+def test_import_is_admin_only(john):
+    assert upload(john, HEADER).status_code == 403
+
+
+def test_malformed_json_record_stops_the_read(ems):
+    class Upload(io.BytesIO):
+        def close(self):
+            pass  # the reader's TextIOWrapper closes it on the way out; keep tell() usable
+
+    body = b'{"emp_id": "K1"}\n{"emp_id": "K2", oops}\n' + b'{"emp_id": "K3"}\n' * 100000
+    stream = Upload(body)
+    rows = ems.read_import_rows(stream, "jsonl")
+    assert next(rows) == (1, {"emp_id": "K1"})
+    with pytest.raises(ValueError, match="after record 1"):
+        next(rows)
+    assert stream.tell() < len(body) / 4
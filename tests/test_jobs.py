@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from jobs import start_periodic
+
+
+def test_runs_until_stopped_and_survives_failures():
+    calls = []
+    ran_twice = threading.Event()
+
+    def job():
+        calls.append(1)
+        if len(calls) == 2:
+            ran_twice.set()
+        raise RuntimeError("logged, then retried")
+
+    thread = start_periodic("test-periodic", job, 0.01)
+    assert start_periodic("test-periodic", job, 0.01) is thread  # once per process
+    assert ran_twice.wait(5)
+    thread.stop.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    # A stopped job can be started again
+    restarted = start_periodic("test-periodic", job, 3600)
+    assert restarted is not thread
+    restarted.stop.set()
+    restarted.join(5)
+
+
+JOB_NAMES = {"attendance-cap-sweeper", "attendance-rollup-aggregator", "leave-accrual"}
+
+
+@pytest.fixture
+def job_threads():
+    yield lambda: {t.name: t for t in threading.enumerate() if t.name in JOB_NAMES}
+    for thread in threading.enumerate():
+        if thread.name in JOB_NAMES:
+            thread.stop.set()
+            thread.join(5)
+
+
+def test_jobs_start_with_the_first_request_not_at_import(load_app, monkeypatch, job_threads):
+    for setting in ("EMS_CAP_SWEEP_INTERVAL", "EMS_ROLLUP_INTERVAL", "EMS_LEAVE_ACCRUAL_INTERVAL"):
+        monkeypatch.setenv(setting, "3600")
+    ems = load_app()
+    assert job_threads() == {}
+
+    ems.app.test_client().get("/")
+    assert set(job_threads()) == JOB_NAMES
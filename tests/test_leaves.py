@@ -0,0 +1,63 @@
+import sqlite3
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def leaves(ems):
+    import leaves
+    return leaves
+
+
+def test_overlapping_request_is_refused(ems, leaves):
+    conn = ems.get_connection()
+    leave_id, overlaps = leaves.create_leave(conn, "EMP003", "2030-06-10", "2030-06-12", "casual", "")
+    assert leave_id and overlaps == []
+    # Touching the last day overlaps; the day after does not
+    leave_id, overlaps = leaves.create_leave(conn, "EMP003", "2030-06-12", "2030-06-14", "sick", "")
+    assert leave_id is None and [o["from_date"] for o in overlaps] == ["2030-06-10"]
+    leave_id, overlaps = leaves.create_leave(conn, "EMP003", "2030-06-13", "2030-06-14", "sick", "")
+    assert leave_id and overlaps == []
+    conn.close()
+
+
+def test_overlap_check_runs_under_the_write_lock(ems, leaves, db_path, monkeypatch):
+    find_overlaps = leaves.find_overlaps
+
+    def racing_find_overlaps(conn, *args):
+        other = sqlite3.connect(db_path, timeout=0)
+        try:
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other.execute("INSERT INTO leaves (emp_id, from_date, to_date, type) VALUES ('EMP003', '2030-07-01', '2030-07-01', 'sick')")
+        finally:
+            other.close()
+        return find_overlaps(conn, *args)
+
+    monkeypatch.setattr(leaves, "find_overlaps", racing_find_overlaps)
+    conn = ems.get_connection()
+    leave_id, _ = leaves.create_leave(conn, "EMP003", "2030-07-01", "2030-07-01", "casual", "")
+    conn.close()
+    assert leave_id
+
+
+def test_concurrent_identical_requests_insert_once(ems, leaves):
+    barrier = threading.Barrier(8)
+    created = []
+
+    def apply():
+        conn = ems.get_connection()
+        try:
+            barrier.wait()
+            leave_id, _ = leaves.create_leave(conn, "EMP003", "2030-08-03", "2030-08-07", "casual", "")
+            if leave_id:
+                created.append(leave_id)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=apply) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
@@ -0,0 +1,133 @@
+import sqlite3
+
+# The schema init_db() created before versioned migrations, without the later profile columns
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE TABLE employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    emp_id TEXT UNIQUE,
+    email TEXT NOT NULL,
+    department TEXT NOT NULL,
+    salary TEXT,
+    join_date TEXT
+);
+CREATE TABLE leaves (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    emp_id TEXT NOT NULL,
+    from_date TEXT NOT NULL,
+    to_date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    reason TEXT,
+    status TEXT DEFAULT 'pending',
+    applied_at TEXT DEFAULT (datetime('now'))
+);
+CREATE TABLE attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    emp_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT DEFAULT 'absent',
+    login_time TEXT,
+    logout_time TEXT,
+    UNIQUE(emp_id, date)
+);
+INSERT INTO users VALUES ('admin', 'secret', 'ADMIN'), ('asha', 'pw', 'EMPLOYEE');
+INSERT INTO employees (name, emp_id, email, department, salary, join_date) VALUES
+    ('Admin', 'ADMIN001', 'admin@example.com', 'HR', '', '2020-01-01'),
+    ('Asha', 'E100', 'asha@example.com', 'Ops', '50000', '2021-05-01');
+INSERT INTO leaves (emp_id, from_date, to_date, type, reason, status) VALUES
+    ('E100', '2025-03-03', '2025-03-05', 'casual', 'Trip', 'approved'),
+    ('E100', '2025-04-01', '2025-04-01', 'sick', 'Cold', 'pending'),
+    ('E100', '2025-03-07', '2025-03-10', 'casual', 'Long weekend', 'approved');
+INSERT INTO attendance (emp_id, date, status, login_time, logout_time) VALUES
+    ('E100', '2025-03-10', 'present', '09:00:00', '17:30:00');
+"""
+
+
+def make_baseline(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.close()
+
+
+def test_baseline_database_migrates_and_keeps_its_rows(db_path, load_app):
+    make_baseline(db_path)
+    ems = load_app()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == ems.latest_migration_version()
+    # Existing rows are kept and the demo seed data is not mixed in
+    assert conn.execute("SELECT username FROM users ORDER BY username").fetchall() == [("admin",), ("asha",)]
+    assert conn.execute("SELECT emp_id FROM employees ORDER BY emp_id").fetchall() == [("ADMIN001",), ("E100",)]
+    assert conn.execute("SELECT COUNT(*) FROM leaves").fetchone()[0] == 3
+    assert conn.execute("SELECT login_time, logout_time FROM attendance").fetchall() == [("09:00:00", "17:30:00")]
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(employees)")}
+    assert {"username", "profile_image", "qualification", "location"} <= columns
+    conn.close()
+
+
+def test_backfilled_counters_and_balances_match_the_tables(db_path, load_app):
+    make_baseline(db_path)
+    load_app()
+    import balances
+    import counters
+
+    conn = sqlite3.connect(db_path)
+    assert counters.reconcile_dashboard_counters(conn) == []
+    assert balances.rebuild_leave_balances(conn) == []
+    conn.close()
+
+
+def test_migrate_is_idempotent(db_path, load_app):
+    ems = load_app()
+    assert ems.migrate() == []
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == ems.latest_migration_version()
+    conn.close()
+
+
+def test_backfilled_leave_debits_count_working_days(db_path, load_app):
+    make_baseline(db_path)
+    load_app()
+    conn = sqlite3.connect(db_path)
+    # Mon-Wed is 3 days; Fri-Mon is 2 working days, not 4 calendar days
+    assert conn.execute("SELECT balance FROM leave_balances WHERE emp_id = 'E100' AND type = 'casual'").fetchone() == (-5,)
+    conn.close()
+
+
+def test_debit_recount_uses_each_employees_calendar(db_path):
+    import db
+
+    db.migrate(target=16)
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        INSERT INTO calendars (location, weekmask) VALUES ('gulf', '1111001');
+        INSERT INTO holidays (location, date, name) VALUES ('default', '2030-01-01', 'New Year');
+        UPDATE employees SET location = 'gulf' WHERE emp_id = 'EMP002';
+        INSERT INTO leaves (id, emp_id, from_date, to_date, type, status) VALUES
+            (100, 'EMP001', '2029-12-31', '2030-01-06', 'paid', 'approved'),
+            (101, 'EMP002', '2029-12-31', '2030-01-06', 'paid', 'approved'),
+            (102, 'EMP003', '2030-01-07', '2030-01-07', 'sick', 'approved');
+        -- As 0015 would have backfilled them: calendar days
+        INSERT INTO leave_ledger (emp_id, type, delta, kind, leave_id) VALUES
+            ('EMP001', 'paid', -7, 'leave', 100),
+            ('EMP002', 'paid', -7, 'leave', 101),
+            ('EMP003', 'sick', -1, 'leave', 102);
+    """)
+    conn.close()
+
+    assert db.migrate(target=17) == ["0017_leave_debits_in_working_days"]
+    conn = sqlite3.connect(db_path)
+    totals = dict(conn.execute(
+        "SELECT leave_id, SUM(delta) FROM leave_ledger WHERE leave_id IS NOT NULL GROUP BY leave_id"
+    ).fetchall())
+    # Default: Mon-Fri minus New Year's Day; gulf: Sun-Thu, no holidays; a one-day debit was already right
+    assert totals == {100: -4, 101: -5, 102: -1}
+    assert conn.execute("SELECT COUNT(*) FROM leave_ledger WHERE kind = 'correction'").fetchone() == (2,)
+    balances = dict(conn.execute("SELECT emp_id, balance FROM leave_balances WHERE type = 'paid'").fetchall())
+    assert balances == {"EMP001": -4, "EMP002": -5}
+    conn.close()
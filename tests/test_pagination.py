@@ -0,0 +1,125 @@
+from urllib.parse import urlencode
+
+import pytest
+
+from conftest import login
+
+
+def walk(client, url, key, cursor_args):
+    """Follow next_cursor until it runs out; returns every row in page order."""
+    rows, params = [], ""
+    while True:
+        page = client.get(url + params).get_json()
+        rows += page[key]
+        if page["next_cursor"] is None:
+            return rows
+        params = cursor_args(page["next_cursor"])
+
+
+@pytest.fixture
+def many_employees(ems):
+    conn = ems.get_connection()
+    conn.executemany(
+        "INSERT INTO employees (name, emp_id, email, department, join_date) VALUES (?, ?, ?, ?, ?)",
+        [(f"Person {i}", f"P{i:03d}", f"p{i}@example.com", "Ops" if i % 2 else "Sales", "2024-01-01") for i in range(25)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_employee_directory_cursor_visits_each_row_once(admin, many_employees):
+    rows = walk(admin, "/api/employees?limit=4", "employees", lambda cursor: f"&cursor={cursor}")
+    emp_ids = [row["emp_id"] for row in rows]
+    assert emp_ids == sorted(emp_ids)
+    assert len(emp_ids) == len(set(emp_ids)) == 29
+
+
+def test_employee_directory_filters_and_fields(admin, many_employees):
+    rows = walk(
+        admin, "/api/employees?limit=5&department=Ops&fields=name", "employees", lambda cursor: f"&cursor={cursor}",
+    )
+    assert len(rows) == 12
+    assert set(rows[0]) == {"emp_id", "name"}  # emp_id is always added for the cursor
+    assert admin.get("/api/employees?fields=salary").status_code == 400
+
+
+def test_activity_cursor_breaks_timestamp_ties_by_id(ems, admin):
+    conn = ems.get_connection()
+    # 23 events share one occurred_at, so pages of 5 split the tie four times and only the id tells them apart
+    conn.executemany(
+        "INSERT INTO activity_events (kind, action, emp_id, name, occurred_at) VALUES ('attendance', 'login', ?, ?, ?)",
+        [("EMP003", "Rahul Kumar", "2029-01-01 09:00:00") for _ in range(23)],
+    )
+    conn.commit()
+    tied = {row[0] for row in conn.execute("SELECT id FROM activity_events WHERE occurred_at = '2029-01-01 09:00:00'")}
+    total = conn.execute("SELECT COUNT(*) FROM activity_events").fetchone()[0]
+    conn.close()
+
+    events = walk(
+        admin, "/api/activity?limit=5", "events",
+        lambda cursor: "&" + urlencode(cursor),
+    )
+    ids = [event["id"] for event in events]
+    assert len(ids) == len(set(ids)) == total
+    assert tied <= set(ids)
+    assert [(e["occurred_at"], e["id"]) for e in events] == sorted(
+        ((e["occurred_at"], e["id"]) for e in events), reverse=True,
+    )
+
+
+@pytest.fixture
+def many_leaves(ems):
+    conn = ems.get_connection()
+    # Two batches sharing one applied_at each, so the cursor has to break ties by id
+    conn.executemany(
+        "INSERT INTO leaves (emp_id, from_date, to_date, type, status, applied_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (emp_id, f"2031-{month:02d}-0{day}", f"2031-{month:02d}-0{day}", "sick" if day % 2 else "casual",
+             "approved" if day == 9 else "pending", f"2030-0{1 + month % 2}-01 10:00:00")
+            for emp_id in ("EMP001", "EMP002", "EMP003")
+            for month in range(1, 7)
+            for day in range(1, 10)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def cursor_args(cursor):
+    return "&" + urlencode(cursor)
+
+
+def test_pending_queue_cursor_visits_each_leave_once(admin, many_leaves):
+    first = admin.get("/api/leaves/pending?limit=7").get_json()
+    assert first["total"] == 3 * 6 * 8 + 3
+    assert first["facets"]["department"] == {"Development": 50, "Finance": 48, "HR": 49}
+
+    second = admin.get("/api/leaves/pending?limit=7" + cursor_args(first["next_cursor"])).get_json()
+    assert "facets" not in second and "total" not in second
+
+    leaves = walk(admin, "/api/leaves/pending?limit=7", "leaves", cursor_args)
+    ids = [leave["id"] for leave in leaves]
+    assert len(ids) == len(set(ids)) == first["total"]
+    assert [(leave["applied_at"], leave["id"]) for leave in leaves] == sorted(
+        ((leave["applied_at"], leave["id"]) for leave in leaves), reverse=True,
+    )
+
+
+def test_pending_queue_filters_apply_to_every_page(admin, many_leaves):
+    url = "/api/leaves/pending?limit=4&department=Finance&type=sick&from=2031-03-01&to=2031-04-30"
+    leaves = walk(admin, url, "leaves", cursor_args)
+    assert len(leaves) == 8  # EMP003 sick leaves on days 1, 3, 5, 7 of March and April
+    assert {(leave["emp_id"], leave["type"], leave["from_date"][:7]) for leave in leaves} == {
+        ("EMP003", "sick", "2031-03"), ("EMP003", "sick", "2031-04"),
+    }
+
+
+def test_my_leaves_cursor_visits_each_leave_once(client, many_leaves):
+    login(client, "john", "pass123")
+    leaves = walk(client, "/api/me/leaves?limit=5", "leaves", cursor_args)
+    assert len(leaves) == 2 + 6 * 9
+    assert {leave["emp_id"] for leave in leaves} == {"EMP001"}
+    assert len({leave["id"] for leave in leaves}) == len(leaves)
+    assert [(leave["applied_at"], leave["id"]) for leave in leaves] == sorted(
+        ((leave["applied_at"], leave["id"]) for leave in leaves), reverse=True,
+    )
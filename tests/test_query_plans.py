@@ -0,0 +1,66 @@
+import re
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def plans(ems, db_path):
+    conn = sqlite3.connect(db_path)
+    queries = ems.hot_queries()
+    yield {
+        name: [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, (None,) * sql.count("?"))]
+        for name, sql in queries.items()
+    }
+    conn.close()
+
+
+# The department facet walks employees in (department, emp_id) order so its GROUP BY needs no sort
+ALLOWED_SCANS = {
+    "pending leave department facet": "SCAN e USING COVERING INDEX idx_employees_department_emp_id",
+}
+
+
+def test_hot_queries_never_scan_the_big_tables(plans):
+    for name, plan in plans.items():
+        for detail in plan:
+            if detail == ALLOWED_SCANS.get(name):
+                continue
+            # "SCAN x" alone is a full table scan; a covering-index SCAN still reads every row
+            assert not re.match(r"SCAN (attendance|leaves|employees|[ale])\b", detail), f"{name}: {plan}"
+
+
+@pytest.mark.parametrize("facet", ["department", "type"])
+def test_filtered_pending_facets_need_no_sort(ems, db_path, facet):
+    filters = {
+        "department": "e.department IN (?, ?)",
+        "type": "l.type IN (?, ?)",
+        "window": "l.to_date >= ? AND l.from_date <= ?",
+    }
+    where = ["l.status = 'pending'"] + [term for name, term in filters.items() if name != facet]
+    conn = sqlite3.connect(db_path)
+    try:
+        queries = {
+            "facet": ems.pending_leaves_facet_sql(facet, where),
+            "total": ems.pending_leaves_total_sql(where[:1] + list(filters.values())),
+        }
+        assert ems.check_query_plans(conn, queries) == {}
+    finally:
+        conn.close()
+
+
+def test_check_query_plans_reports_nothing(ems, db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        assert ems.check_query_plans(conn, ems.hot_queries()) == {}
+    finally:
+        conn.close()
+
+
+def test_check_query_plans_flags_a_scan(ems, db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        problems = ems.check_query_plans(conn, {"by reason": "SELECT * FROM leaves WHERE reason = ?"})
+    finally:
+        conn.close()
+    assert list(problems) == ["by reason"]
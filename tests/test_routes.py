@@ -0,0 +1,52 @@
+from conftest import login
+
+
+def test_dashboards_render(client):
+    assert login(client, "admin", "admin123").get("/admin").status_code == 200
+    client.get("/logout")
+    assert login(client, "john", "pass123").get("/employee").status_code == 200
+
+
+def test_check_in_and_out(client):
+    login(client, "john", "pass123")
+    checked_in = client.post("/attendance", data={"action": "login"}).get_json()
+    assert checked_in["success"] and checked_in["login_time"] and checked_in["logout_time"] is None
+    checked_out = client.post("/attendance", data={"action": "logout"}).get_json()
+    assert checked_out["success"] and checked_out["login_time"] == checked_in["login_time"]
+    assert checked_out["logout_time"]
+
+
+def test_apply_and_approve_leave(client):
+    login(client, "john", "pass123")
+    response = client.post("/apply_leave", data={"fromDate": "2030-03-04", "toDate": "2030-03-05", "leaveType": "casual"})
+    assert response.get_json() == {"success": True}
+    # The same days again overlap the pending request
+    response = client.post("/apply_leave", data={"fromDate": "2030-03-05", "toDate": "2030-03-06", "leaveType": "sick"})
+    assert response.status_code == 409
+    client.get("/logout")
+
+    login(client, "admin", "admin123")
+    pending = client.get("/api/leaves/pending?limit=500").get_json()["leaves"]
+    leave_id = next(leave["id"] for leave in pending if leave["from_date"] == "2030-03-04")
+    response = client.post("/api/leaves/decisions", json={"decision": "approve", "ids": [leave_id]})
+    assert response.get_json()["updated"] == 1
+    assert leave_id not in [leave["id"] for leave in client.get("/api/leaves/pending?limit=500").get_json()["leaves"]]
+
+
+def test_paged_apis(client):
+    login(client, "admin", "admin123")
+    page = client.get("/api/employees?limit=2").get_json()
+    assert [row["emp_id"] for row in page["employees"]] == ["ADMIN001", "EMP001"]
+    page = client.get(f"/api/employees?limit=2&cursor={page['next_cursor']}").get_json()
+    assert [row["emp_id"] for row in page["employees"]] == ["EMP002", "EMP003"]
+    assert page["next_cursor"] is None
+    assert len(client.get("/api/activity?limit=2").get_json()["events"]) == 2
+
+
+def test_duplicate_employee_is_rejected(client):
+    login(client, "admin", "admin123")
+    form = {"name": "Dup", "emp_id": "EMP001", "email": "dup@example.com", "department": "HR"}
+    assert client.post("/add_employee", data=form).status_code == 302
+    assert client.get("/api/employees?limit=500").get_json()["employees"].count(
+        {"emp_id": "EMP001", "name": "John Doe", "department": "Development", "join_date": "2023-01-10"}
+    ) == 1
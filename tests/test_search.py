@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.fixture
+def searchable(ems):
+    conn = ems.get_connection()
+    conn.executemany(
+        "INSERT INTO employees (name, emp_id, email, department, qualification) VALUES (?, ?, ?, ?, ?)",
+        [
+            # Matches "sam dev" only through its department
+            ("Sam Lee", "S001", "sam.lee@example.com", "Development", ""),
+            # Matches both words in the name, but a long profile ranks it lower overall
+            ("Sam Devi", "S002", "sam.devi.long.address@example.com", "HR",
+             "MBA in human resources management and organisational behaviour"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def search(client, q, **args):
+    response = client.get("/api/employees/search", query_string={"q": q, **args})
+    assert response.status_code == 200
+    return [row["emp_id"] for row in response.get_json()["employees"]]
+
+
+def test_every_word_must_match_a_ranked_column(john, searchable):
+    # Name/emp_id/email matches come first; department-only matches only top up the list
+    assert search(john, "sam dev") == ["S002", "S001"]
+
+
+def test_prefix_words_and_short_words(john, searchable):
+    assert search(john, "devi") == ["S002"]
+    assert search(john, "s") == []
+    assert sorted(search(john, "emp00")) == ["EMP001", "EMP002", "EMP003"]
@@ -0,0 +1,25 @@
+def test_pre_upgrade_admin_session_gets_role_and_emp_id(client):
+    # Sessions from before the upgrade only carried the username
+    with client.session_transaction() as session:
+        session["user"] = "admin"
+
+    assert client.get("/api/leaves/pending").status_code == 200
+    with client.session_transaction() as session:
+        assert session["role"] == "ADMIN"
+        assert session["emp_id"] == "ADMIN001"
+
+
+def test_pre_upgrade_employee_session_stays_an_employee(client):
+    with client.session_transaction() as session:
+        session["user"] = "john"
+
+    assert client.get("/api/leaves/pending").status_code == 403
+    assert client.get("/api/me/leaves").status_code == 200
+    with client.session_transaction() as session:
+        assert session["role"] == "EMPLOYEE"
+        assert session["emp_id"] == "EMP001"
+
+
+def test_login_stores_role_and_emp_id(john):
+    with john.session_transaction() as session:
+        assert (session["user"], session["role"], session["emp_id"]) == ("john", "EMPLOYEE", "EMP001")
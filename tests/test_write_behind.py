@@ -0,0 +1,140 @@
+import json
+import os
+from concurrent.futures import Future
+from datetime import datetime
+
+import pytest
+
+from conftest import login
+
+NOW = datetime(2030, 5, 6, 9, 0, 0)
+
+
+@pytest.fixture
+def attendance(ems):
+    import attendance
+    return attendance
+
+
+@pytest.fixture
+def spill_dir(tmp_path):
+    return tmp_path / "spill"
+
+
+def spill_files(spill_dir, pattern="attendance-spill-*.jsonl"):
+    return sorted(spill_dir.glob(pattern))
+
+
+def test_events_commit_in_one_batch(ems, attendance, spill_dir):
+    buffer = attendance.WriteBehindBuffer(str(spill_dir))
+    # Queued before the writer starts, so both land in the first batch
+    futures = [buffer.submit("login", emp_id, NOW) for emp_id in ("EMP001", "EMP002")]
+    buffer.start()
+    try:
+        assert [future.result(5) for future in futures] == [("09:00:00", None), ("09:00:00", None)]
+        assert os.path.getsize(buffer.spill_path) == 0
+    finally:
+        buffer.close()
+    assert spill_files(spill_dir) == []
+
+    conn = ems.get_connection()
+    rows = conn.execute("SELECT emp_id FROM attendance WHERE date = '2030-05-06' ORDER BY emp_id").fetchall()
+    conn.close()
+    assert [row[0] for row in rows] == ["EMP001", "EMP002"]
+
+
+def test_failing_event_is_dead_lettered_with_backoff(attendance, spill_dir, monkeypatch):
+    check_in = attendance.check_in
+
+    def flaky_check_in(conn, emp_id, now=None):
+        if emp_id == "BAD":
+            raise ValueError("poison")
+        return check_in(conn, emp_id, now)
+
+    sleeps = []
+    monkeypatch.setattr(attendance, "check_in", flaky_check_in)
+    monkeypatch.setattr(attendance.time, "sleep", sleeps.append)
+
+    buffer = attendance.WriteBehindBuffer(str(spill_dir))
+    good, bad = buffer.submit("login", "EMP001", NOW), buffer.submit("login", "BAD", NOW)
+    buffer.start()
+    try:
+        assert good.result(5) == ("09:00:00", None)
+        with pytest.raises(attendance.AttendanceWriteError):
+            bad.result(5)
+    finally:
+        buffer.close()
+
+    # flush_interval is 0, yet the retries back off from a non-zero floor
+    assert sleeps == [0.05, 0.1, 0.2, 0.4]
+    [dead_letter] = spill_files(spill_dir, "attendance-deadletter-*.jsonl")
+    events = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert [(event["action"], event["emp_id"]) for event in events] == [("login", "BAD")]
+    assert spill_files(spill_dir) == []
+
+
+def write_spill(path, *emp_ids):
+    path.parent.mkdir(exist_ok=True)
+    path.write_text("".join(
+        json.dumps({"action": "login", "emp_id": emp_id, "at": "2030-05-06 08:30:00"}) + "\n" for emp_id in emp_ids
+    ))
+
+
+@pytest.mark.skipif(os.name == "nt", reason="spill ownership uses flock()")
+def test_replay_skips_spills_whose_owner_is_alive(ems, attendance, spill_dir):
+    dead = spill_dir / "attendance-spill-999991.jsonl"
+    live = spill_dir / "attendance-spill-999992.jsonl"
+    empty = spill_dir / "attendance-spill-999993.jsonl"
+    write_spill(dead, "EMP001")
+    write_spill(live, "EMP002")
+    write_spill(empty)
+
+    with open(live, "a+") as owner:
+        assert attendance._lock_spill(owner)
+        buffer = attendance.WriteBehindBuffer(str(spill_dir)).start()
+        buffer.close()
+        assert spill_files(spill_dir) == [live]
+    assert live.read_text()
+
+    conn = ems.get_connection()
+    rows = conn.execute("SELECT emp_id, login_time FROM attendance WHERE date = '2030-05-06'").fetchall()
+    conn.close()
+    assert [tuple(row) for row in rows] == [("EMP001", "08:30:00")]
+
+
+def test_route_waits_for_the_commit(load_app, monkeypatch, tmp_path):
+    monkeypatch.setenv("EMS_ATTENDANCE_WRITE_BEHIND", "1")
+    monkeypatch.setenv("EMS_ATTENDANCE_SPILL_DIR", str(tmp_path / "spill"))
+    ems = load_app()
+    try:
+        client = login(ems.app.test_client(), "john", "pass123")
+        response = client.post("/attendance", data={"action": "login"})
+        assert response.status_code == 200
+        assert response.get_json()["login_time"]
+    finally:
+        ems.attendance_buffer.close()
+
+
+class StalledBuffer:
+    def __init__(self, future):
+        self.future = future
+
+    def submit(self, action, emp_id):
+        return self.future
+
+
+def test_route_reports_pending_without_promising_durability(ems, john, monkeypatch):
+    monkeypatch.setattr(ems, "attendance_buffer", StalledBuffer(Future()))
+    monkeypatch.setattr(ems, "WRITE_BEHIND_WAIT", 0.01)
+    response = john.post("/attendance", data={"action": "login"})
+    assert response.status_code == 202
+    assert response.get_json()["pending"] is True
+
+
+def test_route_reports_dead_lettered_events(ems, john, attendance, monkeypatch):
+    future = Future()
+    future.set_exception(attendance.AttendanceWriteError("login for EMP001 failed"))
+    monkeypatch.setattr(ems, "attendance_buffer", StalledBuffer(future))
+    response = john.post("/attendance", data={"action": "login"})
+    assert response.status_code == 503
+    assert response.get_json()["success"] is False